@@ -2,5 +2,8 @@ from django.apps import AppConfig
 
 
 class PlatformConfig(AppConfig):
-    default_auto_field = 'django.db.models.BigAutoField'
-    name = '_platform'
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "_platform"
+
+    def ready(self):
+        from . import signals  # noqa: F401
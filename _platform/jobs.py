@@ -0,0 +1,21 @@
+from data.services.jobs import job_handler
+
+from .services import fan_out_notification
+
+
+@job_handler("notification_fanout")
+def notification_fanout(job):
+    payload = job.payload
+    organization_ids = payload.get("organization_ids")
+    if organization_ids is None and job.organization_id is not None:
+        organization_ids = [job.organization_id]
+
+    notification, recipients = fan_out_notification(
+        title=payload["title"],
+        message=payload["message"],
+        link=payload.get("link"),
+        type=payload.get("type", "info"),
+        organization_ids=organization_ids,
+        roles=payload.get("roles"),
+    )
+    return {"notification_id": str(notification.id), "recipients": recipients}
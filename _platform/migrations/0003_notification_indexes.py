@@ -0,0 +1,31 @@
+# Generated by Django 5.2.2 on 2026-10-17 10:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("_platform", "0002_remove_notification_organization"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(fields=["-created_at"], name="notification_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="notificationread",
+            index=models.Index(
+                fields=["user", "notification"], name="notificationread_user_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="notificationread",
+            index=models.Index(
+                fields=["user", "is_read"], name="notificationread_unread_idx"
+            ),
+        ),
+    ]
@@ -34,6 +34,11 @@ class Notification(models.Model):
         User, through="NotificationRead", related_name="notifications"
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["-created_at"], name="notification_created_idx")
+        ]
+
     def __str__(self):
         return f"{self.type} - {self.title}"
 
@@ -45,5 +50,15 @@ class NotificationRead(models.Model):
     is_read = models.BooleanField(default=False)
     read_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "notification"], name="notificationread_user_idx"
+            ),
+            models.Index(
+                fields=["user", "is_read"], name="notificationread_unread_idx"
+            ),
+        ]
+
     def __str__(self) -> str:
         return f"{self.user} - {self.notification.title}"
@@ -0,0 +1,9 @@
+from rest_framework.pagination import CursorPagination
+
+
+class NotificationCursorPagination(CursorPagination):
+    """Newest first; the cursor seeks on created_at instead of an OFFSET."""
+
+    ordering = "-created_at"
+    page_size_query_param = "page_size"
+    max_page_size = 100
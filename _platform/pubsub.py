@@ -0,0 +1,183 @@
+# In-process pub/sub for pushing notifications to connected streams. Each
+# subscription is a channel (a user id) with its own queue, read by the
+# event loop of the stream that opened it. The broker backend,
+# NOTIFICATION_BROKER, decides how far a publish reaches: LocalBroker only
+# reaches subscribers of this process (tests, a producer running in the web
+# process), PostgresBroker goes through LISTEN/NOTIFY to every process,
+# including from the background worker that fans notifications out.
+import asyncio
+import json
+import logging
+import select
+import threading
+from collections import defaultdict
+from functools import cache
+
+from django.conf import settings
+from django.db import connection, connections
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """
+    Messages published to one channel, buffered until read. Opened from a
+    coroutine, whose event loop it is read from; written from any thread.
+    """
+
+    def __init__(self, broker, channel, maxsize=100):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def put(self, message):
+        try:
+            self.loop.call_soon_threadsafe(self.put_nowait, message)
+        except RuntimeError:
+            # the loop of a stream that is going away is already closed
+            pass
+
+    def put_nowait(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # a stalled reader loses messages, not the publisher's time
+            logger.warning("Subscription to %s is full, message dropped", self.channel)
+
+    async def get(self, timeout=None):
+        """The next message, None when none arrived within ``timeout``."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    """Delivers messages to the subscribers of this process only."""
+
+    # whether a publish from another process, the worker's, is delivered
+    cross_process = False
+
+    def __init__(self):
+        self.subscriptions = defaultdict(set)
+        self.lock = threading.Lock()
+
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel)
+        with self.lock:
+            self.subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscribers = self.subscriptions.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self.subscriptions[subscription.channel]
+
+    def publish(self, channels, message):
+        """Deliver ``message``, JSON serializable, on each of ``channels``."""
+        self.deliver(channels, message)
+
+    def deliver(self, channels, message):
+        with self.lock:
+            targets = [
+                subscription
+                for channel in channels
+                for subscription in self.subscriptions.get(channel, ())
+            ]
+        for subscription in targets:
+            subscription.put(message)
+
+
+class PostgresBroker(LocalBroker):
+    """
+    Publishes with NOTIFY on one Postgres channel; each process runs a
+    listener thread on its own connection that delivers the notifications
+    to its local subscribers. A NOTIFY sent inside a transaction is only
+    delivered on commit. Needs psycopg2.
+    """
+
+    cross_process = True
+    pg_channel = "platform_notifications"
+    # Postgres caps a NOTIFY payload at 8000 bytes
+    max_payload = 7900
+    # how often the listener wakes up to check whether it was stopped
+    poll_seconds = 5
+
+    def __init__(self):
+        super().__init__()
+        self.listener = None
+        # set while the listener's LISTEN is in effect
+        self.listening = threading.Event()
+        self.stopped = threading.Event()
+
+    def publish(self, channels, message):
+        with connection.cursor() as cursor:
+            for payload in self.payloads(list(channels), message):
+                cursor.execute("SELECT pg_notify(%s, %s)", [self.pg_channel, payload])
+
+    def payloads(self, channels, message):
+        """Split the channels over as few payloads as fit the size cap."""
+        while channels:
+            count = len(channels)
+            while True:
+                payload = json.dumps({"channels": channels[:count], "message": message})
+                if len(payload.encode()) <= self.max_payload or count == 1:
+                    break
+                count = count // 2
+            yield payload
+            channels = channels[count:]
+
+    def subscribe(self, channel):
+        with self.lock:
+            if self.listener is None or not self.listener.is_alive():
+                self.stopped.clear()
+                self.listener = threading.Thread(
+                    target=self.listen, name="notification-listener", daemon=True
+                )
+                self.listener.start()
+        return super().subscribe(channel)
+
+    def stop(self):
+        """Stop the listener thread and close its connection."""
+        self.stopped.set()
+        if self.listener is not None:
+            self.listener.join()
+
+    def listen(self):
+        wrapper = connections["default"]
+        while not self.stopped.is_set():
+            pg = None
+            try:
+                pg = wrapper.get_new_connection(wrapper.get_connection_params())
+                pg.autocommit = True
+                with pg.cursor() as cursor:
+                    cursor.execute(f"LISTEN {self.pg_channel}")
+                self.listening.set()
+                while not self.stopped.is_set():
+                    if select.select([pg], [], [], self.poll_seconds) == ([], [], []):
+                        continue
+                    pg.poll()
+                    while pg.notifies:
+                        payload = json.loads(pg.notifies.pop(0).payload)
+                        self.deliver(payload["channels"], payload["message"])
+            except Exception:
+                logger.exception("Notification listener failed, reconnecting")
+                self.stopped.wait(self.poll_seconds)
+            finally:
+                self.listening.clear()
+                if pg is not None:
+                    pg.close()
+
+
+@cache
+def get_broker():
+    """The process-wide broker, an instance of NOTIFICATION_BROKER."""
+    return import_string(settings.NOTIFICATION_BROKER)()
@@ -1,23 +1,38 @@
 from rest_framework import serializers
 
-from .models import Notification, NotificationRead
+from company.models import OrganizationMembership
+
+from .models import Notification, NotificationRead, NotificationTypes
 
 
 class NotificationSerializer(serializers.ModelSerializer):
-    is_read = serializers.SerializerMethodField()
+    # annotated by the queryset, see user_notifications
+    is_read = serializers.BooleanField(read_only=True)
 
     class Meta:
         model = Notification
         fields = ["id", "title", "message", "link", "type", "created_at", "is_read"]
 
-    def get_is_read(self, obj):
-        user = self.context["request"].user
-        read_obj = NotificationRead.objects.filter(notification=obj, user=user).first()
-        return read_obj.is_read if read_obj else False
-
 
 class NotificationReadSerializer(serializers.ModelSerializer):
     class Meta:
         model = NotificationRead
         fields = ["id", "is_read", "read_at"]
         read_only_fields = ["id", "read_at"]
+
+
+class NotificationBroadcastSerializer(serializers.Serializer):
+    title = serializers.CharField(max_length=255)
+    message = serializers.CharField()
+    link = serializers.URLField(max_length=500, required=False, allow_null=True)
+    type = serializers.ChoiceField(
+        choices=NotificationTypes.choices, default=NotificationTypes.INFO
+    )
+    organization_ids = serializers.ListField(
+        child=serializers.UUIDField(), required=False, allow_empty=False
+    )
+    roles = serializers.ListField(
+        child=serializers.ChoiceField(choices=OrganizationMembership.ROLE_CHOICES),
+        required=False,
+        allow_empty=False,
+    )
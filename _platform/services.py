@@ -0,0 +1,136 @@
+from itertools import islice
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils.timezone import now
+
+from company.models import OrganizationMembership
+from company.roles import ADMIN_ROLES
+
+from .models import Notification, NotificationRead, NotificationTypes
+from .pubsub import get_broker
+from .serializers import NotificationSerializer
+
+
+def user_notifications(user):
+    """The user's notifications, each annotated with its ``is_read``."""
+    return Notification.objects.filter(readers=user).annotate(
+        is_read=Exists(
+            NotificationRead.objects.filter(
+                notification=OuterRef("pk"), user=user, is_read=True
+            )
+        )
+    )
+
+
+def unread_count_key(user_id):
+    return f"notifications:unread:{user_id}"
+
+
+def unread_count(user):
+    """Number of the user's unread notifications, cached until they change."""
+    key = unread_count_key(user.pk)
+    count = cache.get(key)
+    if count is None:
+        count = NotificationRead.objects.filter(user=user, is_read=False).count()
+        cache.set(key, count, settings.NOTIFICATION_UNREAD_CACHE_TTL)
+    return count
+
+
+def invalidate_unread_counts(user_ids):
+    cache.delete_many([unread_count_key(user_id) for user_id in user_ids])
+
+
+def notification_recipients(organization_ids=None, roles=ADMIN_ROLES):
+    """
+    Ids of the users holding one of ``roles`` in any of the organizations,
+    every organization when ``organization_ids`` is None; a single query.
+    """
+    memberships = OrganizationMembership.objects.filter(role__in=roles)
+    if organization_ids is not None:
+        memberships = memberships.filter(organization_id__in=organization_ids)
+    return memberships.values_list("user_id", flat=True).distinct().order_by()
+
+
+def fan_out_notification(
+    title,
+    message,
+    link=None,
+    type=NotificationTypes.INFO,
+    organization_ids=None,
+    roles=None,
+    batch_size=None,
+):
+    """
+    Create a notification and deliver it to every recipient of
+    ``notification_recipients`` (admins and owners unless ``roles`` says
+    otherwise), writing their NotificationRead rows with
+    ``bulk_create`` ``batch_size`` at a time, in one transaction.
+    Returns the notification and the number of recipients.
+    """
+    batch_size = batch_size or settings.NOTIFICATION_FANOUT_BATCH_SIZE
+    recipients = notification_recipients(
+        organization_ids, roles or ADMIN_ROLES
+    ).iterator(chunk_size=batch_size)
+    delivered = []
+
+    with transaction.atomic():
+        notification = Notification.objects.create(
+            title=title, message=message, link=link, type=type
+        )
+        while user_ids := list(islice(recipients, batch_size)):
+            NotificationRead.objects.bulk_create(
+                NotificationRead(notification=notification, user_id=user_id)
+                for user_id in user_ids
+            )
+            delivered.extend(user_ids)
+        transaction.on_commit(lambda: delivered_to(notification, delivered))
+
+    return notification, len(delivered)
+
+
+def delivered_to(notification, user_ids):
+    """Refresh the recipients' unread counts and push to their streams."""
+    invalidate_unread_counts(user_ids)
+    notification.is_read = False
+    get_broker().publish(
+        [str(user_id) for user_id in user_ids],
+        NotificationSerializer(notification).data,
+    )
+
+
+def mark_all_read(user):
+    """Mark all of the user's notifications read in a single UPDATE."""
+    updated = NotificationRead.objects.filter(user=user, is_read=False).update(
+        is_read=True, read_at=now()
+    )
+    invalidate_unread_counts([user.pk])
+    return updated
+
+
+STREAM_TICKET_SALT = "_platform.notification-stream"
+
+
+def stream_ticket(user):
+    """
+    A signed ticket opening the user's notification stream for the next
+    NOTIFICATION_STREAM_TICKET_SECONDS. EventSource can't send headers, so
+    it goes in the URL, where it may be logged: unlike the access token it
+    is good for nothing else and expires quickly.
+    """
+    return signing.dumps(str(user.pk), salt=STREAM_TICKET_SALT, compress=True)
+
+
+def stream_ticket_user_id(ticket):
+    """The user id of a valid, unexpired stream ticket, else None."""
+    try:
+        return signing.loads(
+            ticket,
+            salt=STREAM_TICKET_SALT,
+            max_age=settings.NOTIFICATION_STREAM_TICKET_SECONDS,
+        )
+    except signing.BadSignature:
+        return None
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import NotificationRead
+from .services import invalidate_unread_counts
+
+
+@receiver(post_save, sender=NotificationRead)
+@receiver(post_delete, sender=NotificationRead)
+def evict_unread_count(sender, instance, **kwargs):
+    invalidate_unread_counts([instance.user_id])
@@ -1,3 +1,217 @@
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager
+from unittest import mock, skipUnless
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from authentication.models import CustomUser
+from company.models import Company, Organization, OrganizationMembership
+
+from .pubsub import LocalBroker, PostgresBroker
+from .services import fan_out_notification, stream_ticket, unread_count
+
+
+class NotificationTestCase(TestCase):
+    broker_class = LocalBroker
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(email="admin@example.com")
+        company = Company.objects.create(name="acme", owner=cls.user)
+        cls.organization = Organization.objects.create(name="acme", company=company)
+        OrganizationMembership.objects.create(
+            user=cls.user, organization=cls.organization, role="admin"
+        )
+
+    def setUp(self):
+        self.broker = self.broker_class()
+        for module in ("_platform.views", "_platform.services"):
+            patcher = mock.patch(f"{module}.get_broker", return_value=self.broker)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    @asynccontextmanager
+    async def open_stream(self, **params):
+        params.setdefault("ticket", await sync_to_async(stream_ticket)(self.user))
+        response = await self.async_client.get(reverse("notification-stream"), params)
+        self.assertEqual(response.status_code, 200)
+        events = response.streaming_content
+        try:
+            yield events
+        finally:
+            await events.aclose()
+
+    async def next_notification(self, events):
+        while True:
+            event = await asyncio.wait_for(anext(events), timeout=5)
+            if isinstance(event, bytes):
+                event = event.decode()
+            if event.startswith("id: "):
+                return event
+
+    def api(self, method, url, data=None, **extra):
+        token = AccessToken.for_user(self.user)
+        return getattr(self.client, method)(
+            url, data, headers={"authorization": f"Bearer {token}"}, **extra
+        )
+
+    def mark_read(self, notification):
+        response = self.api(
+            "patch",
+            reverse("notification-read", args=[notification.id]),
+            {"is_read": True},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def fan_out(self, title):
+        with self.captureOnCommitCallbacks(execute=True):
+            notification, _ = fan_out_notification(
+                title, "message", organization_ids=[self.organization.id]
+            )
+        return notification
+
+
+class NotificationListTests(NotificationTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def list(self, **params):
+        response = self.api("get", reverse("notification-list"), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_query_count_does_not_grow_with_the_page(self):
+        for index in range(2):
+            self.fan_out(f"notification {index}")
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(len(self.list(page_size=2)["results"]), 2)
+
+        for index in range(2, 30):
+            self.fan_out(f"notification {index}")
+        with self.assertNumQueries(len(context.captured_queries)):
+            self.assertEqual(len(self.list(page_size=30)["results"]), 30)
+
+    def test_is_read_is_per_user(self):
+        read, unread = self.fan_out("read"), self.fan_out("unread")
+        self.mark_read(read)
+
+        results = self.list()["results"]
+        self.assertEqual(
+            {item["id"]: item["is_read"] for item in results},
+            {str(read.id): True, str(unread.id): False},
+        )
+
+    def test_cursor_pagination_walks_newest_first(self):
+        titles = [self.fan_out(f"notification {index}").title for index in range(5)]
+
+        page = self.list(page_size=2)
+        self.assertIsNone(page["previous"])
+        seen = []
+        while True:
+            seen += [item["title"] for item in page["results"]]
+            if page["next"] is None:
+                break
+            response = self.api("get", page["next"])
+            page = response.json()
+        self.assertEqual(seen, titles[::-1])
+
+    def test_unread_count_is_cached_until_it_changes(self):
+        self.fan_out("first")
+        self.assertEqual(unread_count(self.user), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(unread_count(self.user), 1)
+
+        # a new notification, reading one, reading all
+        notification = self.fan_out("second")
+        self.assertEqual(unread_count(self.user), 2)
+        self.mark_read(notification)
+        self.assertEqual(unread_count(self.user), 1)
+        response = self.api("get", reverse("notification-unread-count"))
+        self.assertEqual(response.json(), {"unread": 1})
+
+        response = self.api("post", reverse("notification-read-all"))
+        self.assertEqual(response.json(), {"updated": 1})
+        self.assertEqual(unread_count(self.user), 0)
+        self.assertEqual(
+            [item["is_read"] for item in self.list()["results"]], [True, True]
+        )
+
+
+class NotificationStreamTests(NotificationTestCase):
+    async def test_fanned_out_notification_is_pushed(self):
+        async with self.open_stream() as events:
+            notification = await sync_to_async(self.fan_out)("Data refresh finished")
+            event = await self.next_notification(events)
+        self.assertIn(f"id: {notification.id}", event)
+        self.assertIn("Data refresh finished", event)
+
+    async def test_missed_notifications_are_sent_first(self):
+        first = await sync_to_async(self.fan_out)("first")
+        await sync_to_async(self.fan_out)("second")
+
+        async with self.open_stream(last_event_id=str(first.id)) as events:
+            self.assertIn("second", await self.next_notification(events))
+
+    async def test_expired_ticket_is_refused(self):
+        ticket = await sync_to_async(stream_ticket)(self.user)
+        with mock.patch("django.core.signing.time.time", return_value=time.time() + 61):
+            response = await self.async_client.get(
+                reverse("notification-stream"), {"ticket": ticket}
+            )
+        self.assertEqual(response.status_code, 401)
+
+    async def test_access_token_is_not_a_ticket(self):
+        token = await sync_to_async(AccessToken.for_user)(self.user)
+        response = await self.async_client.get(
+            reverse("notification-stream"), {"ticket": str(token), "token": str(token)}
+        )
+        self.assertEqual(response.status_code, 401)
+
+    def test_ticket_needs_an_authenticated_user(self):
+        url = reverse("notification-stream-ticket")
+        self.assertEqual(self.client.post(url).status_code, 401)
+
+        token = AccessToken.for_user(self.user)
+        response = self.client.post(url, headers={"authorization": f"Bearer {token}"})
+        self.assertIn("ticket", response.json())
+
+
+@skipUnless(connection.vendor == "postgresql", "LISTEN/NOTIFY is Postgres'")
+class PostgresBrokerTests(NotificationTestCase):
+    broker_class = PostgresBroker
+
+    def setUp(self):
+        super().setUp()
+        self.broker.poll_seconds = 0.1
+        self.addCleanup(self.broker.stop)
+
+    def publish_from_another_connection(self, message):
+        # as the worker does: a new thread has a connection of its own
+        def publish():
+            try:
+                PostgresBroker().publish([str(self.user.pk)], message)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=publish)
+        thread.start()
+        thread.join()
 
-# Create your tests here.
+    async def test_notify_from_another_connection_reaches_the_stream(self):
+        message = {"id": "b2c5d0c4-5b7e-4c39-a3b4-1b1d1e9c1f00", "title": "pushed"}
+        async with self.open_stream() as events:
+            self.assertTrue(await sync_to_async(self.broker.listening.wait)(5))
+            await sync_to_async(self.publish_from_another_connection)(message)
+            event = await self.next_notification(events)
+        self.assertIn(f"id: {message['id']}", event)
+        self.assertIn("pushed", event)
@@ -1,9 +1,42 @@
 from django.urls import path
 
-from .views import NotificationListView, NotificationReadUpdateView
+from .views import (
+    NotificationBroadcastView,
+    NotificationListView,
+    NotificationMarkAllReadView,
+    NotificationReadUpdateView,
+    NotificationStreamTicketView,
+    NotificationStreamView,
+    NotificationUnreadCountView,
+)
 
 urlpatterns = [
     path("notifications/", NotificationListView.as_view(), name="notification-list"),
+    path(
+        "notifications/stream/",
+        NotificationStreamView.as_view(),
+        name="notification-stream",
+    ),
+    path(
+        "notifications/stream/ticket/",
+        NotificationStreamTicketView.as_view(),
+        name="notification-stream-ticket",
+    ),
+    path(
+        "notifications/unread-count/",
+        NotificationUnreadCountView.as_view(),
+        name="notification-unread-count",
+    ),
+    path(
+        "notifications/read-all/",
+        NotificationMarkAllReadView.as_view(),
+        name="notification-read-all",
+    ),
+    path(
+        "notifications/broadcast/",
+        NotificationBroadcastView.as_view(),
+        name="notification-broadcast",
+    ),
     path(
         "notifications/<uuid:pk>/read/",
         NotificationReadUpdateView.as_view(),
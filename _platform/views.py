@@ -1,12 +1,36 @@
+import time
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from drf_spectacular.utils import OpenApiResponse, extend_schema
-from rest_framework import generics, permissions, status
+from django.views import View
+from drf_spectacular.utils import OpenApiResponse, extend_schema, inline_serializer
+from rest_framework import generics, permissions, serializers, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from data.services.jobs import enqueue_job
+
 from .models import Notification, NotificationRead
-from .serializers import NotificationReadSerializer, NotificationSerializer
+from .pagination import NotificationCursorPagination
+from .pubsub import get_broker
+from .renderers import server_sent_event
+from .serializers import (
+    NotificationBroadcastSerializer,
+    NotificationReadSerializer,
+    NotificationSerializer,
+)
+from .services import (
+    mark_all_read,
+    stream_ticket,
+    stream_ticket_user_id,
+    unread_count,
+    user_notifications,
+)
 
 
 @extend_schema(
@@ -14,7 +38,8 @@ from .serializers import NotificationReadSerializer, NotificationSerializer
     description=(
         "Returns all notifications for the authenticated user.\n\n"
         "- Each notification includes its read/unread status.\n"
-        "- Results are ordered by creation time (newest first)."
+        "- Results are ordered by creation time (newest first) and paginated "
+        "with an opaque `cursor`; follow the `next`/`previous` links."
     ),
     responses={200: NotificationSerializer(many=True)},
 )
@@ -22,9 +47,214 @@ class NotificationListView(generics.ListAPIView):
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    pagination_class = NotificationCursorPagination
+
     def get_queryset(self):
-        user = self.request.user
-        return Notification.objects.filter(readers=user).order_by("-created_at")
+        return user_notifications(self.request.user)
+
+
+def is_uuid(value):
+    try:
+        uuid.UUID(value)
+    except ValueError:
+        return False
+    return True
+
+
+def missed_notifications(user, last_event_id):
+    """
+    The user's notifications newer than the one of ``last_event_id``,
+    oldest first, at most NOTIFICATION_STREAM_BACKLOG of them.
+    """
+    last = (
+        Notification.objects.filter(pk=last_event_id)
+        .values_list("created_at", flat=True)
+        .first()
+        if is_uuid(last_event_id)
+        else None
+    )
+    if last is None:
+        return []
+    return NotificationSerializer(
+        user_notifications(user)
+        .filter(created_at__gt=last)
+        .order_by("created_at")[: settings.NOTIFICATION_STREAM_BACKLOG],
+        many=True,
+    ).data
+
+
+async def notification_events(subscription, backlog):
+    """
+    Server-sent events of the ``backlog`` notifications, then of those
+    published to the subscription, with keep-alive comments in between.
+    Ends after NOTIFICATION_STREAM_MAX_SECONDS; EventSource reconnects by
+    itself, sending the last event id to resume from.
+    """
+    deadline = time.monotonic() + settings.NOTIFICATION_STREAM_MAX_SECONDS
+    try:
+        yield f"retry: {settings.NOTIFICATION_STREAM_RETRY_MS}\n\n"
+        for notification in backlog:
+            yield server_sent_event(notification, "notification", notification["id"])
+        while (remaining := deadline - time.monotonic()) > 0:
+            notification = await subscription.get(
+                timeout=min(settings.NOTIFICATION_STREAM_HEARTBEAT_SECONDS, remaining)
+            )
+            if notification is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield server_sent_event(
+                    notification, "notification", notification["id"]
+                )
+    finally:
+        subscription.close()
+
+
+@extend_schema(
+    summary="Notification Stream Ticket",
+    description=(
+        "Returns a ticket opening the authenticated user's notification stream, "
+        "`notifications/stream/?ticket=<ticket>`, valid for `expires_in` seconds.\n\n"
+        "The stream is server-sent events (`text/event-stream`) pushing each new "
+        "notification as a `notification` event, in the list's item shape. "
+        "Notifications newer than `Last-Event-ID` (or `?last_event_id=`) are sent "
+        "first. Once the ticket has expired a reconnect is refused with 401, "
+        "get a new ticket and open a new stream."
+    ),
+    request=None,
+    responses={
+        200: inline_serializer(
+            name="NotificationStreamTicket",
+            fields={
+                "ticket": serializers.CharField(),
+                "expires_in": serializers.IntegerField(),
+            },
+        )
+    },
+)
+class NotificationStreamTicketView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        return Response(
+            {
+                "ticket": stream_ticket(request.user),
+                "expires_in": settings.NOTIFICATION_STREAM_TICKET_SECONDS,
+            }
+        )
+
+
+def event_stream_error(detail, status):
+    return HttpResponse(
+        server_sent_event({"detail": detail}, event="error"),
+        status=status,
+        content_type="text/event-stream",
+    )
+
+
+class NotificationStreamView(View):
+    """
+    The notification stream. An async view: served over ASGI, an open
+    stream waits on its event loop instead of holding a thread. It is
+    opened with a ticket of NotificationStreamTicketView, as EventSource
+    can't send the Authorization header.
+    """
+
+    async def get(self, request):
+        user_id = stream_ticket_user_id(request.GET.get("ticket", ""))
+        user = None
+        if user_id is not None:
+            user = await (
+                get_user_model().objects.filter(pk=user_id, is_active=True).afirst()
+            )
+        if user is None:
+            return event_stream_error("Invalid or expired stream ticket.", 401)
+
+        # subscribe before reading the backlog, so nothing falls in between
+        subscription = get_broker().subscribe(str(user.pk))
+
+        backlog = []
+        last_event_id = request.headers.get("Last-Event-ID") or request.GET.get(
+            "last_event_id"
+        )
+        if last_event_id:
+            try:
+                backlog = await sync_to_async(missed_notifications)(user, last_event_id)
+            except BaseException:
+                subscription.close()
+                raise
+
+        response = StreamingHttpResponse(
+            notification_events(subscription, backlog),
+            content_type="text/event-stream",
+        )
+        response["Cache-Control"] = "no-cache"
+        # don't let nginx buffer the events
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+
+@extend_schema(
+    summary="Unread Notification Count",
+    description="Returns the number of unread notifications of the authenticated user.",
+    responses={
+        200: inline_serializer(
+            name="UnreadNotificationCount",
+            fields={"unread": serializers.IntegerField()},
+        )
+    },
+)
+class NotificationUnreadCountView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        return Response({"unread": unread_count(request.user)})
+
+
+@extend_schema(
+    summary="Mark All Notifications as Read",
+    description="Marks every unread notification of the authenticated user as read.",
+    request=None,
+    responses={
+        200: inline_serializer(
+            name="NotificationsMarkedRead",
+            fields={"updated": serializers.IntegerField()},
+        )
+    },
+)
+class NotificationMarkAllReadView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        return Response({"updated": mark_all_read(request.user)})
+
+
+@extend_schema(
+    summary="Broadcast Notification",
+    description=(
+        "Staff only. Queues a background job delivering a notification to the "
+        "admins and owners (or the given `roles`) of the given organizations, "
+        "every organization when `organization_ids` is omitted."
+    ),
+    request=NotificationBroadcastSerializer,
+    responses={
+        202: inline_serializer(
+            name="NotificationBroadcastQueued",
+            fields={"job_id": serializers.UUIDField()},
+        )
+    },
+)
+class NotificationBroadcastView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request):
+        serializer = NotificationBroadcastSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        payload = serializer.validated_data
+        if "organization_ids" in payload:
+            payload["organization_ids"] = [str(i) for i in payload["organization_ids"]]
+
+        job = enqueue_job("notification_fanout", payload=payload)
+        return Response({"job_id": job.id}, status=status.HTTP_202_ACCEPTED)
 
 
 @extend_schema(
@@ -78,29 +308,3 @@ class NotificationReadUpdateView(APIView):
         return Response(
             NotificationReadSerializer(notif_read).data, status=status.HTTP_200_OK
         )
-
-
-# from django.utils import timezone
-# from .models import Notification, NotificationRead
-#
-# def create_notification(org, title, message, link=None):
-#     # 1. Create the notification object
-#     notif = Notification.objects.create(
-#         organization=org,
-#         title=title,
-#         message=message,
-#         link=link  # optional attribute we'll add in the model
-#     )
-#
-#     # 2. Figure out who should receive it
-#     recipients = list(org.admins.all()) + [org.company.owner]
-#
-#     # 3. For each recipient, create a NotificationRead entry
-#     for user in recipients:
-#         NotificationRead.objects.create(
-#             notification=notif,
-#             user=user,
-#             is_read=False,
-#             read_at=None
-#         )
-#     return notif
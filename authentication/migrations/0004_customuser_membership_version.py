@@ -0,0 +1,18 @@
+# Generated by Django 5.2.2 on 2026-10-17 10:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authentication", "0003_onetimecredential"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customuser",
+            name="membership_version",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
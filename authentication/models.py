@@ -32,6 +32,8 @@ class CustomUser(AbstractUser, PermissionsMixin):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_email_verified = models.BooleanField(default=False)
+    # bumped on every membership change, see authentication.tokens
+    membership_version = models.PositiveIntegerField(default=0)
 
     objects = CustomUserManager()
 
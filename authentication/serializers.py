@@ -2,6 +2,9 @@ from django.contrib.auth import get_user_model
 from djoser.serializers import UserCreateSerializer
 from drf_spectacular.utils import extend_schema_serializer
 from rest_framework import serializers
+from rest_framework_simplejwt import serializers as jwt_serializers
+
+from .tokens import OrgRoleRefreshToken
 
 
 @extend_schema_serializer(component_name="CustomUser")
@@ -25,6 +28,14 @@ class UserCreateSerializer(UserCreateSerializer):
         fields = ("id", "email", "password", "first_name", "last_name")
 
 
+class TokenObtainPairSerializer(jwt_serializers.TokenObtainPairSerializer):
+    token_class = OrgRoleRefreshToken
+
+
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    token_class = OrgRoleRefreshToken
+
+
 class GoogleOAuthErrorSerializer(serializers.Serializer):
     error = serializers.CharField()
     response = serializers.DictField(required=False)
@@ -1,3 +1,94 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
 
-# Create your tests here.
+from company import roles
+from company.models import Company, Organization, OrganizationMembership
+from company.roles import get_role
+
+from .models import CustomUser
+from .tokens import (
+    ROLES_CLAIM,
+    VERSION_CLAIM,
+    OrgRoleJWTAuthentication,
+    OrgRoleRefreshToken,
+)
+
+
+@override_settings(JWT_ORG_ROLE_CLAIMS=True)
+class OrgRoleTokenTests(TestCase):
+    """Role claims are trusted only while the user's memberships are unchanged."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(email="admin@example.com")
+        company = Company.objects.create(name="acme", owner=cls.user)
+        cls.organization = Organization.objects.create(name="acme", company=company)
+        cls.membership = OrganizationMembership.objects.create(
+            user=cls.user, organization=cls.organization, role="admin"
+        )
+        cls.user.refresh_from_db()
+
+    def setUp(self):
+        # the process-wide role cache outlives each test's transaction
+        roles._roles.clear()
+        self.addCleanup(roles._roles.clear)
+
+    def authenticate(self, access):
+        request = APIRequestFactory().get(
+            "/", headers={"authorization": f"Bearer {access}"}
+        )
+        user, _ = OrgRoleJWTAuthentication().authenticate(request)
+        return user
+
+    def test_claims_are_only_embedded_when_enabled(self):
+        with override_settings(JWT_ORG_ROLE_CLAIMS=False):
+            access = OrgRoleRefreshToken.for_user(self.user).access_token
+        self.assertNotIn(ROLES_CLAIM, access.payload)
+        self.assertNotIn(VERSION_CLAIM, access.payload)
+
+        access = OrgRoleRefreshToken.for_user(self.user).access_token
+        self.assertEqual(access[ROLES_CLAIM], {str(self.organization.id): "a"})
+        self.assertEqual(access[VERSION_CLAIM], self.user.membership_version)
+
+    def test_claims_are_ignored_when_disabled(self):
+        access = OrgRoleRefreshToken.for_user(self.user).access_token
+        self.membership.delete()
+        with override_settings(JWT_ORG_ROLE_CLAIMS=False):
+            user = self.authenticate(access)
+        self.assertIsNone(get_role(user, self.organization))
+
+    def test_current_claims_need_no_membership_query(self):
+        user = self.authenticate(OrgRoleRefreshToken.for_user(self.user).access_token)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_role(user, self.organization), "admin")
+
+    def test_stale_claims_fall_back_to_the_database(self):
+        access = OrgRoleRefreshToken.for_user(self.user).access_token
+
+        self.membership.role = "member"
+        self.membership.save()
+        self.assertEqual(
+            get_role(self.authenticate(access), self.organization), "member"
+        )
+
+        self.membership.delete()
+        self.assertIsNone(get_role(self.authenticate(access), self.organization))
+
+    def test_refresh_reads_the_current_roles(self):
+        refresh = OrgRoleRefreshToken.for_user(self.user)
+        self.membership.role = "member"
+        self.membership.save()
+
+        # through the configured TOKEN_REFRESH_SERIALIZER
+        response = self.client.post(reverse("jwt-refresh"), {"refresh": str(refresh)})
+        self.assertEqual(response.status_code, 200)
+        access = AccessToken(response.json()["access"])
+
+        self.user.refresh_from_db()
+        self.assertEqual(access[ROLES_CLAIM], {str(self.organization.id): "m"})
+        self.assertEqual(access[VERSION_CLAIM], self.user.membership_version)
+        self.assertEqual(
+            get_role(self.authenticate(access), self.organization), "member"
+        )
@@ -0,0 +1,73 @@
+# Optional organization-role claims in access tokens (JWT_ORG_ROLE_CLAIMS).
+# Access tokens then carry ``org_roles`` ({organization_id: role code}) and
+# ``mv``, the user's membership_version when they were issued. Authentication
+# trusts the roles while ``mv`` still matches the user row it loads anyway,
+# so role checks need no membership query; stale tokens fall back to the DB.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from company.roles import load_roles, set_user_roles
+
+ROLES_CLAIM = "org_roles"
+VERSION_CLAIM = "mv"
+ROLE_CODES = {"owner": "o", "admin": "a", "member": "m"}
+ROLE_NAMES = {code: role for role, code in ROLE_CODES.items()}
+
+
+def role_claims(user):
+    return {
+        ROLES_CLAIM: {
+            organization_id: ROLE_CODES[role]
+            for organization_id, role in load_roles(user.pk).items()
+        },
+        VERSION_CLAIM: user.membership_version,
+    }
+
+
+class OrgRoleRefreshToken(RefreshToken):
+    """
+    RefreshToken whose access tokens carry the role claims. They are read
+    fresh every time an access token is minted, never copied from the
+    refresh token, so a refresh picks up membership changes.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token.user = user
+        return token
+
+    @property
+    def access_token(self):
+        access = super().access_token
+        if settings.JWT_ORG_ROLE_CLAIMS:
+            user = getattr(self, "user", None) or get_user_model().objects.get(
+                **{api_settings.USER_ID_FIELD: self[api_settings.USER_ID_CLAIM]}
+            )
+            for claim, value in role_claims(user).items():
+                access[claim] = value
+        return access
+
+
+class OrgRoleJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that takes the user's roles from current claims."""
+
+    def get_user(self, validated_token):
+        user = super().get_user(validated_token)
+        roles = validated_token.get(ROLES_CLAIM)
+        if (
+            settings.JWT_ORG_ROLE_CLAIMS
+            and roles is not None
+            and validated_token.get(VERSION_CLAIM) == user.membership_version
+        ):
+            set_user_roles(
+                user,
+                {
+                    organization_id: ROLE_NAMES[code]
+                    for organization_id, code in roles.items()
+                },
+            )
+        return user
@@ -1,7 +1,6 @@
 import os
 from urllib.parse import urlencode
 
-import requests
 from django.contrib.auth import get_user_model
 from django.http import JsonResponse
 from django.shortcuts import redirect
@@ -9,7 +8,9 @@ from dotenv import load_dotenv
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import OpenApiParameter, extend_schema
 from rest_framework.decorators import api_view
-from rest_framework_simplejwt.tokens import RefreshToken
+
+from authentication.tokens import OrgRoleRefreshToken
+from core.http import vendor_session
 
 User = get_user_model()
 from authentication.serializers import GoogleOAuthErrorSerializer
@@ -76,7 +77,9 @@ def google_oauth_callback(request):
             "grant_type": "authorization_code",
         }
 
-        response = requests.post(token_endpoint, data=data)
+        response = vendor_session("google").post(
+            token_endpoint, data=data, endpoint="token"
+        )
         tokens = response.json()
 
         if response.status_code != 200:
@@ -90,7 +93,9 @@ def google_oauth_callback(request):
         userinfo_endpoint = "https://www.googleapis.com/oauth2/v2/userinfo"
         headers = {"Authorization": f"Bearer {access_token}"}
 
-        userinfo_response = requests.get(userinfo_endpoint, headers=headers)
+        userinfo_response = vendor_session("google").get(
+            userinfo_endpoint, headers=headers, endpoint="userinfo"
+        )
         user_data = userinfo_response.json()
 
         # Get or create user
@@ -106,7 +111,7 @@ def google_oauth_callback(request):
         )
 
         # Generate JWT tokens
-        refresh = RefreshToken.for_user(user)
+        refresh = OrgRoleRefreshToken.for_user(user)
         access_token = str(refresh.access_token)
         refresh_token = str(refresh)
 
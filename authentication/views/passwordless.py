@@ -12,7 +12,6 @@ from rest_framework import status
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
 
 from authentication.models import OneTimeCredential
 from authentication.serializers import (
@@ -21,6 +20,7 @@ from authentication.serializers import (
     OTPRequestSerializer,
     OTPVerifySerializer,
 )
+from authentication.tokens import OrgRoleRefreshToken
 from authentication.utils.hash import hash_code, verify_code
 from core.throttles import OTPRequestThrottle, OTPVerifyThrottle
 
@@ -133,7 +133,7 @@ class MagicLinkVerifyView(APIView):
         otc.delete()
 
         # Issue JWT tokens
-        refresh = RefreshToken.for_user(user)
+        refresh = OrgRoleRefreshToken.for_user(user)
         return Response(
             {
                 "refresh": str(refresh),
@@ -255,7 +255,7 @@ class OTPVerifyView(APIView):
 
         otc.delete()
 
-        refresh = RefreshToken.for_user(user)
+        refresh = OrgRoleRefreshToken.for_user(user)
         return Response(
             {
                 "refresh": str(refresh),
@@ -1,6 +1,6 @@
 from rest_framework import permissions
 
-from .models import OrganizationMembership
+from .roles import ADMIN_ROLES, has_role
 
 
 class IsOrgAdminOrOwnerOrReadOnly(permissions.BasePermission):
@@ -15,11 +15,4 @@ class IsOrgAdminOrOwnerOrReadOnly(permissions.BasePermission):
 
         organization = view.get_organization()
 
-        try:
-            membership = OrganizationMembership.objects.get(
-                user=request.user, organization=organization
-            )
-        except OrganizationMembership.DoesNotExist:
-            return False
-
-        return membership.role in ["admin", "owner"]
+        return has_role(request.user, organization, ADMIN_ROLES)
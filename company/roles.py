@@ -0,0 +1,72 @@
+# Organization roles of users, the one source every role check reads from.
+# Each user's {organization_id: role} map is loaded in one query, kept on the
+# request's user object for the rest of the request and in a short-TTL
+# process cache across requests. Membership writes evict it (see signals).
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .models import OrganizationMembership
+
+ADMIN_ROLES = ("admin", "owner")
+
+_roles = OrderedDict()  # user_id -> (expires_at, {organization_id: role})
+_lock = threading.Lock()
+
+
+def load_roles(user_id):
+    return {
+        str(organization_id): role
+        for organization_id, role in OrganizationMembership.objects.filter(
+            user_id=user_id
+        ).values_list("organization_id", "role")
+    }
+
+
+def cached_roles(user_id):
+    """``{organization_id: role}`` of a user, through the process cache."""
+    with _lock:
+        entry = _roles.get(user_id)
+        if entry is not None and entry[0] > time.monotonic():
+            _roles.move_to_end(user_id)
+            return entry[1]
+
+    roles = load_roles(user_id)
+    with _lock:
+        _roles[user_id] = (time.monotonic() + settings.ROLE_CACHE_TTL, roles)
+        _roles.move_to_end(user_id)
+        while len(_roles) > settings.ROLE_CACHE_SIZE:
+            _roles.popitem(last=False)
+    return roles
+
+
+def user_roles(user):
+    """``{organization_id: role}`` of a user, memoized on the user object."""
+    if not user.is_authenticated:
+        return {}
+    try:
+        return user._organization_roles
+    except AttributeError:
+        user._organization_roles = cached_roles(user.pk)
+        return user._organization_roles
+
+
+def set_user_roles(user, roles):
+    """Provide the roles of a user for this request, e.g. from token claims."""
+    user._organization_roles = roles
+
+
+def get_role(user, organization):
+    """The user's role in an organization (instance or id), None if not a member."""
+    return user_roles(user).get(str(getattr(organization, "pk", organization)))
+
+
+def has_role(user, organization, allowed_roles):
+    return get_role(user, organization) in allowed_roles
+
+
+def invalidate_roles(user_id):
+    with _lock:
+        _roles.pop(user_id, None)
@@ -0,0 +1,18 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from authentication.models import CustomUser
+
+from .models import OrganizationMembership
+from .roles import invalidate_roles
+
+
+@receiver(post_save, sender=OrganizationMembership)
+@receiver(post_delete, sender=OrganizationMembership)
+def evict_cached_roles(sender, instance, **kwargs):
+    invalidate_roles(instance.user_id)
+    # role claims in the user's access tokens are stale from now on
+    CustomUser.objects.filter(pk=instance.user_id).update(
+        membership_version=F("membership_version") + 1
+    )
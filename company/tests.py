@@ -1,3 +1,65 @@
 from django.test import TestCase
 
-# Create your tests here.
+from authentication.models import CustomUser
+
+from . import roles
+from .models import Company, Organization, OrganizationMembership
+
+
+class RoleCacheTests(TestCase):
+    """Membership writes evict the user's cached roles."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(email="admin@example.com")
+        company = Company.objects.create(name="acme", owner=cls.user)
+        cls.organization = Organization.objects.create(name="acme", company=company)
+        cls.other = Organization.objects.create(name="other", company=company)
+        cls.membership = OrganizationMembership.objects.create(
+            user=cls.user, organization=cls.organization, role="admin"
+        )
+
+    def setUp(self):
+        # the process-wide role cache outlives each test's transaction
+        roles._roles.clear()
+        self.addCleanup(roles._roles.clear)
+
+    def assertCachedRoles(self, expected):
+        # one query to load the roles, none while they are cached
+        with self.assertNumQueries(1):
+            self.assertEqual(roles.cached_roles(self.user.pk), expected)
+        with self.assertNumQueries(0):
+            self.assertEqual(roles.cached_roles(self.user.pk), expected)
+
+    def test_roles_are_reloaded_after_a_membership_is_created(self):
+        self.assertCachedRoles({str(self.organization.id): "admin"})
+        OrganizationMembership.objects.create(
+            user=self.user, organization=self.other, role="member"
+        )
+        self.assertCachedRoles(
+            {str(self.organization.id): "admin", str(self.other.id): "member"}
+        )
+
+    def test_roles_are_reloaded_after_a_role_change(self):
+        self.assertCachedRoles({str(self.organization.id): "admin"})
+        self.membership.role = "member"
+        self.membership.save()
+        self.assertCachedRoles({str(self.organization.id): "member"})
+
+    def test_roles_are_reloaded_after_a_membership_is_deleted(self):
+        self.assertCachedRoles({str(self.organization.id): "admin"})
+        self.membership.delete()
+        self.assertCachedRoles({})
+
+    def test_other_users_stay_cached(self):
+        other_user = CustomUser.objects.create_user(email="member@example.com")
+        self.assertEqual(roles.cached_roles(other_user.pk), {})
+        self.membership.delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(roles.cached_roles(other_user.pk), {})
+
+    def test_expired_roles_are_reloaded(self):
+        with self.settings(ROLE_CACHE_TTL=0):
+            roles.cached_roles(self.user.pk)
+            with self.assertNumQueries(1):
+                roles.cached_roles(self.user.pk)
@@ -20,6 +20,7 @@ from company.models import (
     Organization,
     OrganizationMembership,
 )
+from company.roles import ADMIN_ROLES, has_role
 from company.serializers.company import CompanySerializer
 from company.serializers.org import (
     InvitationSerializer,
@@ -36,11 +37,6 @@ class OrganizationViewSet(viewsets.ModelViewSet):
     serializer_class = OrganizationSerializer
     permission_classes = [permissions.IsAuthenticated]
 
-    def _has_role(self, user, organization, allowed_roles):
-        return OrganizationMembership.objects.filter(
-            user=user, organization=organization, role__in=allowed_roles
-        ).exists()
-
     def get_queryset(self):
         """Retrieve only organizations where the user is a member"""
         # TODO: optimize with serializers
@@ -80,7 +76,7 @@ class OrganizationViewSet(viewsets.ModelViewSet):
     def update(self, request, *args, **kwargs):
         organization = self.get_object()
         if (
-            not self._has_role(request.user, organization, ["owner", "admin"])
+            not has_role(request.user, organization, ADMIN_ROLES)
             and not request.user.is_staff
         ):
             raise PermissionDenied("You are not allowed to update this organization.")
@@ -92,7 +88,7 @@ class OrganizationViewSet(viewsets.ModelViewSet):
     def destroy(self, request, *args, **kwargs):
         organization = self.get_object()
         if (
-            not self._has_role(request.user, organization, ["owner"])
+            not has_role(request.user, organization, ["owner"])
             and not request.user.is_staff
         ):
             raise PermissionDenied("Only owners can delete the organization.")
@@ -167,11 +163,6 @@ class InviteUserView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = InviteUserSerializer
 
-    def _has_role(self, user, organization, allowed_roles):
-        return OrganizationMembership.objects.filter(
-            user=user, organization=organization, role__in=allowed_roles
-        ).exists()
-
     @extend_schema(
         summary="Invite a user to an organization.",
         description="Expects email and an optional role whick defaults to 'member' if ignored.",
@@ -198,7 +189,7 @@ class InviteUserView(APIView):
             organization = Organization.objects.get(id=org_id)
 
             if (
-                not self._has_role(request.user, organization, ["admin", "owner"])
+                not has_role(request.user, organization, ADMIN_ROLES)
                 and not request.user.is_staff
             ):
                 return Response(
@@ -322,13 +313,8 @@ class DeleteInvitationView(APIView):
         try:
             invitation = Invitation.objects.get(id=id)
 
-            # TODO: refactor permission
             if (
-                not OrganizationMembership.objects.filter(
-                    user=request.user,
-                    organization=invitation.organization,
-                    role__in=["admin", "owner"],
-                ).exists()
+                not has_role(request.user, invitation.organization_id, ADMIN_ROLES)
                 and not request.user.is_staff
             ):
                 return Response(
@@ -383,13 +369,8 @@ class UpdateMembershipRoleView(APIView):
                 {"error": "Organization not found."}, status=status.HTTP_404_NOT_FOUND
             )
 
-        # TODO: refactor this, simple fix
         if (
-            not OrganizationMembership.objects.filter(
-                user=request.user,
-                organization=organization,
-                role__in=["admin", "owner"],
-            ).exists()
+            not has_role(request.user, organization, ADMIN_ROLES)
             and not request.user.is_staff
         ):
             return Response(
@@ -437,13 +418,8 @@ class RemoveMemberView(APIView):
                 {"error": "Organization not found."}, status=status.HTTP_404_NOT_FOUND
             )
 
-        # FIX: This too
         if (
-            not OrganizationMembership.objects.filter(
-                user=request.user,
-                organization=organization,
-                role__in=["admin", "owner"],
-            ).exists()
+            not has_role(request.user, organization, ADMIN_ROLES)
             and not request.user.is_staff
         ):
             return Response(
@@ -0,0 +1,74 @@
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from prometheus_client import Histogram
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+vendor_request_latency = Histogram(
+    "vendor_http_request_seconds",
+    "Latency of outbound HTTP calls to cloud vendors",
+    ["vendor", "endpoint", "status"],
+)
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class VendorSession(requests.Session):
+    """
+    requests.Session for one vendor's APIs: keep-alive connection pools per
+    host, a default timeout, retries with backoff on 429/5xx for idempotent
+    methods (honouring Retry-After), and a latency histogram.
+
+    Pass ``endpoint=`` to label the latency of a call, it defaults to the
+    host. Keep it low cardinality: no ids in it.
+    """
+
+    def __init__(self, vendor):
+        super().__init__()
+        self.vendor = vendor
+        self.timeout = (settings.HTTP_CONNECT_TIMEOUT, settings.HTTP_READ_TIMEOUT)
+        retry = Retry(
+            total=settings.HTTP_RETRY_TOTAL,
+            backoff_factor=settings.HTTP_RETRY_BACKOFF,
+            status_forcelist=RETRY_STATUSES,
+            respect_retry_after_header=True,
+            # hand the last response back to the caller instead of raising
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=settings.HTTP_POOL_CONNECTIONS,
+            pool_maxsize=settings.HTTP_POOL_MAXSIZE,
+            max_retries=retry,
+        )
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+    def request(self, method, url, *args, endpoint=None, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        endpoint = endpoint or urlsplit(url).hostname
+        status = "error"
+        started = time.perf_counter()
+        try:
+            response = super().request(method, url, *args, **kwargs)
+            status = str(response.status_code)
+            return response
+        finally:
+            vendor_request_latency.labels(self.vendor, endpoint, status).observe(
+                time.perf_counter() - started
+            )
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def vendor_session(vendor):
+    """The process-wide VendorSession of ``vendor`` (gcp, azure, google...)."""
+    with _sessions_lock:
+        if vendor not in _sessions:
+            _sessions[vendor] = VendorSession(vendor)
+        return _sessions[vendor]
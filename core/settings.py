@@ -122,6 +122,41 @@ else:
         }
     }
 
+# cache backend: `locmem` (per process, LRU), `file` (CACHE_LOCATION is a
+# directory) or `redis` (CACHE_LOCATION is a redis:// URL, needs the `redis`
+# package; set its maxmemory-policy to allkeys-lru for LRU eviction)
+CACHE_BACKEND = env("CACHE_BACKEND", "locmem")
+CACHE_LOCATION = env("CACHE_LOCATION", "")
+CACHE_MAX_ENTRIES = int(env("CACHE_MAX_ENTRIES", 5000))
+CACHE_TIMEOUT = int(env("CACHE_TIMEOUT", 300))
+
+if CACHE_BACKEND == "redis":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_LOCATION or "redis://localhost:6379/0",
+            "TIMEOUT": CACHE_TIMEOUT,
+            "KEY_PREFIX": "realbi",
+        }
+    }
+elif CACHE_BACKEND == "file":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": CACHE_LOCATION or "/var/tmp/django_cache",
+            "TIMEOUT": CACHE_TIMEOUT,
+            "OPTIONS": {"MAX_ENTRIES": CACHE_MAX_ENTRIES},
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "TIMEOUT": CACHE_TIMEOUT,
+            "OPTIONS": {"MAX_ENTRIES": CACHE_MAX_ENTRIES},
+        }
+    }
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
         "rest_framework.authentication.BasicAuthentication",
@@ -129,7 +164,7 @@ REST_FRAMEWORK = {
         "rest_framework_simplejwt.authentication.JWTAuthentication",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "authentication.tokens.OrgRoleJWTAuthentication",
     ),
     # "DEFAULT_PERMISSION_CLASSES": [],
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
@@ -206,8 +241,13 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
     "AUTH_HEADER_TYPES": ("Bearer",),
     # "AUTH_USER_MODEL": "authentication.User",
+    "TOKEN_OBTAIN_SERIALIZER": "authentication.serializers.TokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "authentication.serializers.TokenRefreshSerializer",
 }
 
+# embed the user's organization roles in access tokens (authentication.tokens)
+JWT_ORG_ROLE_CLAIMS = env("JWT_ORG_ROLE_CLAIMS", False) == "True"
+
 
 SPECTACULAR_SETTINGS = {
     "TITLE": "NumLK Documentation",
@@ -263,3 +303,98 @@ SITE_NAME = os.getenv("SITE_NAME", "Default Site Name")
 AZURE_DATA_CLIENT_ID = "abc"
 AZURE_DATA_CLIENT_SECRET = "abs"
 AZURE_DATA_REDIRECT_URI = "https://www.google.com"
+
+
+# ingestion
+BILLING_INGEST_BATCH_SIZE = int(env("BILLING_INGEST_BATCH_SIZE", 1000))
+BILLING_EXPORT_CHUNK_SIZE = int(env("BILLING_EXPORT_CHUNK_SIZE", 2000))
+BILLING_PARQUET_ROW_GROUP_SIZE = int(env("BILLING_PARQUET_ROW_GROUP_SIZE", 50000))
+BILLING_PARQUET_COMPRESSION = env("BILLING_PARQUET_COMPRESSION", "zstd")
+
+# background jobs
+JOB_MAX_ATTEMPTS = int(env("JOB_MAX_ATTEMPTS", 5))
+JOB_RETRY_BASE_SECONDS = int(env("JOB_RETRY_BASE_SECONDS", 30))
+JOB_RETRY_MAX_SECONDS = int(env("JOB_RETRY_MAX_SECONDS", 3600))
+# a running job's lease, renewed by its worker every poll; a job whose lease
+# expired lost its worker and is retried
+JOB_LEASE_SECONDS = int(env("JOB_LEASE_SECONDS", 300))
+INGEST_WORKER_CONCURRENCY = int(env("INGEST_WORKER_CONCURRENCY", 4))
+INGEST_WORKER_POLL_SECONDS = float(env("INGEST_WORKER_POLL_SECONDS", 5))
+
+# refresh fan-out: pool size per organization refresh, and the most
+# accounts of one vendor refreshed at once in a worker process
+REFRESH_MAX_WORKERS = int(env("REFRESH_MAX_WORKERS", 8))
+REFRESH_VENDOR_CONCURRENCY = {
+    "aws": int(env("REFRESH_AWS_CONCURRENCY", 4)),
+    "azure": int(env("REFRESH_AZURE_CONCURRENCY", 2)),
+    "gcp": int(env("REFRESH_GCP_CONCURRENCY", 2)),
+}
+
+# AWS assumed-role credential/client cache
+AWS_CLIENT_CACHE_SIZE = int(env("AWS_CLIENT_CACHE_SIZE", 256))
+AWS_CREDENTIAL_REFRESH_SECONDS = int(env("AWS_CREDENTIAL_REFRESH_SECONDS", 300))
+
+# outbound HTTP to cloud vendors (core.http)
+HTTP_CONNECT_TIMEOUT = float(env("HTTP_CONNECT_TIMEOUT", 5))
+HTTP_READ_TIMEOUT = float(env("HTTP_READ_TIMEOUT", 60))
+HTTP_RETRY_TOTAL = int(env("HTTP_RETRY_TOTAL", 3))
+HTTP_RETRY_BACKOFF = float(env("HTTP_RETRY_BACKOFF", 0.5))
+HTTP_POOL_CONNECTIONS = int(env("HTTP_POOL_CONNECTIONS", 10))
+HTTP_POOL_MAXSIZE = int(env("HTTP_POOL_MAXSIZE", 10))
+
+# Azure usageDetails ingestion: subscriptions fetched at once per account
+AZURE_SUBSCRIPTION_CONCURRENCY = int(env("AZURE_SUBSCRIPTION_CONCURRENCY", 4))
+
+# GCP ingestion: projects fetched at once per account
+GCP_PROJECT_CONCURRENCY = int(env("GCP_PROJECT_CONCURRENCY", 8))
+
+# CUR/FOCUS report ingestion
+CUR_BUCKET_NAME = env("CUR_BUCKET_NAME", "numlock-public-bucket-1")
+CUR_SPOOL_MAX_BYTES = int(env("CUR_SPOOL_MAX_BYTES", 64 * 1024 * 1024))
+
+# BillingRecord partitioning (Postgres, `manage.py partition_billing_records`)
+BILLING_PARTITION_MONTHS_AHEAD = int(env("BILLING_PARTITION_MONTHS_AHEAD", 3))
+
+# billing data retention tiers (`manage.py compact_billing_data`), 0 keeps all:
+# raw BillingRecords for N days, DailyCostRollup for N months, then monthly;
+# expired raw months of a partitioned BillingRecord are dropped with their
+# partition
+BILLING_RAW_RETENTION_DAYS = int(env("BILLING_RAW_RETENTION_DAYS", 0))
+BILLING_DAILY_RETENTION_MONTHS = int(env("BILLING_DAILY_RETENTION_MONTHS", 0))
+
+# cached aggregate responses, also invalidated by every ingestion write
+AGGREGATE_CACHE_TTL = int(env("AGGREGATE_CACHE_TTL", CACHE_TIMEOUT))
+# Cache-Control of ETagged aggregate responses; they are per organization,
+# use "public, s-maxage=..." only behind a CDN that keys on Authorization
+AGGREGATE_CACHE_CONTROL = env("AGGREGATE_CACHE_CONTROL", "private, max-age=60")
+
+# per-process cache of users' organization roles (company.roles)
+ROLE_CACHE_TTL = int(env("ROLE_CACHE_TTL", 30))
+ROLE_CACHE_SIZE = int(env("ROLE_CACHE_SIZE", 10000))
+
+# cached per-user unread notification count (_platform.services)
+NOTIFICATION_UNREAD_CACHE_TTL = int(env("NOTIFICATION_UNREAD_CACHE_TTL", 300))
+
+# notification fan-out (_platform.services): NotificationRead rows per INSERT,
+# and the job kinds whose outcome is notified to the organization's admins
+NOTIFICATION_FANOUT_BATCH_SIZE = int(env("NOTIFICATION_FANOUT_BATCH_SIZE", 1000))
+JOB_NOTIFY_KINDS = env(
+    "JOB_NOTIFY_KINDS", "org_refresh,aws_backfill,aws_cur_ingest,azure_fetch,gcp_fetch"
+).split(",")
+
+# notification push (_platform.pubsub): the broker reaching the streams.
+# Notifications are fanned out by the worker, so only a cross-process broker
+# (`_platform.pubsub.PostgresBroker`) reaches the web processes' streams; the
+# local one is the fallback of the SQLite backend
+NOTIFICATION_BROKER = env(
+    "NOTIFICATION_BROKER",
+    "_platform.pubsub.PostgresBroker" if USE_PG else "_platform.pubsub.LocalBroker",
+)
+NOTIFICATION_STREAM_HEARTBEAT_SECONDS = int(
+    env("NOTIFICATION_STREAM_HEARTBEAT_SECONDS", 15)
+)
+NOTIFICATION_STREAM_MAX_SECONDS = int(env("NOTIFICATION_STREAM_MAX_SECONDS", 300))
+NOTIFICATION_STREAM_RETRY_MS = int(env("NOTIFICATION_STREAM_RETRY_MS", 3000))
+NOTIFICATION_STREAM_BACKLOG = int(env("NOTIFICATION_STREAM_BACKLOG", 100))
+# lifetime of the tickets opening a stream, passed in its URL
+NOTIFICATION_STREAM_TICKET_SECONDS = int(env("NOTIFICATION_STREAM_TICKET_SECONDS", 60))
@@ -3,11 +3,16 @@ from django.contrib import admin
 from .models import (
     AWSRole,
     AzureOAuthToken,
+    BackgroundJob,
     BillingRecord,
     CloudAccount,
     CustomExpense,
     CustomExpenseVendor,
+    DailyCostRollup,
     GoogleOAuthToken,
+    IngestionState,
+    MonthlyCostRollup,
+    OrganizationDataVersion,
 )
 
 # Register your models here.
@@ -15,6 +20,11 @@ admin.site.register(CloudAccount)
 admin.site.register(CustomExpense)
 admin.site.register(CustomExpenseVendor)
 admin.site.register(BillingRecord)
+admin.site.register(DailyCostRollup)
+admin.site.register(MonthlyCostRollup)
 admin.site.register(GoogleOAuthToken)
 admin.site.register(AzureOAuthToken)
 admin.site.register(AWSRole)
+admin.site.register(BackgroundJob)
+admin.site.register(IngestionState)
+admin.site.register(OrganizationDataVersion)
@@ -1,38 +1,58 @@
-from django.db.models import Sum
+from collections import defaultdict
+
+from django.db.models import Max, Sum
 from django.utils.timezone import now
 
-from company.models import Organization
-from data.models import BillingRecord, CloudAccount
+from data.models import CloudAccount
+
+from .engine import daily_rollups, rollups
 
 
 def get_account_totals(organization_id, since, until):
+    return get_account_totals_by_orgs([organization_id], since, until)[organization_id]
+
+
+def get_account_totals_by_orgs(organization_ids, since, until):
+    """
+    Today's and the period's cost of every account of each organization,
+    ``{organization_id: {account_id: totals}}``, in three queries however
+    many organizations and accounts there are. Unknown organizations map to
+    ``{}``. Whole-month periods are read from the monthly rollup, like the
+    other summaries, so they outlive the expiry of their daily rows.
+    """
     today = now().date()
-    response = {}
-    organization = Organization.objects.get(pk=organization_id)
 
-    cloud_account_ids = list(
-        CloudAccount.objects.filter(organization=organization).values_list(
-            "id", flat=True
-        )
-    )
-    for cloud_account_id in cloud_account_ids:
-        qs = BillingRecord.objects.filter(cloud_account_id=cloud_account_id)
+    accounts = CloudAccount.objects.filter(
+        organization_id__in=organization_ids
+    ).values_list("organization_id", "id")
+    account_ids = defaultdict(list)
+    for organization_id, account_id in accounts:
+        account_ids[str(organization_id)].append(str(account_id))
 
-        total_today = (
-            qs.filter(usage_start__date=today).aggregate(total=Sum("cost"))["total"]
-            or 0
+    def totals_by_account(queryset):
+        rows = (
+            queryset.filter(cloud_account__organization_id__in=organization_ids)
+            .values("cloud_account_id")
+            .annotate(currency=Max("currency"), total=Sum("cost"))
+            .order_by()
         )
+        return {str(row.pop("cloud_account_id")): row for row in rows}
 
-        total_period = (
-            qs.filter(
-                usage_start__date__gte=since, usage_start__date__lte=until
-            ).aggregate(total=Sum("cost"))["total"]
-            or 0
-        )
-        response[str(cloud_account_id)] = {
-            "currency": qs[0].currency if qs and qs[0].currency else "USD",
-            "total_today": total_today,
-            "total_period": total_period,
-        }
+    today_totals = totals_by_account(daily_rollups(today, today))
+    period_totals = totals_by_account(rollups(since, until, grain="month"))
+
+    response = {}
+    for organization_id in organization_ids:
+        response[organization_id] = {}
+        for account_id in account_ids[str(organization_id)]:
+            today_row = today_totals.get(account_id, {})
+            period_row = period_totals.get(account_id, {})
+            response[organization_id][account_id] = {
+                "currency": period_row.get("currency")
+                or today_row.get("currency")
+                or "USD",
+                "total_today": today_row.get("total") or 0,
+                "total_period": period_row.get("total") or 0,
+            }
 
     return response
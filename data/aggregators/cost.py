@@ -1,115 +1,73 @@
 from django.db.models import Sum
-from django.db.models.functions import TruncDay
 from django.utils.timezone import now
 
-from company.models import Organization
-from data.models import CloudAccount
-
-# from datetime import timedelta
-# from .utils import parse_date_range
-from ..models import BillingRecord  # adjust import path if needed
+from .engine import (
+    aggregate_by_account,
+    group_by_account,
+    org_account_ids,
+    org_daily_rollups,
+    org_rollups,
+)
 
 
 def get_cost_by_service(organization_id, since, until):
-    response = {}
-    organization = Organization.objects.get(pk=organization_id)
-
-    cloud_account_ids = list(
-        CloudAccount.objects.filter(organization=organization).values_list(
-            "id", flat=True
-        )
+    return aggregate_by_account(
+        organization_id,
+        since,
+        until,
+        fields=("currency", "service_name"),
+        order_by=("-total_cost",),
+        grain="month",
+        total_cost=Sum("cost"),
     )
-    for cloud_account_id in cloud_account_ids:
-        response[str(cloud_account_id)] = list(
-            BillingRecord.objects.filter(
-                cloud_account_id=cloud_account_id,
-                usage_start__date__gte=since,
-                usage_start__date__lte=until,
-            )
-            .values("currency", "service_name")
-            .annotate(total_cost=Sum("cost"))
-            .order_by("-total_cost")
-        )
-    return response
 
 
 def get_cost_by_region(organization_id, since, until):
-    response = {}
-    organization = Organization.objects.get(pk=organization_id)
-
-    cloud_account_ids = list(
-        CloudAccount.objects.filter(organization=organization).values_list(
-            "id", flat=True
-        )
+    return aggregate_by_account(
+        organization_id,
+        since,
+        until,
+        fields=("currency", "region"),
+        order_by=("-total_cost",),
+        grain="month",
+        total_cost=Sum("cost"),
     )
-    for cloud_account_id in cloud_account_ids:
-        response[str(cloud_account_id)] = list(
-            BillingRecord.objects.filter(
-                cloud_account_id=cloud_account_id,
-                usage_start__date__gte=since,
-                usage_start__date__lte=until,
-            )
-            .values("currency", "region")
-            .annotate(total_cost=Sum("cost"))
-            .order_by("-total_cost")
-        )
-
-    return response
 
 
 def get_daily_costs(organization_id, since, until):
-    response = {}
-    organization = Organization.objects.get(pk=organization_id)
-
-    cloud_account_ids = list(
-        CloudAccount.objects.filter(organization=organization).values_list(
-            "id", flat=True
-        )
+    return aggregate_by_account(
+        organization_id,
+        since,
+        until,
+        fields=("currency", "day"),
+        order_by=("day",),
+        total_cost=Sum("cost"),
     )
-    for cloud_account_id in cloud_account_ids:
-        response[str(cloud_account_id)] = list(
-            BillingRecord.objects.filter(
-                cloud_account_id=cloud_account_id,
-                usage_start__date__gte=since,
-                usage_start__date__lte=until,
-            )
-            .annotate(day=TruncDay("usage_start"))
-            .values("currency", "day")
-            .annotate(total_cost=Sum("cost"))
-            .order_by("day")
-        )
-    return response
 
 
 def get_cost_summary_by_service(organization_id, since, until):
-    response = {}
-    organization = Organization.objects.get(pk=organization_id)
-
-    cloud_account_ids = list(
-        CloudAccount.objects.filter(organization=organization).values_list(
-            "id", flat=True
-        )
-    )
-
+    account_ids = org_account_ids(organization_id)
     today = now().date()
 
-    for cloud_account_id in cloud_account_ids:
-        qs = CloudAccount.objects.get(id=cloud_account_id).billing_records
-
-        today_total = (
-            qs.filter(usage_start__date=today)
-            .values("service_name")
-            .annotate(total_cost=Sum("cost"))
-        )
-
-        period_total = (
-            qs.filter(usage_start__date__gte=since, usage_start__date__lte=until)
-            .values("currency", "service_name")
-            .annotate(total_cost=Sum("cost"))
-        )
+    today_total = group_by_account(
+        account_ids,
+        org_daily_rollups(organization_id, today, today)
+        .values("cloud_account_id", "service_name")
+        .annotate(total_cost=Sum("cost"))
+        .order_by(),
+    )
+    period_total = group_by_account(
+        account_ids,
+        org_rollups(organization_id, since, until, grain="month")
+        .values("cloud_account_id", "currency", "service_name")
+        .annotate(total_cost=Sum("cost"))
+        .order_by(),
+    )
 
-        response[str(cloud_account_id)] = {
-            "total_today": today_total,
-            "total_period": period_total,
+    return {
+        account_id: {
+            "total_today": today_total[account_id],
+            "total_period": period_total[account_id],
         }
-    return response
+        for account_id in account_ids
+    }
@@ -0,0 +1,138 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import F
+from django.utils.timezone import now
+
+from data.models import CloudAccount, DailyCostRollup, MonthlyCostRollup
+from data.utils.day_range import month_start
+
+
+def org_account_ids(organization_id):
+    """Ids of every cloud account in the organization, as response keys."""
+    return [
+        str(pk)
+        for pk in CloudAccount.objects.filter(
+            organization_id=organization_id
+        ).values_list("id", flat=True)
+    ]
+
+
+def daily_rollups(since=None, until=None):
+    """DailyCostRollup rows, optionally limited to days within [since, until]."""
+    queryset = DailyCostRollup.objects.all()
+    if since is not None:
+        queryset = queryset.filter(day__gte=since)
+    if until is not None:
+        queryset = queryset.filter(day__lte=until)
+    return queryset
+
+
+def monthly_rollups(since=None, until=None):
+    """
+    MonthlyCostRollup rows, optionally limited to months overlapping
+    [since, until]. Each month's first day is exposed as ``day``, like the
+    daily rollup's column.
+    """
+    queryset = MonthlyCostRollup.objects.all()
+    if since is not None:
+        queryset = queryset.filter(month__gte=month_start(since))
+    if until is not None:
+        queryset = queryset.filter(month__lte=until)
+    return queryset.annotate(day=F("month"))
+
+
+def org_daily_rollups(organization_id, since=None, until=None):
+    """
+    DailyCostRollup queryset spanning all of an organization's cloud accounts,
+    optionally limited to days within [since, until]. Prefer this over the raw
+    records whenever a day is the finest grain a query needs.
+    """
+    return daily_rollups(since, until).filter(
+        cloud_account__organization_id=organization_id
+    )
+
+
+def org_monthly_rollups(organization_id, since=None, until=None):
+    """
+    MonthlyCostRollup queryset spanning all of an organization's cloud
+    accounts, optionally limited to months overlapping [since, until].
+    """
+    return monthly_rollups(since, until).filter(
+        cloud_account__organization_id=organization_id
+    )
+
+
+def covers_whole_months(since, until):
+    """
+    Whether [since, until] starts on a first of the month and ends on a last
+    one, or later than today, when the current month's rows are all there is.
+    """
+    if since is None or until is None or since.day != 1:
+        return False
+    return until >= now().date() or (until + timedelta(days=1)).day == 1
+
+
+def rollups(since=None, until=None, grain="day"):
+    """
+    The coarsest rollup tier that answers [since, until] exactly at
+    ``grain`` (``"day"`` or ``"month"``): the monthly rollup for whole
+    months, the daily one otherwise. Both expose ``day``, ``service_name``,
+    ``region``, ``currency``, ``cost`` and ``usage_amount``.
+    """
+    if grain == "month" and covers_whole_months(since, until):
+        return monthly_rollups(since, until)
+    return daily_rollups(since, until)
+
+
+def org_rollups(organization_id, since=None, until=None, grain="day"):
+    """``rollups`` spanning all of an organization's cloud accounts."""
+    return rollups(since, until, grain).filter(
+        cloud_account__organization_id=organization_id
+    )
+
+
+def group_by_account(account_ids, rows):
+    """
+    Reshape rows of a ``GROUP BY cloud_account_id, ...`` query into the
+    per-account response dict: ``{account_id: [row, ...]}``.
+
+    Every account in ``account_ids`` gets an entry, even without rows, and the
+    query's ordering is preserved within each account.
+    """
+    grouped = defaultdict(list)
+    for row in rows:
+        account_id = str(row.pop("cloud_account_id"))
+        grouped[account_id].append(row)
+    return {account_id: grouped[account_id] for account_id in account_ids}
+
+
+def aggregate_by_account(
+    organization_id,
+    since,
+    until,
+    fields,
+    order_by,
+    expressions=None,
+    grain="day",
+    **totals,
+):
+    """
+    Run one grouped aggregate over all of an organization's accounts.
+
+    ``fields`` are the GROUP BY columns (besides the account) and may name
+    entries of ``expressions`` (e.g. ``{"month_start": TruncMonth("day")}``);
+    ``totals`` are the aggregate expressions over the rollup ``org_rollups``
+    picks for ``grain``, the finest granularity the query needs. Returns
+    ``{account_id: [row, ...]}`` in two queries regardless of the number of
+    accounts.
+    """
+    account_ids = org_account_ids(organization_id)
+    rows = (
+        org_rollups(organization_id, since, until, grain)
+        .annotate(**(expressions or {}))
+        .values("cloud_account_id", *fields)
+        .annotate(**totals)
+        .order_by(*order_by)
+    )
+    return group_by_account(account_ids, rows)
@@ -1,78 +1,52 @@
 from collections import defaultdict
 
 from django.db.models import DecimalField, Sum, Value
-from django.db.models.functions import Coalesce, TruncDay, TruncMonth
+from django.db.models.functions import Coalesce, TruncMonth
 
-from company.models import Organization
-from data.models import BillingRecord, CloudAccount
+from .engine import aggregate_by_account
 
 
 # for ever?
 def get_usage_by_service_and_day(organization_id, since, until):
-    response = {}
-    organization = Organization.objects.get(pk=organization_id)
-
-    cloud_account_ids = list(
-        CloudAccount.objects.filter(organization=organization).values_list(
-            "id", flat=True
-        )
+    rows_by_account = aggregate_by_account(
+        organization_id,
+        since,
+        until,
+        fields=("service_name", "day"),
+        order_by=("day",),
+        total_usage=Sum("usage_amount"),
     )
-    for cloud_account_id in cloud_account_ids:
-        response[str(cloud_account_id)] = (
-            list(
-                BillingRecord.objects.filter(
-                    cloud_account_id=cloud_account_id,
-                    usage_start__date__gte=since,
-                    usage_start__date__lte=until,
-                )
-                .annotate(day=TruncDay("usage_start"))
-                .values("service_name", "day")
-                .annotate(total_usage=Sum("usage_amount"))
-                .order_by("day")
-            ),
-        )
-
-    return response
+    return {account_id: (rows,) for account_id, rows in rows_by_account.items()}
 
 
 def get_monthly_service_totals(organization_id, since, until):
-    response = {}
-    organization = Organization.objects.get(pk=organization_id)
-
-    cloud_account_ids = list(
-        CloudAccount.objects.filter(organization=organization).values_list(
-            "id", flat=True
-        )
+    rows_by_account = aggregate_by_account(
+        organization_id,
+        since,
+        until,
+        fields=("service_name", "month_start", "currency"),
+        order_by=("service_name", "month_start"),
+        expressions={"month_start": TruncMonth("day")},
+        grain="month",
+        total_usage=Coalesce(
+            Sum("usage_amount"), Value(0, output_field=DecimalField())
+        ),
+        total_cost=Coalesce(Sum("cost"), Value(0, output_field=DecimalField())),
     )
-    for cloud_account_id in cloud_account_ids:
-        queryset = (
-            BillingRecord.objects.filter(
-                cloud_account_id=cloud_account_id,
-                usage_start__date__gte=since,
-                usage_start__date__lte=until,
-            )
-            .annotate(month=TruncMonth("usage_start"))
-            .values("service_name", "month", "currency")
-            .annotate(
-                total_usage=Coalesce(
-                    Sum("usage_amount"), Value(0, output_field=DecimalField())
-                ),
-                total_cost=Coalesce(Sum("cost"), Value(0, output_field=DecimalField())),
-            )
-            .order_by("service_name", "month")
-        )
 
+    response = {}
+    for account_id, rows in rows_by_account.items():
         grouped = defaultdict(list)
-        for row in queryset:
+        for row in rows:
             grouped[row["service_name"]].append(
                 {
                     "currency": row["currency"],
-                    "month": row["month"],
+                    "month": row["month_start"],
                     "total_usage": float(row["total_usage"]),
                     "total_cost": float(row["total_cost"]),
                 }
             )
-        response[str(cloud_account_id)] = (
+        response[account_id] = (
             [{"service_name": k, "monthly": v} for k, v in grouped.items()],
         )
 
@@ -1,29 +1,131 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
 import boto3
 from botocore.exceptions import ClientError
-from django.db import transaction
-from django.http import JsonResponse
+from django.conf import settings
 
+from ..metrics import aws_client_cache_counter
 from ..models import BillingRecord
+from ..services.ingestion import write_billing_records
 from ..utils.sanitize_cur_report_name import sanitize_report_name
 
 
+class AssumedRoleClientCache:
+    """
+    Process-wide LRU cache of assumed-role credentials and the boto3 clients
+    built from them.
+
+    Credentials are keyed by (role_arn, external_id) and clients by
+    (role_arn, external_id, client_type). Both are rebuilt once the
+    credentials get within ``refresh_margin`` of their STS Expiration, so
+    callers never receive a client about to expire. boto3 clients are
+    thread safe and can be shared by the refresh pool threads.
+    """
+
+    role_lock_stripes = 64
+
+    def __init__(self, maxsize=None, refresh_margin=None):
+        self.maxsize = maxsize or settings.AWS_CLIENT_CACHE_SIZE
+        self.refresh_margin = timedelta(
+            seconds=refresh_margin or settings.AWS_CREDENTIAL_REFRESH_SECONDS
+        )
+        self.credentials = OrderedDict()
+        self.clients = OrderedDict()
+        self.lock = threading.Lock()
+        # a fixed array of locks striped by role, so concurrent callers of the
+        # same role share a single AssumeRole while most roles assume in
+        # parallel; unlike a lock per role it never grows
+        self.role_locks = [threading.RLock() for _ in range(self.role_lock_stripes)]
+        self.sts = None
+
+    def fresh(self, expiration):
+        return expiration - self.refresh_margin > datetime.now(timezone.utc)
+
+    def lookup(self, cache, key, kind, count=True):
+        with self.lock:
+            entry = cache.get(key)
+            if entry is not None and self.fresh(entry[1]):
+                cache.move_to_end(key)
+                if count:
+                    aws_client_cache_counter.labels(kind, "hit").inc()
+                return entry[0]
+        if count:
+            aws_client_cache_counter.labels(kind, "miss").inc()
+        return None
+
+    def store(self, cache, key, value, expiration):
+        with self.lock:
+            cache[key] = (value, expiration)
+            cache.move_to_end(key)
+            while len(cache) > self.maxsize:
+                cache.popitem(last=False)
+
+    def role_lock(self, role_key):
+        return self.role_locks[hash(role_key) % len(self.role_locks)]
+
+    def assume_role(self, role_arn, external_id, role_session_name):
+        with self.lock:
+            if self.sts is None:
+                self.sts = boto3.client("sts")
+        return self.sts.assume_role(
+            RoleArn=role_arn,
+            RoleSessionName=role_session_name,
+            ExternalId=external_id,
+        )["Credentials"]
+
+    def get_credentials(self, role_arn, external_id, role_session_name):
+        role_key = (role_arn, external_id)
+        creds = self.lookup(self.credentials, role_key, "credentials")
+        if creds is None:
+            with self.role_lock(role_key):
+                # another thread may have assumed the role while we waited
+                creds = self.lookup(
+                    self.credentials, role_key, "credentials", count=False
+                )
+                if creds is None:
+                    creds = self.assume_role(role_arn, external_id, role_session_name)
+                    self.store(self.credentials, role_key, creds, creds["Expiration"])
+        return creds
+
+    def get_client(self, role_arn, external_id, client_type, role_session_name):
+        key = (role_arn, external_id, client_type)
+        client = self.lookup(self.clients, key, "client")
+        if client is None:
+            with self.role_lock((role_arn, external_id)):
+                client = self.lookup(self.clients, key, "client", count=False)
+                if client is None:
+                    creds = self.get_credentials(
+                        role_arn, external_id, role_session_name
+                    )
+                    with self.lock:
+                        # the default boto3 session is not thread safe
+                        client = boto3.client(
+                            client_type,
+                            aws_access_key_id=creds["AccessKeyId"],
+                            aws_secret_access_key=creds["SecretAccessKey"],
+                            aws_session_token=creds["SessionToken"],
+                        )
+                    self.store(self.clients, key, client, creds["Expiration"])
+        return client
+
+    def clear(self):
+        with self.lock:
+            self.credentials.clear()
+            self.clients.clear()
+
+
+aws_client_cache = AssumedRoleClientCache()
+
+
 def get_account_aws_client(
     cloud_account, client_type="ce", role_session_name="TenantDataPull"
 ):
-    # TODO: look into this val
-    sts = boto3.client("sts")
     role_vals = cloud_account.aws_role_values
-    creds = sts.assume_role(
-        RoleArn=role_vals.role_arn,
-        RoleSessionName=role_session_name,
-        ExternalId=role_vals.external_id,
-    )["Credentials"]
-
-    return boto3.client(
-        client_type,
-        aws_access_key_id=creds["AccessKeyId"],
-        aws_secret_access_key=creds["SecretAccessKey"],
-        aws_session_token=creds["SessionToken"],
+    return aws_client_cache.get_client(
+        role_vals.role_arn, role_vals.external_id, client_type, role_session_name
     )
 
 
@@ -117,7 +219,7 @@ def create_cur_report(cur_client, cloud_account, bucket_name):
             "aws_response": response,
         }
         print(result)
-        return JsonResponse(result)
+        return result
 
     except ClientError as e:
         result = {
@@ -129,7 +231,7 @@ def create_cur_report(cur_client, cloud_account, bucket_name):
 
         print(result)
 
-        return JsonResponse(result)
+        return result
 
 
 # def create_focus_export(client, account_id, bucket_name):
@@ -240,7 +342,7 @@ def save_billing_data(cloud_account, cost_response):
                 usage_start=usage_start,
                 usage_end=usage_end,
                 service_name=service_name or "",
-                cost_type=usage_type,
+                cost_type=usage_type or "",
                 usage_amount=usage_amount,
                 usage_unit=None,  # AWS doesn’t always provide unit in this API response
                 cost=cost_amount,
@@ -250,68 +352,51 @@ def save_billing_data(cloud_account, cost_response):
         # generate_billing_summaries(cloud_account)
 
 
-def upsert_billing_record(data):
+def parse_cost_explorer_results(cloud_account, cost_response):
     """
-    data: dict with all BillingRecord fields
+    Yield unsaved BillingRecords for the groups of a Cost Explorer
+    ``get_cost_and_usage`` response, skipping zero cost & usage groups.
     """
+    for result_by_time in cost_response.get("ResultsByTime", []):
+        usage_start = datetime.fromisoformat(result_by_time["TimePeriod"]["Start"])
+        usage_end = datetime.fromisoformat(result_by_time["TimePeriod"]["End"])
 
-    defaults = {
-        "cost": data["cost"],
-        "currency": data.get("currency", "USD"),
-        "usage_amount": data.get("usage_amount"),
-        "usage_unit": data.get("usage_unit"),
-        "metadata": data.get("metadata"),
-    }
-
-    obj, created = BillingRecord.objects.update_or_create(
-        cloud_account=data["cloud_account"],
-        usage_start=data["usage_start"],
-        usage_end=data["usage_end"],
-        service_name=data["service_name"],
-        cost_type=data.get("cost_type"),
-        resource=data.get("resource"),
-        defaults=defaults,
-    )
-    return obj, created
-
+        for group in result_by_time.get("Groups", []):
+            keys = group.get("Keys", [])
+            metrics = group["Metrics"]
 
-def save_billing_data_efficient(cloud_account, cost_response):
-    with transaction.atomic():
-        for result_by_time in cost_response.get("ResultsByTime", []):
-            usage_start = result_by_time["TimePeriod"]["Start"]
-            usage_end = result_by_time["TimePeriod"]["End"]
+            cost_amount = Decimal(metrics["UnblendedCost"]["Amount"])
+            usage_amount = Decimal(metrics.get("UsageQuantity", {}).get("Amount", 0))
+            if cost_amount <= 0 and usage_amount <= 0:
+                continue  # skip zero cost & usage
 
-            for group in result_by_time.get("Groups", []):
-                keys = group.get("Keys", [])
-                service_name = keys[0] if len(keys) > 0 else ""
-                cost_type = keys[1] if len(keys) > 1 else None
+            yield BillingRecord(
+                cloud_account=cloud_account,
+                usage_start=usage_start.replace(tzinfo=timezone.utc),
+                usage_end=usage_end.replace(tzinfo=timezone.utc),
+                service_name=keys[0] if len(keys) > 0 else "",
+                cost_type=keys[1] if len(keys) > 1 else "",
+                usage_amount=usage_amount,
+                usage_unit=None,
+                cost=cost_amount,
+                currency="USD",  # Cost Explorer reports USD by default
+            )
 
-                cost_amount = float(group["Metrics"]["UnblendedCost"]["Amount"])
-                usage_amount = float(
-                    group["Metrics"].get("UsageQuantity", {}).get("Amount", 0)
-                )
 
-                if cost_amount <= 0 and usage_amount <= 0:
-                    continue  # skip zero cost & usage
-
-                data = {
-                    "cloud_account": cloud_account,
-                    "usage_start": usage_start,
-                    "usage_end": usage_end,
-                    "service_name": service_name,
-                    "cost_type": cost_type,
-                    "usage_amount": usage_amount,
-                    "usage_unit": None,
-                    "cost": cost_amount,
-                    "currency": "USD",
-                    "resource": None,
-                    "metadata": None,
-                }
-                upsert_billing_record(data)
+def save_billing_data_efficient(cloud_account, cost_response, batch_size=None):
+    """
+    Bulk upsert a Cost Explorer response, ``batch_size`` rows per statement.
+    Returns the inserted and updated row counts.
+    """
+    return write_billing_records(
+        cloud_account,
+        parse_cost_explorer_results(cloud_account, cost_response),
+        batch_size,
+    )
 
 
 def ingest_aws_billing(cloud_account, start_date, end_date):
     # Organization = cloud_account.organization
     client = get_account_aws_client(cloud_account, "ce", "TenantDataPull")
     response = fetch_cost_and_usage(client, start_date, end_date)
-    save_billing_data_efficient(cloud_account, response)
+    return save_billing_data_efficient(cloud_account, response)
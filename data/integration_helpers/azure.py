@@ -0,0 +1,188 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from decimal import Decimal
+from itertools import islice
+
+from django.conf import settings
+from django.utils.timezone import now, timedelta
+
+from core.http import vendor_session
+
+from ..models import AzureOAuthToken, BillingRecord
+from ..services.ingestion import (
+    add_amounts,
+    parse_timestamp,
+    sum_by_key,
+    write_billing_records,
+)
+
+AZURE_MANAGEMENT_URL = "https://management.azure.com"
+SUBSCRIPTIONS_URL = f"{AZURE_MANAGEMENT_URL}/subscriptions?api-version=2020-01-01"
+USAGE_DETAILS_URL = (
+    AZURE_MANAGEMENT_URL + "/subscriptions/{subscription_id}"
+    "/providers/Microsoft.Consumption/usageDetails?api-version=2023-03-01"
+)
+
+
+def iter_azure_pages(http, url, headers, endpoint):
+    """Yield the ``value`` list of every page of a list API, following nextLink."""
+    while url:
+        response = http.get(url, headers=headers, endpoint=endpoint)
+        response.raise_for_status()
+        page = response.json()
+        yield page.get("value", [])
+        url = page.get("nextLink")
+
+
+def parse_usage_details(cloud_account, items):
+    """
+    Yield unsaved BillingRecords for a page of usageDetails, legacy
+    (usageStart/usageEnd) and modern (date) shaped items alike.
+    """
+    for item in items:
+        properties = item.get("properties", {})
+
+        usage_start = parse_timestamp(
+            properties.get("usageStart") or properties["date"]
+        )
+        if properties.get("usageEnd"):
+            usage_end = parse_timestamp(properties["usageEnd"])
+        else:
+            usage_end = usage_start + timedelta(days=1)
+
+        cost = properties.get("cost", properties.get("costInBillingCurrency", 0))
+        quantity = properties.get("quantity")
+        yield BillingRecord(
+            cloud_account=cloud_account,
+            usage_start=usage_start,
+            usage_end=usage_end,
+            service_name=properties.get("meterName")
+            or properties.get("consumedService")
+            or "",
+            project_id=properties.get("subscriptionId"),
+            region=properties.get("resourceLocation"),
+            cost_type=(properties.get("chargeType") or "")[:50],
+            usage_amount=Decimal(str(quantity)) if quantity is not None else None,
+            usage_unit=properties.get("unitOfMeasure"),
+            resource=(
+                properties.get("instanceName") or properties.get("resourceId") or ""
+            )[:255],
+            cost=Decimal(str(cost or 0)),
+            currency=properties.get("billingCurrency")
+            or properties.get("currency")
+            or "USD",
+            metadata=item,
+        )
+
+
+def fetch_subscription_usage(cloud_account, subscription_id, headers):
+    """
+    One subscription's usageDetails as ``{key: BillingRecord}``, the lines
+    sharing a key summed. Runs on a pool thread and never touches the
+    database.
+    """
+    totals = {}
+    pages = iter_azure_pages(
+        vendor_session("azure"),
+        USAGE_DETAILS_URL.format(subscription_id=subscription_id),
+        headers,
+        endpoint="usageDetails",
+    )
+    for items in pages:
+        sum_by_key(parse_usage_details(cloud_account, items), totals)
+    return totals
+
+
+def write_subscription_usage(cloud_account, totals, written):
+    """
+    Upsert one subscription's ``{key: BillingRecord}`` totals. A key that an
+    earlier subscription of the run already wrote is written with that cost
+    and usage added; ``written`` holds those running sums, ``{key: (cost,
+    usage_amount)}``, and is updated in place.
+    """
+    for key, record in totals.items():
+        if key in written:
+            cost, usage_amount = written[key]
+            record.cost += cost
+            record.usage_amount = add_amounts(record.usage_amount, usage_amount)
+        written[key] = (record.cost, record.usage_amount)
+    return write_billing_records(cloud_account, totals.values())
+
+
+def ingest_azure_billing(cloud_account):
+    """
+    Pull usage details of every subscription the account's token can see,
+    AZURE_SUBSCRIPTION_CONCURRENCY subscriptions at a time, and write each
+    subscription as soon as its fetch completes. At most twice that many
+    fetched subscriptions wait to be written at any time.
+
+    usageDetails splits a key (day, meter, charge type, resource) over many
+    lines, so lines are summed per key within a subscription, and keys that
+    several subscriptions share are summed across them through their
+    running totals only; re-ingesting a period replaces its rows instead of
+    adding to them.
+    """
+    token = cloud_account.azure_oauth_token
+
+    # Refresh token if expired
+    if token.is_expired():
+        token = refresh_azure_token(token)
+
+    headers = {"Authorization": f"Bearer {token.access_token}"}
+
+    subscription_ids = [
+        subscription["subscriptionId"]
+        for page in iter_azure_pages(
+            vendor_session("azure"), SUBSCRIPTIONS_URL, headers, "subscriptions"
+        )
+        for subscription in page
+    ]
+
+    max_workers = settings.AZURE_SUBSCRIPTION_CONCURRENCY
+    counts = {"inserted": 0, "updated": 0}
+    written = {}
+    remaining = iter(subscription_ids)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = set()
+        while True:
+            for subscription_id in islice(remaining, 2 * max_workers - len(pending)):
+                pending.add(
+                    pool.submit(
+                        fetch_subscription_usage,
+                        cloud_account,
+                        subscription_id,
+                        headers,
+                    )
+                )
+            if not pending:
+                break
+
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = write_subscription_usage(
+                    cloud_account, future.result(), written
+                )
+                counts["inserted"] += result["inserted"]
+                counts["updated"] += result["updated"]
+
+    return {"subscriptions": len(subscription_ids), **counts}
+
+
+def refresh_azure_token(token: AzureOAuthToken):
+    data = {
+        "client_id": settings.AZURE_DATA_CLIENT_ID,
+        "client_secret": settings.AZURE_DATA_CLIENT_SECRET,
+        "refresh_token": token.refresh_token,
+        "grant_type": "refresh_token",
+        "scope": "https://management.azure.com/.default offline_access",
+    }
+    url = f"https://login.microsoftonline.com/{token.tenant_id}/oauth2/v2.0/token"
+
+    response = vendor_session("azure").post(url, data=data, endpoint="token")
+    if response.status_code == 200:
+        new_data = response.json()
+        token.access_token = new_data["access_token"]
+        token.expires_at = now() + timedelta(seconds=new_data["expires_in"])
+        token.save()
+        return token
+    else:
+        raise Exception("Failed to refresh Azure token", response.text)
@@ -0,0 +1,252 @@
+import csv
+import gzip
+import io
+import json
+import shutil
+import tempfile
+import zipfile
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from pathlib import Path
+
+import boto3
+from django.conf import settings
+from django.db import transaction
+
+from ..models import BillingRecord
+from ..services.ingestion import bulk_upsert_billing_records, sum_by_key
+from ..services.rollup import refresh_daily_rollup
+
+MANIFEST_SUFFIX = "-Manifest.json"
+
+# BillingRecord field -> report column, legacy CUR and FOCUS 1.0
+CUR_COLUMNS = {
+    "usage_start": "lineItem/UsageStartDate",
+    "usage_end": "lineItem/UsageEndDate",
+    "service_name": "product/ProductName",
+    "service_code": "lineItem/ProductCode",
+    "cost_type": "lineItem/UsageType",
+    "resource": "lineItem/ResourceId",
+    "usage_amount": "lineItem/UsageAmount",
+    "usage_unit": "pricing/unit",
+    "cost": "lineItem/UnblendedCost",
+    "currency": "lineItem/CurrencyCode",
+    "region": "product/region",
+    "project_id": "lineItem/UsageAccountId",
+    "charge_type": "lineItem/LineItemType",
+}
+FOCUS_COLUMNS = {
+    "usage_start": "ChargePeriodStart",
+    "usage_end": "ChargePeriodEnd",
+    "service_name": "ServiceName",
+    "service_code": "x_ServiceCode",
+    "cost_type": "x_UsageType",
+    "resource": "ResourceId",
+    "usage_amount": "ConsumedQuantity",
+    "usage_unit": "ConsumedUnit",
+    "cost": "BilledCost",
+    "currency": "BillingCurrency",
+    "region": "RegionId",
+    "project_id": "SubAccountId",
+    "charge_type": "ChargeCategory",
+}
+CUR_TAG_PREFIX = "resourceTags/"
+
+
+class S3ObjectStore:
+    """Read-only view of an S3 bucket."""
+
+    def __init__(self, client, bucket):
+        self.client = client
+        self.bucket = bucket
+
+    def list(self, prefix):
+        """Yield ``(key, last_modified)`` of the objects under ``prefix``."""
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                yield obj["Key"], obj["LastModified"]
+
+    def open(self, key):
+        """A streaming, binary file-like object of the object's body."""
+        return self.client.get_object(Bucket=self.bucket, Key=key)["Body"]
+
+
+class LocalObjectStore:
+    """Object store over a local directory, keys are paths relative to it."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def list(self, prefix):
+        for path in sorted(self.root.rglob("*")):
+            key = path.relative_to(self.root).as_posix()
+            if path.is_file() and key.startswith(prefix):
+                modified = datetime.fromtimestamp(path.stat().st_mtime, timezone.utc)
+                yield key, modified
+
+    def open(self, key):
+        return open(self.root / key, "rb")
+
+
+def s3_report_store(bucket_name=None):
+    """The bucket CUR/FOCUS exports are delivered to, read with our own role."""
+    return S3ObjectStore(boto3.client("s3"), bucket_name or settings.CUR_BUCKET_NAME)
+
+
+def cost_report_prefix(cloud_account):
+    """Where create_cur_report has the account's reports delivered."""
+    return f"{cloud_account.id}/"
+
+
+def object_key(location):
+    """Manifest data file entries are keys (CUR) or s3:// URIs (FOCUS)."""
+    if location.startswith("s3://"):
+        return location.split("/", 3)[3]
+    return location
+
+
+def parse_report_timestamp(value):
+    """Report timestamps, ``20240101T000000.000Z`` or ISO 8601, as aware UTC."""
+    parsed = datetime.fromisoformat(value.replace(" ", "T"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def latest_manifests(store, prefix):
+    """
+    The newest manifest of each billing period under ``prefix``, oldest
+    period first. CUR also keeps per-assembly copies of older deliveries,
+    only the last written one describes the current files.
+    """
+    newest = {}
+    for key, modified in store.list(prefix):
+        if not key.endswith(MANIFEST_SUFFIX):
+            continue
+        with store.open(key) as body:
+            manifest = json.load(body)
+        period = manifest["billingPeriod"]["start"]
+        if period not in newest or modified > newest[period][0]:
+            newest[period] = (modified, manifest)
+
+    return [newest[period][1] for period in sorted(newest)]
+
+
+@contextmanager
+def open_report_file(store, key):
+    """
+    Open a report data file as a text stream, decompressing on the fly.
+
+    GZIP objects stream straight from the body. ZIP needs random access, so
+    the object is first spooled to a temporary file, which only touches disk
+    past CUR_SPOOL_MAX_BYTES.
+    """
+    with ExitStack() as stack:
+        body = stack.enter_context(store.open(key))
+        if key.endswith(".gz"):
+            binary = stack.enter_context(gzip.GzipFile(fileobj=body))
+        elif key.endswith(".zip"):
+            spool = stack.enter_context(
+                tempfile.SpooledTemporaryFile(max_size=settings.CUR_SPOOL_MAX_BYTES)
+            )
+            shutil.copyfileobj(body, spool)
+            spool.seek(0)
+            archive = stack.enter_context(zipfile.ZipFile(spool))
+            binary = stack.enter_context(archive.open(archive.namelist()[0]))
+        else:
+            binary = body
+        yield io.TextIOWrapper(binary, encoding="utf-8", newline="")
+
+
+def report_tags(row, columns):
+    if columns is CUR_COLUMNS:
+        return {
+            name.removeprefix(CUR_TAG_PREFIX): value
+            for name, value in row.items()
+            if name.startswith(CUR_TAG_PREFIX) and value
+        }
+    return json.loads(row.get("Tags") or "{}")
+
+
+def decimal_or_none(value):
+    return Decimal(value) if value else None
+
+
+def parse_report_lines(cloud_account, lines):
+    """
+    Yield unsaved BillingRecords for the line items of a CUR or FOCUS CSV,
+    with the resource id as ``resource`` and the tags in ``metadata``.
+    """
+    reader = csv.DictReader(lines)
+    header = reader.fieldnames or []
+    columns = CUR_COLUMNS if CUR_COLUMNS["usage_start"] in header else FOCUS_COLUMNS
+
+    def value(row, field):
+        return row.get(columns[field]) or ""
+
+    for row in reader:
+        if not value(row, "usage_start"):
+            continue
+        service_name = value(row, "service_name") or value(row, "service_code")
+        yield BillingRecord(
+            cloud_account=cloud_account,
+            usage_start=parse_report_timestamp(value(row, "usage_start")),
+            usage_end=parse_report_timestamp(value(row, "usage_end")),
+            service_name=service_name[:255],
+            project_id=value(row, "project_id") or None,
+            region=value(row, "region") or None,
+            cost_type=value(row, "cost_type")[:50],
+            usage_amount=decimal_or_none(value(row, "usage_amount")),
+            usage_unit=value(row, "usage_unit")[:50] or None,
+            resource=value(row, "resource")[:255],
+            cost=decimal_or_none(value(row, "cost")) or Decimal(0),
+            currency=value(row, "currency") or "USD",
+            metadata={
+                "charge_type": value(row, "charge_type"),
+                "tags": report_tags(row, columns),
+            },
+        )
+
+
+def ingest_cost_report(cloud_account, store, prefix, batch_size=None):
+    """
+    Load the CUR/FOCUS deliveries under ``prefix`` into BillingRecords.
+
+    Each billing period is restated in one transaction: the account's rows
+    of the period are replaced by the line items of its newest manifest
+    (Cost Explorer rows included, the report supersedes them). Files are
+    streamed and their line items summed per key in memory across the whole
+    period, so each total is rounded to the cost column once; the totals are
+    then written ``batch_size`` rows at a time.
+    """
+    totals = {"periods": 0, "files": 0, "records": 0}
+
+    for manifest in latest_manifests(store, prefix):
+        since = parse_report_timestamp(manifest["billingPeriod"]["start"])
+        until = parse_report_timestamp(manifest["billingPeriod"]["end"])
+        data_files = manifest.get("reportKeys") or manifest.get("dataFiles") or []
+
+        # bounded by the period's distinct keys, not its line items
+        records = {}
+        for location in data_files:
+            with open_report_file(store, object_key(location)) as lines:
+                sum_by_key(parse_report_lines(cloud_account, lines), records)
+            totals["files"] += 1
+
+        with transaction.atomic():
+            BillingRecord.objects.filter(
+                cloud_account=cloud_account,
+                usage_start__gte=since,
+                usage_start__lt=until,
+            ).delete()
+            counts = bulk_upsert_billing_records(records.values(), batch_size)
+            totals["records"] += counts["inserted"]
+
+            refresh_daily_rollup(
+                cloud_account, since.date(), (until - timedelta(days=1)).date()
+            )
+        totals["periods"] += 1
+
+    return totals
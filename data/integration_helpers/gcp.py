@@ -0,0 +1,82 @@
+import os
+from datetime import datetime, timezone
+
+from django.utils.timezone import now, timedelta
+from dotenv import load_dotenv
+
+from core.http import vendor_session
+
+from ..models import GoogleOAuthToken
+from ..services.ingestion import ingest_billing_data
+
+load_dotenv()
+
+GOOGLE_DATA_CLIENT_ID = os.getenv("GOOGLE_DATA_CLIENT_ID")
+GOOGLE_DATA_CLIENT_SECRET = os.getenv("GOOGLE_DATA_CLIENT_SECRET")
+
+
+def get_gcp_projects(access_token):
+    url = "https://cloudbilling.googleapis.com/v1/billingAccounts"
+    headers = {"Authorization": f"Bearer {access_token}"}
+    resp = vendor_session("gcp").get(url, headers=headers, endpoint="billingAccounts")
+    resp.raise_for_status()
+    return resp.json().get("billingAccounts", [])
+
+
+def get_gcp_billing_data(access_token, project_id, start_date=None, end_date=None):
+    url = f"https://cloudbilling.googleapis.com/v1/projects/{project_id}/billingInfo"
+    headers = {"Authorization": f"Bearer {access_token}"}
+    resp = vendor_session("gcp").get(url, headers=headers, endpoint="billingInfo")
+    if resp.status_code == 404:
+        # Project billing info not found
+        return None
+    resp.raise_for_status()
+    return resp.json()
+
+
+def ingest_gcp_billing(cloud_account, days=30):
+    """Pull the last ``days`` days of billing data of every GCP project."""
+    token = cloud_account.google_oauth_token
+
+    # Refresh token if expired
+    if token.is_expired():
+        token = refresh_google_token(
+            token, GOOGLE_DATA_CLIENT_ID, GOOGLE_DATA_CLIENT_SECRET
+        )
+
+    end_date = datetime.now(timezone.utc)
+    start_date = end_date - timedelta(days=days)
+
+    return ingest_billing_data(
+        cloud_account=cloud_account,
+        access_token=token.access_token,
+        projects=get_gcp_projects(token.access_token),
+        start_date=start_date,
+        end_date=end_date,
+        get_billing_data_func=get_gcp_billing_data,
+    )
+
+
+def refresh_google_token(token: GoogleOAuthToken, client_id, client_secret):
+    response = vendor_session("gcp").post(
+        "https://oauth2.googleapis.com/token",
+        endpoint="token",
+        data={
+            "client_id": client_id,
+            "client_secret": client_secret,
+            "refresh_token": token.refresh_token,
+            "grant_type": "refresh_token",
+        },
+    )
+
+    if response.status_code == 200:
+        data = response.json()
+        token.access_token = data["access_token"]
+        token.expires_at = now() + timedelta(seconds=data["expires_in"])
+        token.scope = data.get("scope", token.scope)
+        token.token_type = data.get("token_type", token.token_type)
+        token.id_token = data.get("id_token", token.id_token)
+        token.save()
+        return token
+    else:
+        raise Exception("Failed to refresh token", response.text)
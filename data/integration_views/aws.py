@@ -2,6 +2,7 @@
 
 import boto3
 from botocore.exceptions import ClientError
+from django.conf import settings
 from django.utils.timezone import now
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
@@ -10,15 +11,11 @@ from rest_framework.response import Response
 
 from company.models import Organization
 
-from ..integration_helpers.aws import (
-    create_cur_report,
-    create_focus_export,
-    get_account_aws_client,
-    ingest_aws_billing,
-)
+from ..integration_helpers.aws import create_focus_export, get_account_aws_client
 
 # from .aws_utils import fetch_cost_and_usage, get_tenant_aws_client, save_billing_data
 from ..models import AWSRole, CloudAccount
+from ..services.jobs import enqueue_job
 
 # boto3.set_stream_logger("botocore", level=logging.DEBUG)
 
@@ -60,22 +57,27 @@ def aws_register_role_view(request):
         cloud_account=cloud_account, external_id=external_id, role_arn=role_arn
     )
 
-    client = get_account_aws_client(cloud_account, "cur", "SetupCUR")
     today = now().date()
-
     january = today.replace(month=1, day=1)
-    # TODO: make these two processes run async after response (use the connection testing helper )
-    ingest_aws_billing(cloud_account, january, today)
-    create_cur_report(
-        client,
-        cloud_account,
-        "numlock-public-bucket-1",
+    # backfill and CUR setup run on the ingest worker, not in this request
+    backfill = enqueue_job(
+        "aws_backfill",
+        cloud_account=cloud_account,
+        payload={"start_date": january, "end_date": today},
+    )
+    cur_setup = enqueue_job(
+        "aws_cur_setup",
+        cloud_account=cloud_account,
+        payload={"bucket_name": settings.CUR_BUCKET_NAME},
     )
-    # TODO:test here and fetch/ingest data later
-    # ingest_aws_billing(cloud_account, "2025-04-01", "2025-06-01")
 
     return Response(
-        {"message": "AWS Role registered successfully"}, status=status.HTTP_201_CREATED
+        {
+            "message": "AWS Role registered successfully",
+            "cloud_account_id": cloud_account.id,
+            "job_ids": {"backfill": backfill.id, "cur_setup": cur_setup.id},
+        },
+        status=status.HTTP_202_ACCEPTED,
     )
 
 
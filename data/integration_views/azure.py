@@ -1,7 +1,6 @@
 import uuid
 from urllib.parse import urlencode
 
-import requests
 from django.conf import settings
 from django.http import JsonResponse
 from django.shortcuts import redirect
@@ -10,8 +9,10 @@ from rest_framework.decorators import api_view
 from rest_framework.exceptions import ValidationError
 
 from company.models import Organization
+from core.http import vendor_session
 
-from ..models import AzureOAuthToken, BillingRecord, CloudAccount
+from ..models import AzureOAuthToken, CloudAccount
+from ..services.jobs import active_job, enqueue_job
 
 AZURE_AUTH_BASE = "https://login.microsoftonline.com/common/oauth2/v2.0/authorize"
 AZURE_TOKEN_URL = "https://login.microsoftonline.com/common/oauth2/v2.0/token"
@@ -49,7 +50,9 @@ def azure_oauth_callback_view(request):
         "grant_type": "authorization_code",
     }
 
-    response = requests.post(AZURE_TOKEN_URL, data=token_data)
+    response = vendor_session("azure").post(
+        AZURE_TOKEN_URL, data=token_data, endpoint="token"
+    )
     tokens = response.json()
 
     if response.status_code != 200:
@@ -89,58 +92,8 @@ def azure_oauth_callback_view(request):
 def fetch_azure_billing_view(request):
     account_id = request.GET.get("account_id")
     cloud_account = CloudAccount.objects.get(id=account_id)
-    token = cloud_account.azure_oauth_token
-
-    # Refresh token if expired
-    if token.is_expired():
-        token = refresh_azure_token(token)
-
-    headers = {"Authorization": f"Bearer {token.access_token}"}
-
-    # Example: list subscriptions
-    subs_resp = requests.get(
-        "https://management.azure.com/subscriptions?api-version=2020-01-01",
-        headers=headers,
+    job = active_job("azure_fetch", cloud_account=cloud_account) or enqueue_job(
+        "azure_fetch", cloud_account=cloud_account
     )
-    subscriptions = subs_resp.json().get("value", [])
-
-    for sub in subscriptions:
-        # Fetch billing usage (Cost Management API)
-        usage_url = f"https://management.azure.com/subscriptions/{sub['subscriptionId']}/providers/Microsoft.Consumption/usageDetails?api-version=2023-03-01"
-        usage_resp = requests.get(usage_url, headers=headers)
-        usage_data = usage_resp.json().get("value", [])
-
-        for item in usage_data:
-            BillingRecord.objects.create(
-                cloud_account=cloud_account,
-                usage_start=item.get("properties", {}).get("usageStart"),
-                usage_end=item.get("properties", {}).get("usageEnd"),
-                service_name=item.get("properties", {}).get("meterName"),
-                resource=item.get("properties", {}).get("instanceName"),
-                cost=item.get("properties", {}).get("cost", 0.0),
-                currency=item.get("properties", {}).get("currency", "USD"),
-                metadata=item,
-            )
-
-    return JsonResponse({"success": True, "subscriptions": subscriptions})
-
-
-def refresh_azure_token(token: AzureOAuthToken):
-    data = {
-        "client_id": settings.AZURE_DATA_CLIENT_ID,
-        "client_secret": settings.AZURE_DATA_CLIENT_SECRET,
-        "refresh_token": token.refresh_token,
-        "grant_type": "refresh_token",
-        "scope": "https://management.azure.com/.default offline_access",
-    }
-    url = f"https://login.microsoftonline.com/{token.tenant_id}/oauth2/v2.0/token"
-
-    response = requests.post(url, data=data)
-    if response.status_code == 200:
-        new_data = response.json()
-        token.access_token = new_data["access_token"]
-        token.expires_at = now() + timedelta(seconds=new_data["expires_in"])
-        token.save()
-        return token
-    else:
-        raise Exception("Failed to refresh Azure token", response.text)
+
+    return JsonResponse({"success": True, "job_id": job.id}, status=202)
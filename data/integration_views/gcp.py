@@ -1,10 +1,8 @@
 import os
-from datetime import datetime, timedelta
 from urllib.parse import urlencode
 
 # from itsdangerous import URLSafeSerializer
 # serializer = URLSafeSerializer(settings.SECRET_KEY, salt="google-oauth")
-import requests
 from django.core import signing
 from django.http import JsonResponse
 from django.shortcuts import redirect
@@ -13,11 +11,10 @@ from dotenv import load_dotenv
 from rest_framework.decorators import api_view
 
 from company.models import Organization
+from core.http import vendor_session
 
 from ..models import CloudAccount, GoogleOAuthToken
-
-# from .services.google_api import get_gcp_billing_data, get_gcp_projects
-from ..services.ingestion import ingest_billing_data
+from ..services.jobs import active_job, enqueue_job
 
 load_dotenv()
 #
@@ -82,7 +79,9 @@ def google_oauth_callback_view(request):
         "grant_type": "authorization_code",
     }
 
-    response = requests.post("https://oauth2.googleapis.com/token", data=token_data)
+    response = vendor_session("gcp").post(
+        "https://oauth2.googleapis.com/token", data=token_data, endpoint="token"
+    )
     tokens = response.json()
 
     if response.status_code != 200:
@@ -158,81 +157,13 @@ def google_oauth_callback_view(request):
 #     return redirect(f"{FRONTEND_URL}/settings/organization/data")
 
 
-def get_gcp_projects(access_token):
-    url = "https://cloudbilling.googleapis.com/v1/billingAccounts"
-    headers = {"Authorization": f"Bearer {access_token}"}
-    resp = requests.get(url, headers=headers)
-    resp.raise_for_status()
-    return resp.json().get("billingAccounts", [])
-
-
-def get_gcp_billing_data(access_token, project_id):
-    url = f"https://cloudbilling.googleapis.com/v1/projects/{project_id}/billingInfo"
-    headers = {"Authorization": f"Bearer {access_token}"}
-    resp = requests.get(url, headers=headers)
-    if resp.status_code == 404:
-        # Project billing info not found
-        return None
-    resp.raise_for_status()
-    return resp.json()
-
-
 @api_view(["GET"])
 def fetch_google_projects_and_billing_view(request):
     account_id = request.GET.get("account_id")
-
-    # Get token & account
-
     cloud_account = CloudAccount.objects.get(id=account_id)
-    token = cloud_account.google_oauth_token
-
-    # Refresh token if expired
-    if token.is_expired():
-        token = refresh_google_token(
-            token, GOOGLE_DATA_CLIENT_ID, GOOGLE_DATA_CLIENT_SECRET
-        )
 
-    # Define date range (last 30 days)
-    end_date = datetime.utcnow()
-    start_date = end_date - timedelta(days=30)
-
-    # Step 1: Fetch projects
-    projects = get_gcp_projects(token.access_token)
-
-    # Step 2: Ingest all billing data
-    created_count = ingest_billing_data(
-        cloud_account=cloud_account,
-        access_token=token.access_token,
-        projects=projects,
-        start_date=start_date,
-        end_date=end_date,
-        get_billing_data_func=get_gcp_billing_data,
-    )
-
-    # return Response({"status": "success", "records_created": created_count})
+    # projects and billing data are pulled by the ingest worker
+    if not active_job("gcp_fetch", cloud_account=cloud_account):
+        enqueue_job("gcp_fetch", cloud_account=cloud_account)
 
     return redirect(f"{FRONTEND_URL}/settings/organization/data")
-
-
-def refresh_google_token(token: GoogleOAuthToken, client_id, client_secret):
-    response = requests.post(
-        "https://oauth2.googleapis.com/token",
-        data={
-            "client_id": client_id,
-            "client_secret": client_secret,
-            "refresh_token": token.refresh_token,
-            "grant_type": "refresh_token",
-        },
-    )
-
-    if response.status_code == 200:
-        data = response.json()
-        token.access_token = data["access_token"]
-        token.expires_at = now() + timedelta(seconds=data["expires_in"])
-        token.scope = data.get("scope", token.scope)
-        token.token_type = data.get("token_type", token.token_type)
-        token.id_token = data.get("id_token", token.id_token)
-        token.save()
-        return token
-    else:
-        raise Exception("Failed to refresh token", response.text)
@@ -0,0 +1,62 @@
+from datetime import date
+
+from .integration_helpers.aws import create_cur_report, get_account_aws_client
+from .integration_helpers.azure import ingest_azure_billing
+from .integration_helpers.cur import (
+    cost_report_prefix,
+    ingest_cost_report,
+    s3_report_store,
+)
+from .integration_helpers.gcp import ingest_gcp_billing
+from .services.jobs import JobFailed, PartialResult, job_handler
+from .services.refresh import (
+    backfill_cloud_account,
+    failed_refreshes,
+    refresh_organization,
+)
+
+
+@job_handler("aws_backfill")
+def aws_backfill(job):
+    return backfill_cloud_account(
+        job.cloud_account,
+        date.fromisoformat(job.payload["start_date"]),
+        date.fromisoformat(job.payload["end_date"]),
+    )
+
+
+@job_handler("aws_cur_setup")
+def aws_cur_setup(job):
+    client = get_account_aws_client(job.cloud_account, "cur", "SetupCUR")
+    return create_cur_report(client, job.cloud_account, job.payload["bucket_name"])
+
+
+@job_handler("aws_cur_ingest")
+def aws_cur_ingest(job):
+    return ingest_cost_report(
+        job.cloud_account,
+        s3_report_store(job.payload.get("bucket_name")),
+        job.payload.get("prefix") or cost_report_prefix(job.cloud_account),
+    )
+
+
+@job_handler("azure_fetch")
+def azure_fetch(job):
+    return ingest_azure_billing(job.cloud_account)
+
+
+@job_handler("gcp_fetch")
+def gcp_fetch(job):
+    return ingest_gcp_billing(job.cloud_account)
+
+
+@job_handler("org_refresh")
+def org_refresh(job):
+    outcomes = refresh_organization(job.organization)
+    failed = failed_refreshes(outcomes)
+    message = f"{len(failed)} of {len(outcomes)} cloud accounts failed to refresh."
+    if failed and len(failed) == len(outcomes):
+        raise JobFailed(message, outcomes)
+    if failed:
+        return PartialResult(outcomes, message)
+    return outcomes
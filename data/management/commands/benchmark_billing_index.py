@@ -0,0 +1,145 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils.timezone import now
+
+from authentication.models import CustomUser
+from company.models import Company, Organization
+from data.models import BillingRecord, CloudAccount, CloudVendor
+from data.services import partitioning
+from data.services.rollup import daily_totals
+from data.utils.day_range import day_start
+
+INDEX = "billing_account_usage_idx"
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed BillingRecord with --accounts x --days x --services synthetic rows "
+        "(2.19M by default), then EXPLAIN ANALYZE and time the per-account "
+        "rollup query (daily_totals) with and without billing_account_usage_idx. "
+        "The index is dropped inside a transaction that is rolled back; the "
+        "seeded rows are deleted afterwards unless --keep is given. Postgres "
+        "only, meant for a benchmark database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--accounts", type=int, default=100)
+        parser.add_argument("--days", type=int, default=730)
+        parser.add_argument(
+            "--services", type=int, default=30, help="Rows per account and day."
+        )
+        parser.add_argument(
+            "--range-days",
+            type=int,
+            default=30,
+            help="Days of the queried range, ending today.",
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=5, help="Timed runs of the query."
+        )
+        parser.add_argument("--keep", action="store_true", help="Keep the seeded rows.")
+
+    def handle(self, *args, **options):
+        try:
+            partitioning.ensure_postgres()
+        except ImproperlyConfigured as e:
+            raise CommandError(str(e))
+
+        cloud_accounts = self.seed(
+            options["accounts"], options["days"], options["services"]
+        )
+        try:
+            today = now().date()
+            since = today - timedelta(days=options["range_days"] - 1)
+            queryset = daily_totals(cloud_accounts[0], since, today)
+
+            self.report(f"with {INDEX}", queryset, options["repeat"])
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute(f"DROP INDEX {INDEX}")
+                self.report(f"without {INDEX}", queryset, options["repeat"])
+                transaction.set_rollback(True)
+        finally:
+            if not options["keep"]:
+                self.clean_up(cloud_accounts)
+
+    def seed(self, accounts, days, services):
+        owner = CustomUser.objects.create_user(email="benchmark@example.invalid")
+        company = Company.objects.create(name="benchmark", owner=owner)
+        organization = Organization.objects.create(name="benchmark", company=company)
+        cloud_accounts = CloudAccount.objects.bulk_create(
+            CloudAccount(
+                organization=organization,
+                vendor=CloudVendor.AWS,
+                account_name=f"benchmark-{index}",
+                account_id=f"benchmark-{index}",
+            )
+            for index in range(accounts)
+        )
+
+        last_day = day_start(now().date())
+        started = time.perf_counter()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {BillingRecord._meta.db_table} (
+                    id, cloud_account_id, usage_start, usage_end, service_name,
+                    region, cost_type, usage_amount, resource, cost, currency
+                )
+                SELECT
+                    gen_random_uuid(), account.id, day, day + interval '1 day',
+                    'Service ' || service, 'us-east-1', '', 2, '', 1.25, 'USD'
+                FROM unnest(%s::uuid[]) AS account(id),
+                    generate_series(%s::timestamptz, %s::timestamptz, '1 day') AS day,
+                    generate_series(1, %s) AS service
+                """,
+                [
+                    [cloud_account.id for cloud_account in cloud_accounts],
+                    last_day - timedelta(days=days - 1),
+                    last_day,
+                    services,
+                ],
+            )
+            rows = cursor.rowcount
+            # statistics and the visibility map index-only scans rely on
+            cursor.execute(f"VACUUM ANALYZE {BillingRecord._meta.db_table}")
+        self.stdout.write(
+            f"seeded {rows} rows in {time.perf_counter() - started:.1f}s "
+            f"({accounts} accounts x {days} days x {services} services)"
+        )
+        return cloud_accounts
+
+    def report(self, label, queryset, repeat):
+        plan = queryset.explain(analyze=True, buffers=True)
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(queryset.all())
+            timings.append((time.perf_counter() - started) * 1000)
+
+        self.stdout.write(self.style.MIGRATE_HEADING(label))
+        self.stdout.write(plan)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{label}: median {statistics.median(timings):.2f} ms "
+                f"over {repeat} runs"
+            )
+        )
+
+    def clean_up(self, cloud_accounts):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {BillingRecord._meta.db_table} "
+                "WHERE cloud_account_id = ANY(%s::uuid[])",
+                [[cloud_account.id for cloud_account in cloud_accounts]],
+            )
+        organization = cloud_accounts[0].organization
+        owner = organization.company.owner
+        CloudAccount.objects.filter(organization=organization).delete()
+        organization.company.delete()
+        owner.delete()
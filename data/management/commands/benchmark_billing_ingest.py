@@ -0,0 +1,129 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils.timezone import now
+
+from authentication.models import CustomUser
+from company.models import Company, Organization
+from data.integration_helpers.aws import (
+    parse_cost_explorer_results,
+    save_billing_data_efficient,
+)
+from data.models import BillingRecord, CloudAccount, CloudVendor
+
+
+class Rollback(Exception):
+    pass
+
+
+def cost_explorer_response(days, groups, cost):
+    """A ``get_cost_and_usage`` response of ``days`` days of ``groups`` groups."""
+    start = now().date() - timedelta(days=days)
+    return {
+        "ResultsByTime": [
+            {
+                "TimePeriod": {
+                    "Start": str(start + timedelta(days=day)),
+                    "End": str(start + timedelta(days=day + 1)),
+                },
+                "Groups": [
+                    {
+                        "Keys": [f"Service {group % 40}", f"UsageType {group}"],
+                        "Metrics": {
+                            "UnblendedCost": {"Amount": cost},
+                            "UsageQuantity": {"Amount": "1"},
+                        },
+                    }
+                    for group in range(groups)
+                ],
+            }
+            for day in range(days)
+        ]
+    }
+
+
+def update_or_create_each(cloud_account, cost_response):
+    """The per-row path Cost Explorer results used to be saved with."""
+    with transaction.atomic():
+        for record in parse_cost_explorer_results(cloud_account, cost_response):
+            BillingRecord.objects.update_or_create(
+                cloud_account=cloud_account,
+                usage_start=record.usage_start,
+                usage_end=record.usage_end,
+                service_name=record.service_name,
+                cost_type=record.cost_type,
+                resource=record.resource,
+                defaults={
+                    "cost": record.cost,
+                    "currency": record.currency,
+                    "usage_amount": record.usage_amount,
+                    "usage_unit": record.usage_unit,
+                    "metadata": record.metadata,
+                },
+            )
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the ingestion of a synthetic Cost Explorer backfill, in rows/sec: "
+        "one update_or_create per group against the bulk upsert of "
+        "save_billing_data_efficient (rollup refresh included), both on an "
+        "empty and on an already ingested account. Runs on a throwaway cloud "
+        "account in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=365)
+        parser.add_argument(
+            "--groups", type=int, default=50, help="Groups (rows) per day."
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            help="Rows per upsert statement, defaults to BILLING_INGEST_BATCH_SIZE.",
+        )
+
+    def handle(self, *args, **options):
+        rows = options["days"] * options["groups"]
+        first = cost_explorer_response(options["days"], options["groups"], "1.5")
+        restated = cost_explorer_response(options["days"], options["groups"], "2.5")
+        paths = [
+            ("update_or_create", update_or_create_each),
+            (
+                "bulk upsert",
+                lambda cloud_account, response: save_billing_data_efficient(
+                    cloud_account, response, options["batch_size"]
+                ),
+            ),
+        ]
+
+        self.stdout.write(f"{rows} rows ({options['days']} days)")
+        try:
+            with transaction.atomic():
+                cloud_account = self.throwaway_account()
+                for name, ingest in paths:
+                    BillingRecord.objects.filter(cloud_account=cloud_account).delete()
+                    for run, response in (("insert", first), ("update", restated)):
+                        started = time.perf_counter()
+                        ingest(cloud_account, response)
+                        elapsed = time.perf_counter() - started
+                        self.stdout.write(
+                            f"{name:>16} {run}: {elapsed:8.3f}s "
+                            f"{rows / elapsed:10.0f} rows/sec"
+                        )
+                raise Rollback
+        except Rollback:
+            pass
+
+    def throwaway_account(self):
+        owner = CustomUser.objects.create_user(email="benchmark@example.invalid")
+        company = Company.objects.create(name="benchmark", owner=owner)
+        organization = Organization.objects.create(name="benchmark", company=company)
+        return CloudAccount.objects.create(
+            organization=organization,
+            vendor=CloudVendor.AWS,
+            account_name="benchmark",
+            account_id="benchmark",
+        )
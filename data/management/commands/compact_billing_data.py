@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from data.services import partitioning
+from data.services.aggregate_cache import bump_all_data_versions
+from data.services.retention import (
+    daily_retention_start,
+    expire_daily_rollups,
+    expire_raw_records,
+    raw_retention_start,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Expire billing data past its retention tier (run daily): raw "
+        "BillingRecords older than BILLING_RAW_RETENTION_DAYS, then "
+        "DailyCostRollup rows older than BILLING_DAILY_RETENTION_MONTHS. "
+        "Their totals stay in the daily and monthly rollups."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only count the rows that would be expired.",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        verb = "would expire" if dry_run else "expired"
+
+        raw_horizon = raw_retention_start()
+        if raw_horizon is None:
+            self.stdout.write("raw records: kept forever")
+        else:
+            if (
+                not dry_run
+                and connection.vendor == "postgresql"
+                and partitioning.is_partitioned()
+            ):
+                # whole months go with their partition, the rest row by row
+                for name in partitioning.expire_partitions(raw_horizon, drop=True):
+                    self.stdout.write(f"raw records: dropped partition {name}")
+            count = expire_raw_records(raw_horizon, dry_run)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"raw records: {verb} {count} rows before {raw_horizon} "
+                    f"({settings.BILLING_RAW_RETENTION_DAYS} days)"
+                )
+            )
+
+        daily_horizon = daily_retention_start()
+        if daily_horizon is None:
+            self.stdout.write("daily rollups: kept forever")
+        else:
+            count = expire_daily_rollups(daily_horizon, dry_run)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"daily rollups: {verb} {count} rows before {daily_horizon} "
+                    f"({settings.BILLING_DAILY_RETENTION_MONTHS} months)"
+                )
+            )
+
+        if not dry_run and (raw_horizon or daily_horizon):
+            bump_all_data_versions()
@@ -0,0 +1,52 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from data.integration_helpers.cur import (
+    LocalObjectStore,
+    cost_report_prefix,
+    ingest_cost_report,
+    s3_report_store,
+)
+from data.models import CloudAccount
+
+
+class Command(BaseCommand):
+    help = "Load a cloud account's CUR/FOCUS report deliveries into BillingRecords."
+
+    def add_arguments(self, parser):
+        parser.add_argument("account", help="Cloud account id.")
+        parser.add_argument(
+            "--bucket", help="S3 bucket of the reports, defaults to CUR_BUCKET_NAME."
+        )
+        parser.add_argument(
+            "--prefix", help="Key prefix of the reports, defaults to '<account id>/'."
+        )
+        parser.add_argument(
+            "--local-dir",
+            help="Read the reports from this directory instead of S3.",
+        )
+        parser.add_argument("--batch-size", type=int)
+
+    def handle(self, *args, **options):
+        try:
+            cloud_account = CloudAccount.objects.get(id=options["account"])
+        except (CloudAccount.DoesNotExist, ValidationError):
+            raise CommandError(f"No cloud account {options['account']}.")
+
+        if options["local_dir"]:
+            store = LocalObjectStore(options["local_dir"])
+        else:
+            store = s3_report_store(options["bucket"])
+
+        totals = ingest_cost_report(
+            cloud_account,
+            store,
+            options["prefix"] or cost_report_prefix(cloud_account),
+            options["batch_size"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{cloud_account}: {totals['records']} records from "
+                f"{totals['files']} files in {totals['periods']} billing periods"
+            )
+        )
@@ -0,0 +1,89 @@
+from datetime import date
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.timezone import now
+
+from data.models import BillingRecord
+from data.services import partitioning
+from data.utils.day_range import add_months, day_range_filter, month_start
+
+
+class Command(BaseCommand):
+    help = (
+        "Monthly partitioning of BillingRecord on Postgres. `convert` turns the "
+        "table into a partitioned one, `maintain` (run daily) pre-creates future "
+        "partitions, `explain` shows the partitions the planner keeps for a "
+        "range query. Old partitions are dropped by compact_billing_data, past "
+        "BILLING_RAW_RETENTION_DAYS."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("action", choices=["convert", "maintain", "explain"])
+        parser.add_argument(
+            "--months-ahead",
+            type=int,
+            default=settings.BILLING_PARTITION_MONTHS_AHEAD,
+            help="Months of partitions to keep created ahead of the current one.",
+        )
+        parser.add_argument(
+            "--keep-legacy",
+            action="store_true",
+            help="convert: keep the unpartitioned table as <table>_unpartitioned.",
+        )
+        parser.add_argument("--since", type=date.fromisoformat)
+        parser.add_argument("--until", type=date.fromisoformat)
+
+    def handle(self, *args, **options):
+        try:
+            partitioning.ensure_postgres()
+        except ImproperlyConfigured as e:
+            raise CommandError(str(e))
+
+        action = options["action"]
+        if action == "convert":
+            if partitioning.is_partitioned():
+                raise CommandError(f"{partitioning.TABLE} is already partitioned.")
+            partitioning.convert_to_partitioned(
+                options["months_ahead"], options["keep_legacy"]
+            )
+            self.stdout.write(self.style.SUCCESS(f"{partitioning.TABLE} partitioned."))
+            return
+
+        if not partitioning.is_partitioned():
+            raise CommandError(
+                f"{partitioning.TABLE} is not partitioned, run `convert` first."
+            )
+
+        if action == "maintain":
+            this_month = month_start(now().date())
+            created = partitioning.ensure_partitions(
+                this_month,
+                add_months(this_month, options["months_ahead"]),
+            )
+            self.stdout.write(
+                self.style.SUCCESS(f"created: {', '.join(created) or '-'}")
+            )
+            return
+
+        # explain: the raw-record range scan the rollup rebuild and exports run
+        until = options["until"] or now().date()
+        since = options["since"] or month_start(until)
+        plan = (
+            BillingRecord.objects.filter(
+                **day_range_filter("usage_start", since, until)
+            )
+            .values("cloud_account", "service_name")
+            .order_by()
+            .explain()
+        )
+        partitions = partitioning.month_partitions().values()
+        scanned = [name for name in partitions if name in plan]
+        self.stdout.write(plan)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{len(scanned)} of {len(partitions)} monthly partitions scanned "
+                f"for {since} to {until}."
+            )
+        )
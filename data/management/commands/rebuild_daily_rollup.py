@@ -0,0 +1,60 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+
+from data.models import CloudAccount
+from data.services.rollup import refresh_daily_rollup
+
+
+class Command(BaseCommand):
+    help = "Rebuild DailyCostRollup rows from raw BillingRecords."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--organization", help="Only rebuild accounts of this organization id."
+        )
+        parser.add_argument("--account", help="Only rebuild this cloud account id.")
+        parser.add_argument(
+            "--since",
+            type=date.fromisoformat,
+            help="First day to rebuild (YYYY-MM-DD), defaults to the oldest record.",
+        )
+        parser.add_argument(
+            "--until",
+            type=date.fromisoformat,
+            help="Last day to rebuild (YYYY-MM-DD), defaults to the newest record.",
+        )
+
+    def handle(self, *args, **options):
+        cloud_accounts = CloudAccount.objects.all()
+        if options["organization"]:
+            cloud_accounts = cloud_accounts.filter(
+                organization_id=options["organization"]
+            )
+        if options["account"]:
+            cloud_accounts = cloud_accounts.filter(id=options["account"])
+
+        cloud_accounts = cloud_accounts.annotate(
+            first_usage=Min("billing_records__usage_start"),
+            last_usage=Max("billing_records__usage_start"),
+        )
+        if not cloud_accounts:
+            raise CommandError("No matching cloud accounts.")
+
+        for cloud_account in cloud_accounts:
+            if cloud_account.first_usage is None:
+                self.stdout.write(f"{cloud_account}: no billing records, skipped")
+                continue
+
+            since = options["since"] or cloud_account.first_usage.date()
+            until = options["until"] or cloud_account.last_usage.date()
+            if since > until:
+                continue
+
+            rows = refresh_daily_rollup(cloud_account, since, until)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{cloud_account}: {rows} rollup rows for {since} to {until}"
+                )
+            )
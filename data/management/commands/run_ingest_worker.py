@@ -0,0 +1,98 @@
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils.module_loading import autodiscover_modules
+
+from _platform.pubsub import get_broker
+from data.services.jobs import (
+    claim_next_job,
+    renew_leases,
+    requeue_stale_jobs,
+    run_job,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def run_claimed_job(job):
+    try:
+        return run_job(job)
+    finally:
+        # every pool thread has its own connection, don't leak them
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = "Process queued BackgroundJobs (ingestion, CUR setup, refreshes)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=settings.INGEST_WORKER_CONCURRENCY,
+            help="Number of jobs run at the same time.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=settings.INGEST_WORKER_POLL_SECONDS,
+            help="Seconds to wait before polling again when the queue is empty.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once there are no more due jobs instead of polling.",
+        )
+
+    def handle(self, *args, **options):
+        # register the @job_handler functions of every installed app
+        autodiscover_modules("jobs")
+        if not get_broker().cross_process:
+            self.stderr.write(
+                self.style.WARNING(
+                    f"NOTIFICATION_BROKER {settings.NOTIFICATION_BROKER} only reaches "
+                    "streams of this process: notifications fanned out here are not "
+                    "pushed to open streams, use _platform.pubsub.PostgresBroker."
+                )
+            )
+
+        concurrency = options["concurrency"]
+        running = {}  # future -> job
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            try:
+                while True:
+                    # heartbeat: jobs of a live worker keep their lease
+                    renew_leases([job.id for job in running.values()])
+                    requeue_stale_jobs()
+                    while len(running) < concurrency and (job := claim_next_job()):
+                        self.stdout.write(f"Running job {job.id} ({job.kind})")
+                        running[pool.submit(run_claimed_job, job)] = job
+
+                    if not running:
+                        if options["once"]:
+                            break
+                        time.sleep(options["poll_interval"])
+                        continue
+
+                    done, _ = wait(
+                        running,
+                        timeout=options["poll_interval"],
+                        return_when=FIRST_COMPLETED,
+                    )
+                    for future in done:
+                        job = running.pop(future)
+                        try:
+                            job = future.result()
+                        except Exception:
+                            # e.g. the database went away while saving the
+                            # outcome; the job's lease expires and it is retried
+                            logger.exception("Job %s (%s) crashed", job.id, job.kind)
+                            continue
+                        self.stdout.write(f"Job {job.id} ({job.kind}): {job.status}")
+            except KeyboardInterrupt:
+                self.stdout.write("Stopping, waiting for running jobs to finish...")
+                wait(running)
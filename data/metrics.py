@@ -6,3 +6,17 @@ cost_request_counter = Counter(
     "Total number of request for cost data",  # description
     ["type"],
 )
+
+# AWS assumed-role credential and client cache lookups
+aws_client_cache_counter = Counter(
+    "aws_client_cache_total",
+    "AWS credential/client cache lookups",
+    ["kind", "result"],  # kind: credentials | client, result: hit | miss
+)
+
+# cached aggregate responses, hit ratio = hit / (hit + miss)
+aggregate_cache_counter = Counter(
+    "aggregate_cache_total",
+    "Aggregate response cache lookups",
+    ["endpoint", "result"],  # result: hit | miss
+)
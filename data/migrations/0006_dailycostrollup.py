@@ -0,0 +1,85 @@
+# Generated by Django 5.2.2 on 2026-10-17 10:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+
+
+def seed_daily_rollup(apps, schema_editor):
+    """Roll every existing BillingRecord up into its day."""
+    BillingRecord = apps.get_model("data", "BillingRecord")
+    DailyCostRollup = apps.get_model("data", "DailyCostRollup")
+
+    rows = (
+        BillingRecord.objects.annotate(day=TruncDate("usage_start"))
+        .values("cloud_account_id", "day", "service_name", "region", "currency")
+        .annotate(total_cost=Sum("cost"), total_usage=Sum("usage_amount"))
+        .order_by()
+    )
+    DailyCostRollup.objects.bulk_create(
+        (
+            DailyCostRollup(
+                cloud_account_id=row["cloud_account_id"],
+                day=row["day"],
+                service_name=row["service_name"],
+                region=row["region"],
+                currency=row["currency"],
+                cost=row["total_cost"],
+                usage_amount=row["total_usage"] or 0,
+            )
+            for row in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("data", "0005_customexpensevendor_customexpense"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyCostRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("service_name", models.CharField(max_length=255)),
+                ("region", models.CharField(blank=True, max_length=100, null=True)),
+                ("currency", models.CharField(default="USD", max_length=10)),
+                (
+                    "cost",
+                    models.DecimalField(decimal_places=6, default=0, max_digits=20),
+                ),
+                (
+                    "usage_amount",
+                    models.DecimalField(decimal_places=6, default=0, max_digits=20),
+                ),
+                (
+                    "cloud_account",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_rollups",
+                        to="data.cloudaccount",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-day"],
+                "unique_together": {
+                    ("cloud_account", "day", "service_name", "region", "currency")
+                },
+            },
+        ),
+        migrations.RunPython(seed_daily_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,102 @@
+from django.db import migrations
+from django.db.models import Count, Sum, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce, TruncDate
+
+KEY_FIELDS = ("cloud_account_id", "usage_start", "usage_end", "service_name")
+
+
+def write_order(connection):
+    """
+    Ordering, newest first, of BillingRecords by when they were written;
+    the model has no timestamp. On Postgres the age of the inserting
+    transaction, on SQLite the rowid. None elsewhere.
+    """
+    if connection.vendor == "postgresql":
+        return [RawSQL("age(xmin)", []).asc()]
+    if connection.vendor == "sqlite":
+        return [RawSQL("rowid", []).desc()]
+    return None
+
+
+def keep_latest(rows, order):
+    """
+    Collapse rows that share a key into the one written last. The old
+    writers inserted a new row on every fetch instead of updating the one
+    they had, so the rows of a key are successive versions of one charge,
+    restated costs included, and summing them would count it several times.
+    Without a write order the row with the highest id is kept, so the
+    outcome does not depend on the order the database returns rows in.
+    """
+    kept = rows.order_by(*(order or ["-id"])).values_list("id", flat=True)[0]
+    rows.exclude(id=kept).delete()
+
+
+def refresh_daily_rollup(BillingRecord, DailyCostRollup, cloud_account_id, day):
+    """Recompute one account's DailyCostRollup rows for ``day``."""
+    rows = (
+        BillingRecord.objects.filter(cloud_account_id=cloud_account_id)
+        .annotate(day=TruncDate("usage_start"))
+        .filter(day=day)
+        .values("day", "service_name", "region", "currency")
+        .annotate(total_cost=Sum("cost"), total_usage=Sum("usage_amount"))
+        .order_by()
+    )
+    DailyCostRollup.objects.filter(cloud_account_id=cloud_account_id, day=day).delete()
+    DailyCostRollup.objects.bulk_create(
+        DailyCostRollup(
+            cloud_account_id=cloud_account_id,
+            day=row["day"],
+            service_name=row["service_name"],
+            region=row["region"],
+            currency=row["currency"],
+            cost=row["total_cost"],
+            usage_amount=row["total_usage"] or 0,
+        )
+        for row in rows
+    )
+
+
+def fill_key_nulls(apps, schema_editor):
+    """
+    Replace NULL cost_type/resource with "" so the unique key can be used for
+    upserts, keeping the latest of the rows that would collide once the
+    NULLs are filled in.
+    """
+    BillingRecord = apps.get_model("data", "BillingRecord")
+    DailyCostRollup = apps.get_model("data", "DailyCostRollup")
+    normalized = BillingRecord.objects.annotate(
+        key_cost_type=Coalesce("cost_type", Value("")),
+        key_resource=Coalesce("resource", Value("")),
+    )
+
+    order = write_order(schema_editor.connection)
+    duplicates = list(
+        normalized.values(*KEY_FIELDS, "key_cost_type", "key_resource")
+        .annotate(rows=Count("id"))
+        .filter(rows__gt=1)
+        .order_by()
+    )
+    days = set()
+    for key in duplicates:
+        key.pop("rows")
+        keep_latest(normalized.filter(**key), order)
+        days.add((key["cloud_account_id"], key["usage_start"].date()))
+
+    BillingRecord.objects.filter(cost_type__isnull=True).update(cost_type="")
+    BillingRecord.objects.filter(resource__isnull=True).update(resource="")
+
+    # 0006 rolled the dropped versions up too
+    for cloud_account_id, day in sorted(days, key=str):
+        refresh_daily_rollup(BillingRecord, DailyCostRollup, cloud_account_id, day)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("data", "0006_dailycostrollup"),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_key_nulls, migrations.RunPython.noop),
+    ]
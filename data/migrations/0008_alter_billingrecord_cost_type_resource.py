@@ -0,0 +1,23 @@
+# Generated by Django 5.2.2 on 2026-10-17 10:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("data", "0007_fill_billingrecord_key_nulls"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="billingrecord",
+            name="cost_type",
+            field=models.CharField(blank=True, default="", max_length=50),
+        ),
+        migrations.AlterField(
+            model_name="billingrecord",
+            name="resource",
+            field=models.CharField(blank=True, default="", max_length=255),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.2 on 2026-10-17 10:32
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("data", "0009_backgroundjob"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IngestionState",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("watermark", models.DateField(blank=True, null=True)),
+                ("restatement_days", models.PositiveSmallIntegerField(default=3)),
+                (
+                    "last_status",
+                    models.CharField(
+                        choices=[
+                            ("never", "Never run"),
+                            ("succeeded", "Succeeded"),
+                            ("failed", "Failed"),
+                        ],
+                        default="never",
+                        max_length=10,
+                    ),
+                ),
+                ("last_run_at", models.DateTimeField(blank=True, null=True)),
+                ("last_duration", models.DurationField(blank=True, null=True)),
+                ("last_error", models.TextField(blank=True, default="")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "cloud_account",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ingestion_state",
+                        to="data.cloudaccount",
+                    ),
+                ),
+            ],
+        ),
+    ]
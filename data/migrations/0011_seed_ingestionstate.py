@@ -0,0 +1,33 @@
+from django.db import migrations
+from django.db.models import Max
+
+
+def seed_ingestion_state(apps, schema_editor):
+    """
+    Start every existing account's watermark at its newest ingested usage
+    day, the last time BillingRecords have to be scanned for it.
+    """
+    CloudAccount = apps.get_model("data", "CloudAccount")
+    IngestionState = apps.get_model("data", "IngestionState")
+
+    cloud_accounts = CloudAccount.objects.annotate(
+        last_usage=Max("billing_records__usage_start")
+    )
+    IngestionState.objects.bulk_create(
+        IngestionState(
+            cloud_account_id=cloud_account.id,
+            watermark=cloud_account.last_usage and cloud_account.last_usage.date(),
+        )
+        for cloud_account in cloud_accounts.iterator()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("data", "0010_ingestionstate"),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_ingestion_state, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.2 on 2026-10-17 10:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("data", "0011_seed_ingestionstate"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="billingrecord",
+            index=models.Index(
+                fields=["cloud_account", "usage_start"],
+                include=("cost", "usage_amount", "service_name", "region", "currency"),
+                name="billing_account_usage_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.2 on 2026-10-17 10:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("data", "0012_billingrecord_account_usage_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MonthlyCostRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("month", models.DateField(help_text="First day of the month.")),
+                ("service_name", models.CharField(max_length=255)),
+                ("region", models.CharField(blank=True, max_length=100, null=True)),
+                ("currency", models.CharField(default="USD", max_length=10)),
+                (
+                    "cost",
+                    models.DecimalField(decimal_places=6, default=0, max_digits=20),
+                ),
+                (
+                    "usage_amount",
+                    models.DecimalField(decimal_places=6, default=0, max_digits=20),
+                ),
+                (
+                    "cloud_account",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="monthly_rollups",
+                        to="data.cloudaccount",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-month"],
+                "unique_together": {
+                    ("cloud_account", "month", "service_name", "region", "currency")
+                },
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+from django.db import migrations
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+
+
+def seed_monthly_rollup(apps, schema_editor):
+    """Roll every existing DailyCostRollup row up into its month."""
+    DailyCostRollup = apps.get_model("data", "DailyCostRollup")
+    MonthlyCostRollup = apps.get_model("data", "MonthlyCostRollup")
+
+    rows = (
+        DailyCostRollup.objects.annotate(month=TruncMonth("day"))
+        .values("cloud_account_id", "month", "service_name", "region", "currency")
+        .annotate(total_cost=Sum("cost"), total_usage=Sum("usage_amount"))
+        .order_by()
+    )
+    MonthlyCostRollup.objects.bulk_create(
+        (
+            MonthlyCostRollup(
+                cloud_account_id=row["cloud_account_id"],
+                month=row["month"],
+                service_name=row["service_name"],
+                region=row["region"],
+                currency=row["currency"],
+                cost=row["total_cost"],
+                usage_amount=row["total_usage"],
+            )
+            for row in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("data", "0013_monthlycostrollup"),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_monthly_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.2 on 2026-10-17 10:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("company", "0005_alter_company_owner"),
+        ("data", "0014_seed_monthlycostrollup"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OrganizationDataVersion",
+            fields=[
+                (
+                    "organization",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="data_version",
+                        serialize=False,
+                        to="company.organization",
+                    ),
+                ),
+                ("version", models.PositiveBigIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.2 on 2026-10-17 11:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("data", "0015_organizationdataversion"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="backgroundjob",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("running", "Running"),
+                    ("succeeded", "Succeeded"),
+                    ("partial", "Partially failed"),
+                    ("failed", "Failed"),
+                ],
+                default="pending",
+                max_length=10,
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.2 on 2026-10-17 11:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("data", "0016_alter_backgroundjob_status"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="backgroundjob",
+            name="lease_expires_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,5 +1,6 @@
 import uuid
 
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.utils.timezone import now
 
@@ -26,7 +27,6 @@ class CloudAccount(models.Model):
     # credentials_info = models.JSONField(
     #     blank=True, null=True
     # )
-    # TODO: add status and last refreshed
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -50,7 +50,9 @@ class BillingRecord(models.Model):
     service_name = models.CharField(max_length=255)
     project_id = models.CharField(max_length=255, blank=True, null=True)
     region = models.CharField(max_length=100, blank=True, null=True)
-    cost_type = models.CharField(max_length=50, blank=True, null=True)
+    # NOTE: cost_type and resource are part of the unique key, so they default
+    # to "" instead of NULL; NULLs never conflict and would defeat upserts.
+    cost_type = models.CharField(max_length=50, blank=True, default="")
     usage_amount = models.DecimalField(
         max_digits=20, decimal_places=6, blank=True, null=True
     )
@@ -59,7 +61,7 @@ class BillingRecord(models.Model):
     # e.g., hours, GB, requests
     # e.g., recurring, one-time, discount, tax
     resource = models.CharField(
-        max_length=255, blank=True, null=True
+        max_length=255, blank=True, default=""
     )  # e.g., instance ID, bucket name
     cost = models.DecimalField(max_digits=12, decimal_places=4)
     # NOTE: maybe move this to the cloud account level?
@@ -77,6 +79,19 @@ class BillingRecord(models.Model):
         )
         indexes = [
             models.Index(fields=["usage_start", "usage_end"]),
+            # per-account range scans (rollup rebuilds, exports); the included
+            # columns let Postgres answer the rollup aggregate index-only
+            models.Index(
+                fields=["cloud_account", "usage_start"],
+                include=[
+                    "cost",
+                    "usage_amount",
+                    "service_name",
+                    "region",
+                    "currency",
+                ],
+                name="billing_account_usage_idx",
+            ),
         ]
         ordering = ["-usage_start"]
 
@@ -86,6 +101,121 @@ class BillingRecord(models.Model):
         )
 
 
+class DailyCostRollup(models.Model):
+    """
+    Per-day totals of BillingRecord, kept in sync by the ingestion writers.
+    Aggregators read from here whenever a day is the finest grain they need.
+    """
+
+    cloud_account = models.ForeignKey(
+        "CloudAccount", on_delete=models.CASCADE, related_name="daily_rollups"
+    )
+    day = models.DateField()
+    service_name = models.CharField(max_length=255)
+    region = models.CharField(max_length=100, blank=True, null=True)
+    currency = models.CharField(max_length=10, default="USD")
+    cost = models.DecimalField(max_digits=20, decimal_places=6, default=0)
+    usage_amount = models.DecimalField(max_digits=20, decimal_places=6, default=0)
+
+    class Meta:
+        unique_together = (
+            "cloud_account",
+            "day",
+            "service_name",
+            "region",
+            "currency",
+        )
+        ordering = ["-day"]
+
+    def __str__(self):
+        return f"{self.cloud_account} - {self.day} - {self.service_name}"
+
+
+class MonthlyCostRollup(models.Model):
+    """
+    Per-month totals of DailyCostRollup. Kept in step with the daily rollup
+    while a month is within BILLING_DAILY_RETENTION_MONTHS, and the only
+    record of the month once compact_billing_data has expired its days.
+    """
+
+    cloud_account = models.ForeignKey(
+        "CloudAccount", on_delete=models.CASCADE, related_name="monthly_rollups"
+    )
+    month = models.DateField(help_text="First day of the month.")
+    service_name = models.CharField(max_length=255)
+    region = models.CharField(max_length=100, blank=True, null=True)
+    currency = models.CharField(max_length=10, default="USD")
+    cost = models.DecimalField(max_digits=20, decimal_places=6, default=0)
+    usage_amount = models.DecimalField(max_digits=20, decimal_places=6, default=0)
+
+    class Meta:
+        unique_together = (
+            "cloud_account",
+            "month",
+            "service_name",
+            "region",
+            "currency",
+        )
+        ordering = ["-month"]
+
+    def __str__(self):
+        return f"{self.cloud_account} - {self.month:%Y-%m} - {self.service_name}"
+
+
+class OrganizationDataVersion(models.Model):
+    """
+    Counter bumped whenever an organization's billing data changes. Cached
+    aggregates are keyed on it, so one bump makes them all stale.
+    """
+
+    organization = models.OneToOneField(
+        Organization,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="data_version",
+    )
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.organization} - v{self.version}"
+
+
+class IngestionStatus(models.TextChoices):
+    NEVER = "never", "Never run"
+    SUCCEEDED = "succeeded", "Succeeded"
+    FAILED = "failed", "Failed"
+
+
+class IngestionState(models.Model):
+    """
+    Where a cloud account's incremental ingestion stands. Refreshes read
+    this row instead of scanning BillingRecords for the newest one.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    cloud_account = models.OneToOneField(
+        "CloudAccount", on_delete=models.CASCADE, related_name="ingestion_state"
+    )
+    # last usage day ingested completely, advanced with the data it covers
+    watermark = models.DateField(blank=True, null=True)
+    # trailing days re-fetched on every refresh, vendors restate recent costs
+    restatement_days = models.PositiveSmallIntegerField(default=3)
+
+    last_status = models.CharField(
+        max_length=10, choices=IngestionStatus.choices, default=IngestionStatus.NEVER
+    )
+    last_run_at = models.DateTimeField(blank=True, null=True)
+    last_duration = models.DurationField(blank=True, null=True)
+    last_error = models.TextField(blank=True, default="")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.cloud_account} - {self.watermark} ({self.last_status})"
+
+
 # TODO: use one model for both
 class GoogleOAuthToken(models.Model):
     cloud_account = models.OneToOneField(
@@ -186,3 +316,57 @@ class CustomExpense(models.Model):
                 return f"{self.vendor.name} ({self.custom_name})"
             return self.vendor.name
         return self.custom_name or "Custom-Expense"
+
+
+class JobStatus(models.TextChoices):
+    PENDING = "pending", "Pending"
+    RUNNING = "running", "Running"
+    SUCCEEDED = "succeeded", "Succeeded"
+    PARTIAL = "partial", "Partially failed"
+    FAILED = "failed", "Failed"
+
+
+class BackgroundJob(models.Model):
+    """Queued work (e.g. ingestion) picked up by `manage.py run_ingest_worker`"""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=50)
+    organization = models.ForeignKey(
+        Organization,
+        on_delete=models.CASCADE,
+        related_name="background_jobs",
+        null=True,
+        blank=True,
+    )
+    cloud_account = models.ForeignKey(
+        "CloudAccount",
+        on_delete=models.CASCADE,
+        related_name="background_jobs",
+        null=True,
+        blank=True,
+    )
+    payload = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    status = models.CharField(
+        max_length=10, choices=JobStatus.choices, default=JobStatus.PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_after = models.DateTimeField(default=now)
+    result = models.JSONField(blank=True, null=True, encoder=DjangoJSONEncoder)
+    last_error = models.TextField(blank=True, default="")
+
+    started_at = models.DateTimeField(blank=True, null=True)
+    # while running: renewed by the worker, expired once the worker is gone
+    lease_expires_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "run_after"]),
+        ]
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.kind} ({self.status})"
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 
-from .models import CloudAccount, CustomExpense, CustomExpenseVendor
+from .models import BackgroundJob, CloudAccount, CustomExpense, CustomExpenseVendor
 
 
 class CloudAccountSerializer(serializers.ModelSerializer):
@@ -141,3 +141,25 @@ class CustomExpenseSerializer(serializers.ModelSerializer):
         if validated_data.get("vendor"):
             validated_data["custom_name"] = None
         return CustomExpense.objects.create(**validated_data)
+
+
+class BackgroundJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = BackgroundJob
+        fields = [
+            "id",
+            "kind",
+            "status",
+            "organization",
+            "cloud_account",
+            "attempts",
+            "max_attempts",
+            "run_after",
+            "result",
+            "last_error",
+            "started_at",
+            "finished_at",
+            "created_at",
+            "updated_at",
+        ]
+        read_only_fields = fields
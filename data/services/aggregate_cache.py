@@ -0,0 +1,149 @@
+# Cache of aggregate responses, keyed on the organization's data version so
+# that an ingestion write invalidates all of an organization's entries at
+# once; stale entries age out of the backend through TTL/LRU eviction.
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils.http import parse_etags
+from django.utils.timezone import now
+
+from company.models import Organization
+from data.metrics import aggregate_cache_counter
+from data.models import OrganizationDataVersion
+
+
+def data_version(organization_id):
+    """Current data version of an organization, 0 before its first write."""
+    version = (
+        OrganizationDataVersion.objects.filter(organization_id=organization_id)
+        .values_list("version", flat=True)
+        .first()
+    )
+    return version or 0
+
+
+def data_versions(organization_ids):
+    """``{organization_id: version}`` of many organizations, in one query."""
+    versions = dict(
+        OrganizationDataVersion.objects.filter(
+            organization_id__in=organization_ids
+        ).values_list("organization_id", "version")
+    )
+    return {
+        organization_id: versions.get(organization_id, 0)
+        for organization_id in organization_ids
+    }
+
+
+def bump_data_version(organization_id):
+    """
+    Invalidate an organization's cached aggregates. Inside a transaction the
+    bump waits for the commit, so no reader caches the old data under the new
+    version, and concurrent writers don't queue on the counter row.
+    """
+
+    def bump():
+        bumped = OrganizationDataVersion.objects.filter(
+            organization_id=organization_id
+        ).update(version=F("version") + 1)
+        # nothing to invalidate once the organization itself was deleted
+        if not bumped and Organization.objects.filter(id=organization_id).exists():
+            OrganizationDataVersion.objects.get_or_create(
+                organization_id=organization_id, defaults={"version": 1}
+            )
+
+    transaction.on_commit(bump)
+
+
+def bump_all_data_versions():
+    """Invalidate every organization's cached aggregates."""
+    OrganizationDataVersion.objects.update(version=F("version") + 1)
+
+
+def aggregate_cache_key(endpoint, organization_id, version, since, until, params):
+    """
+    Key of an aggregate response. Today's date is part of it, the "today"
+    totals and open-ended ranges move at midnight without any write.
+    """
+    digest = hashlib.sha256(
+        json.dumps(params, sort_keys=True, default=str).encode()
+    ).hexdigest()[:16]
+    return (
+        f"aggregate:{endpoint}:{organization_id}:{version}:{now().date()}:"
+        f"{since}:{until}:{digest}"
+    )
+
+
+def aggregate_etag(key):
+    """Strong ETag of the response cached under ``key``."""
+    return '"%s"' % hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def etag_matches(request, etag):
+    """Whether the request's If-None-Match holds ``etag`` (weakly compared)."""
+    etags = parse_etags(request.headers.get("If-None-Match", ""))
+    return "*" in etags or etag in {tag.removeprefix("W/") for tag in etags}
+
+
+def cached_aggregate(
+    endpoint, organization_id, since, until, compute, version=None, **params
+):
+    """
+    ``compute(organization_id, since, until, **params)``, served from the
+    cache while the organization's data version is unchanged. Pass the
+    ``version`` when it was already read.
+    """
+    if version is None:
+        version = data_version(organization_id)
+    key = aggregate_cache_key(endpoint, organization_id, version, since, until, params)
+    data = cache.get(key)
+    if data is not None:
+        aggregate_cache_counter.labels(endpoint=endpoint, result="hit").inc()
+        return data
+
+    aggregate_cache_counter.labels(endpoint=endpoint, result="miss").inc()
+    data = compute(organization_id, since, until, **params)
+    cache.set(key, data, settings.AGGREGATE_CACHE_TTL)
+    return data
+
+
+def cached_aggregates(endpoint, organization_ids, since, until, compute, **params):
+    """
+    Batch ``cached_aggregate``: ``{organization_id: data}`` with the cache
+    misses computed together by ``compute(organization_ids, since, until,
+    **params)``. Takes one version query and one cache round trip each way.
+    """
+    keys = {
+        organization_id: aggregate_cache_key(
+            endpoint, organization_id, version, since, until, params
+        )
+        for organization_id, version in data_versions(organization_ids).items()
+    }
+    cached = cache.get_many(keys.values())
+    results = {
+        organization_id: cached[key]
+        for organization_id, key in keys.items()
+        if key in cached
+    }
+    missing = [
+        organization_id for organization_id in keys if organization_id not in results
+    ]
+    aggregate_cache_counter.labels(endpoint=endpoint, result="hit").inc(len(results))
+    aggregate_cache_counter.labels(endpoint=endpoint, result="miss").inc(len(missing))
+
+    if missing:
+        computed = compute(missing, since, until, **params)
+        cache.set_many(
+            {
+                keys[organization_id]: computed[organization_id]
+                for organization_id in missing
+            },
+            settings.AGGREGATE_CACHE_TTL,
+        )
+        results.update(computed)
+
+    return {organization_id: results[organization_id] for organization_id in keys}
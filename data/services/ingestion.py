@@ -1,63 +1,210 @@
 # Save raw data
-from datetime import datetime
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
 from decimal import Decimal
+from itertools import islice
+from operator import attrgetter
+
+from django.conf import settings
+from django.db import transaction
 
 from data.models import BillingRecord
 
+from .rollup import refresh_daily_rollup
 
-def save_billing_records(cloud_account, raw_records):
-    """Save raw billing data to the DB, avoid duplicates."""
-    created_count = 0
+# BillingRecord's unique key, used as the upsert conflict target
+UNIQUE_FIELDS = [
+    "cloud_account",
+    "usage_start",
+    "usage_end",
+    "service_name",
+    "cost_type",
+    "resource",
+]
+KEY_COLUMNS = ["cloud_account_id", *UNIQUE_FIELDS[1:]]
+UPDATE_FIELDS = [
+    "project_id",
+    "region",
+    "usage_amount",
+    "usage_unit",
+    "cost",
+    "currency",
+    "metadata",
+]
 
-    for item in raw_records:
-        # Convert timestamps
-        usage_start = datetime.fromisoformat(
-            item["usage_start_time"].replace("Z", "+00:00")
-        )
-        usage_end = datetime.fromisoformat(
-            item["usage_end_time"].replace("Z", "+00:00")
+record_key = attrgetter(*KEY_COLUMNS)
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def add_amounts(a, b):
+    if a is None or b is None:
+        return a if b is None else b
+    return a + b
+
+
+def sum_by_key(records, totals=None):
+    """
+    Collapse records sharing a unique key into one, summing their cost and
+    usage: ``{key: record}``, added onto ``totals`` when given. Memory grows
+    with the distinct keys, not with the lines, for line-item sources that
+    split one key across many lines.
+    """
+    totals = {} if totals is None else totals
+    for record in records:
+        key = record_key(record)
+        if key in totals:
+            totals[key].cost += record.cost
+            totals[key].usage_amount = add_amounts(
+                totals[key].usage_amount, record.usage_amount
+            )
+        else:
+            totals[key] = record
+    return totals
+
+
+def bulk_upsert_billing_records(records, batch_size=None):
+    """
+    Insert or update unsaved BillingRecords on their unique key with
+    ``bulk_create(update_conflicts=True)``, ``batch_size`` rows at a time.
+
+    Records must carry aware datetimes. Records sharing a key within a batch
+    are collapsed, the last one wins. Returns
+    ``{"inserted": n, "updated": n, "days": {usage day, ...}}``.
+    """
+    batch_size = batch_size or settings.BILLING_INGEST_BATCH_SIZE
+    result = {"inserted": 0, "updated": 0, "days": set()}
+
+    for chunk in chunked(records, batch_size):
+        batch = {record_key(record): record for record in chunk}
+
+        # one lookup per batch, only to tell inserts from updates; narrowed
+        # on every key column so it stays batch sized on large accounts
+        existing = BillingRecord.objects.filter(
+            **{
+                f"{column}__in": {getattr(record, column) for record in chunk}
+                for column in KEY_COLUMNS
+            }
+        ).values_list(*KEY_COLUMNS)
+        updated = len(batch.keys() & set(existing))
+
+        BillingRecord.objects.bulk_create(
+            batch.values(),
+            update_conflicts=True,
+            unique_fields=UNIQUE_FIELDS,
+            update_fields=UPDATE_FIELDS,
         )
 
-        obj, created = BillingRecord.objects.update_or_create(
+        result["inserted"] += len(batch) - updated
+        result["updated"] += updated
+        result["days"].update(record.usage_start.date() for record in chunk)
+
+    return result
+
+
+def write_billing_records(cloud_account, records, batch_size=None):
+    """
+    Upsert a cloud account's BillingRecords and refresh the daily rollup for
+    the days they touched, all in one transaction.
+    """
+    with transaction.atomic():
+        result = bulk_upsert_billing_records(records, batch_size)
+        days = result.pop("days")
+        if days:
+            refresh_daily_rollup(cloud_account, min(days), max(days))
+
+    return result
+
+
+def parse_timestamp(value):
+    """ISO 8601 (``Z`` suffix included) to an aware datetime, naive means UTC."""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def parse_raw_billing_records(cloud_account, raw_records):
+    """Yield unsaved BillingRecords for raw vendor billing items."""
+    for item in raw_records:
+        usage_amount = item.get("usage_amount")
+        yield BillingRecord(
             cloud_account=cloud_account,
-            usage_start=usage_start,
-            usage_end=usage_end,
+            usage_start=parse_timestamp(item["usage_start_time"]),
+            usage_end=parse_timestamp(item["usage_end_time"]),
             service_name=item.get("service", ""),
             project_id=item.get("project"),
             region=item.get("region"),
+            cost_type=item.get("cost_type") or "",
+            usage_amount=Decimal(str(usage_amount)) if usage_amount else None,
+            usage_unit=item.get("usage_unit"),
+            resource=item.get("resource_name") or "",
             cost=Decimal(str(item.get("cost", 0))),
-            defaults={
-                "cost_type": item.get("cost_type", ""),
-                "usage_amount": Decimal(str(item.get("usage_amount", 0)))
-                if item.get("usage_amount")
-                else None,
-                "usage_unit": item.get("usage_unit"),
-                "resource": item.get("resource_name"),
-                "currency": item.get("currency", "USD"),
-                "metadata": item,
-            },
+            currency=item.get("currency", "USD"),
+            metadata=item,
         )
-        if created:
-            created_count += 1
 
-    return created_count
+
+def save_billing_records(cloud_account, raw_records, batch_size=None):
+    """
+    Save raw billing data to the DB, upserting on BillingRecord's unique key.
+
+    ``raw_records`` can be any iterable, generators are streamed through
+    ``batch_size`` records at a time. Returns the inserted and updated row
+    counts.
+    """
+    return write_billing_records(
+        cloud_account, parse_raw_billing_records(cloud_account, raw_records), batch_size
+    )
 
 
 def ingest_billing_data(
-    cloud_account, access_token, projects, start_date, end_date, get_billing_data_func
+    cloud_account,
+    access_token,
+    projects,
+    start_date,
+    end_date,
+    get_billing_data_func,
+    max_workers=None,
 ):
-    """Main pipeline for ingestion."""
-    total_created = 0
+    """
+    Main pipeline for ingestion.
+
+    Projects are fetched on a pool of at most ``max_workers`` threads while
+    this thread writes each project's records, through
+    ``save_billing_records``, as soon as its fetch completes, so network and
+    database work overlap. At most twice ``max_workers`` fetched projects
+    wait to be written at any time.
+    """
+    max_workers = max_workers or settings.GCP_PROJECT_CONCURRENCY
+    totals = {"inserted": 0, "updated": 0}
 
-    for project in projects:
-        project_id = project["projectId"]
-        raw_records = get_billing_data_func(
-            access_token, project_id, start_date, end_date
+    def fetch(project):
+        # materialized here so the network I/O happens on the pool thread
+        return list(
+            get_billing_data_func(
+                access_token, project["projectId"], start_date, end_date
+            )
+            or []
         )
-        created_count = save_billing_records(cloud_account, raw_records)
-        total_created += created_count
 
-    # After all records are in, update summaries
-    # update_billing_summary(cloud_account, start_date, end_date)
+    projects = iter(projects)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = set()
+        while True:
+            for project in islice(projects, 2 * max_workers - len(pending)):
+                pending.add(pool.submit(fetch, project))
+            if not pending:
+                break
+
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                counts = save_billing_records(cloud_account, future.result())
+                totals["inserted"] += counts["inserted"]
+                totals["updated"] += counts["updated"]
 
-    return total_created
+    return totals
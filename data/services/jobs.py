@@ -0,0 +1,251 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils.timezone import now
+
+from data.models import BackgroundJob, JobStatus
+
+logger = logging.getLogger(__name__)
+
+# kind -> handler(job), filled by the @job_handler decorators in <app>/jobs.py
+HANDLERS = {}
+
+
+class JobFailed(Exception):
+    """
+    Raised by a handler whose work failed as a whole but produced a result
+    worth keeping, e.g. the per-account errors of a refresh. The job is
+    retried like on any other error.
+    """
+
+    def __init__(self, message, result=None):
+        super().__init__(message)
+        self.result = result
+
+
+class PartialResult:
+    """
+    Returned by a handler whose work only partly succeeded. The job ends as
+    partial with ``result``, and ``message`` as its error; it is not retried.
+    """
+
+    def __init__(self, result, message):
+        self.result = result
+        self.message = message
+
+
+def error_summary(exc, limit=200):
+    """
+    One line describing ``exc`` for API consumers: its type and first message
+    argument. Tracebacks and further arguments, like upstream response
+    bodies, only go to the server logs.
+    """
+    message = exc.args[0] if exc.args and isinstance(exc.args[0], str) else ""
+    message = message.strip().partition("\n")[0]
+    summary = f"{type(exc).__name__}: {message}" if message else type(exc).__name__
+    return summary[:limit]
+
+
+def job_handler(kind):
+    """Register a function as the handler of a job kind."""
+
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+
+    return register
+
+
+def enqueue_job(kind, organization=None, cloud_account=None, payload=None, **fields):
+    if cloud_account is not None and organization is None:
+        organization = cloud_account.organization
+    return BackgroundJob.objects.create(
+        kind=kind,
+        organization=organization,
+        cloud_account=cloud_account,
+        payload=payload or {},
+        max_attempts=fields.pop("max_attempts", settings.JOB_MAX_ATTEMPTS),
+        **fields,
+    )
+
+
+def active_job(kind, **lookups):
+    """The pending or running job of ``kind`` matching ``lookups``, if any."""
+    return (
+        BackgroundJob.objects.filter(
+            kind=kind, status__in=[JobStatus.PENDING, JobStatus.RUNNING], **lookups
+        )
+        .order_by("created_at")
+        .first()
+    )
+
+
+def claim_next_job():
+    """
+    Atomically move the next due job from pending to running and return it.
+
+    The claim is a conditional UPDATE, so concurrent workers never run the
+    same job twice on any database backend.
+    """
+    due = (
+        BackgroundJob.objects.filter(status=JobStatus.PENDING, run_after__lte=now())
+        .order_by("run_after")
+        .values_list("id", flat=True)[:10]
+    )
+    for job_id in due:
+        claimed = BackgroundJob.objects.filter(
+            id=job_id, status=JobStatus.PENDING
+        ).update(
+            status=JobStatus.RUNNING,
+            attempts=F("attempts") + 1,
+            started_at=now(),
+            lease_expires_at=lease_expiry(),
+            finished_at=None,
+        )
+        if claimed:
+            return BackgroundJob.objects.select_related(
+                "organization", "cloud_account"
+            ).get(id=job_id)
+    return None
+
+
+def lease_expiry():
+    return now() + timedelta(seconds=settings.JOB_LEASE_SECONDS)
+
+
+def renew_leases(job_ids):
+    """Extend the leases of the running jobs ``job_ids``, the worker's heartbeat."""
+    if not job_ids:
+        return 0
+    return BackgroundJob.objects.filter(
+        id__in=job_ids, status=JobStatus.RUNNING
+    ).update(lease_expires_at=lease_expiry())
+
+
+def requeue_stale_jobs():
+    """
+    Put back running jobs whose lease expired, i.e. whose worker died or hung
+    mid-job. The lost run counts as an attempt: jobs with attempts left are
+    retried with backoff, the others fail. Returns the number of jobs.
+    """
+    expired = BackgroundJob.objects.filter(status=JobStatus.RUNNING).filter(
+        Q(lease_expires_at__lt=now()) | Q(lease_expires_at__isnull=True)
+    )
+    count = 0
+    for job in expired.select_related("organization", "cloud_account"):
+        job.last_error = "Job lost its worker: the lease expired while running."
+        if job.attempts < job.max_attempts:
+            job.status = JobStatus.PENDING
+            job.run_after = now() + retry_delay(job.attempts)
+        else:
+            job.status = JobStatus.FAILED
+            job.finished_at = now()
+
+        # unless its worker renewed the lease or another worker got there first
+        requeued = BackgroundJob.objects.filter(
+            id=job.id,
+            status=JobStatus.RUNNING,
+            lease_expires_at=job.lease_expires_at,
+        ).update(
+            status=job.status,
+            run_after=job.run_after,
+            finished_at=job.finished_at,
+            last_error=job.last_error,
+            lease_expires_at=None,
+            updated_at=now(),
+        )
+        if requeued:
+            logger.warning("Job %s (%s): %s", job.id, job.kind, job.last_error)
+            count += 1
+            if job.finished_at is not None:
+                notify_job_outcome(job)
+    return count
+
+
+def retry_delay(attempts):
+    """Exponential backoff: base, 2x base, 4x base... capped at the maximum."""
+    delay = settings.JOB_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(delay, settings.JOB_RETRY_MAX_SECONDS))
+
+
+def run_job(job):
+    """
+    Run a claimed job and record its outcome, rescheduling it on failure.
+    Only a one-line summary of an error is stored, the traceback is logged.
+    """
+    handler = HANDLERS.get(job.kind)
+
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for job kind '{job.kind}'.")
+        result = handler(job)
+    except Exception as e:
+        if isinstance(e, JobFailed):
+            job.result = e.result
+        job.last_error = error_summary(e)
+        if handler is not None and job.attempts < job.max_attempts:
+            job.status = JobStatus.PENDING
+            job.run_after = now() + retry_delay(job.attempts)
+        else:
+            job.status = JobStatus.FAILED
+            job.finished_at = now()
+        logger.exception("Job %s (%s) failed", job.id, job.kind)
+    else:
+        if isinstance(result, PartialResult):
+            job.status = JobStatus.PARTIAL
+            job.result = result.result
+            job.last_error = result.message
+            logger.warning("Job %s (%s): %s", job.id, job.kind, result.message)
+        else:
+            job.status = JobStatus.SUCCEEDED
+            job.result = result
+            job.last_error = ""
+        job.finished_at = now()
+
+    job.lease_expires_at = None
+    job.save(
+        update_fields=[
+            "result",
+            "status",
+            "last_error",
+            "run_after",
+            "lease_expires_at",
+            "finished_at",
+            "updated_at",
+        ]
+    )
+    if job.finished_at is not None:
+        notify_job_outcome(job)
+    return job
+
+
+def notify_job_outcome(job):
+    """
+    Queue a notification to the organization's admins once a job of a
+    JOB_NOTIFY_KINDS kind has succeeded, partly failed or run out of
+    attempts.
+    """
+    if job.kind not in settings.JOB_NOTIFY_KINDS or job.organization_id is None:
+        return None
+
+    subject = job.cloud_account or job.organization
+    if job.status == JobStatus.FAILED:
+        title = "Data refresh failed"
+        message = f"{job.kind} for {subject} failed after {job.attempts} attempts."
+        type = "error"
+    elif job.status == JobStatus.PARTIAL:
+        title = "Data refresh partly failed"
+        message = f"{job.kind} for {subject} finished with errors: {job.last_error}"
+        type = "warning"
+    else:
+        title = "Data refresh finished"
+        message = f"{job.kind} for {subject} finished."
+        type = "success"
+
+    return enqueue_job(
+        "notification_fanout",
+        organization=job.organization,
+        payload={"title": title, "message": message, "type": type},
+    )
@@ -0,0 +1,186 @@
+# Optional monthly range partitioning of BillingRecord on usage_start, for
+# the Postgres backend. Rows outside every monthly partition land in a
+# default partition, so ingestion never fails on an odd date; they are moved
+# out when their month's partition is created.
+import re
+from datetime import date
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from django.utils.timezone import now
+
+from data.models import BillingRecord
+from data.utils.day_range import add_months, month_start
+
+TABLE = BillingRecord._meta.db_table
+DEFAULT_PARTITION = f"{TABLE}_default"
+MONTH_PARTITION = re.compile(rf"^{TABLE}_(\d{{4}})(\d{{2}})$")
+
+
+def partition_name(month):
+    return f"{TABLE}_{month:%Y%m}"
+
+
+def timestamp_literal(month):
+    # bounds are UTC midnights, the same instants usage_start is stored in
+    return f"'{month:%Y-%m-%d} 00:00:00+00'"
+
+
+def ensure_postgres():
+    if connection.vendor != "postgresql":
+        raise ImproperlyConfigured(
+            "BillingRecord partitioning needs the Postgres backend (USE_PG=True)."
+        )
+
+
+def is_partitioned():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass",
+            [TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def month_partitions():
+    """``{month: partition name}`` of the attached monthly partitions."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = %s::regclass
+            """,
+            [TABLE],
+        )
+        names = [name for (name,) in cursor.fetchall()]
+
+    partitions = {}
+    for name in names:
+        if match := MONTH_PARTITION.match(name):
+            partitions[date(int(match[1]), int(match[2]), 1)] = name
+    return partitions
+
+
+def ensure_month_partition(month):
+    """
+    Create the partition of ``month`` unless it exists, moving the month's
+    rows out of the default partition first. Returns whether it was created.
+    """
+    month = month_start(month)
+    if month in month_partitions():
+        return False
+
+    name = partition_name(month)
+    lower = timestamp_literal(month)
+    upper = timestamp_literal(add_months(month, 1))
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT 1 FROM {DEFAULT_PARTITION} "
+            f"WHERE usage_start >= {lower} AND usage_start < {upper} LIMIT 1"
+        )
+        if cursor.fetchone() is None:
+            cursor.execute(
+                f"CREATE TABLE {name} PARTITION OF {TABLE} "
+                f"FOR VALUES FROM ({lower}) TO ({upper})"
+            )
+        else:
+            # a new partition may not overlap rows still in the default one
+            cursor.execute(f"CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS)")
+            cursor.execute(
+                f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+                f"WHERE usage_start >= {lower} AND usage_start < {upper} "
+                f"RETURNING *) INSERT INTO {name} SELECT * FROM moved"
+            )
+            cursor.execute(
+                f"ALTER TABLE {TABLE} ATTACH PARTITION {name} "
+                f"FOR VALUES FROM ({lower}) TO ({upper})"
+            )
+    return True
+
+
+def ensure_partitions(since, until):
+    """Create the monthly partitions of every month in [since, until]."""
+    created = []
+    month = month_start(since)
+    while month <= until:
+        if ensure_month_partition(month):
+            created.append(partition_name(month))
+        month = add_months(month, 1)
+    return created
+
+
+def expire_partitions(before, drop=False):
+    """
+    Detach the monthly partitions that end on or before ``before``'s month,
+    and drop them when ``drop``. Detached tables keep their rows for an
+    archive or a manual re-attach.
+    """
+    expired = []
+    with connection.cursor() as cursor:
+        for month, name in sorted(month_partitions().items()):
+            if month >= month_start(before):
+                break
+            cursor.execute(f"ALTER TABLE {TABLE} DETACH PARTITION {name}")
+            if drop:
+                cursor.execute(f"DROP TABLE {name}")
+            expired.append(name)
+    return expired
+
+
+def convert_to_partitioned(months_ahead, keep_legacy=False):
+    """
+    Rebuild BillingRecord as a table partitioned by month on usage_start,
+    in one transaction. Indexes and constraints are recreated under their
+    Django names; the primary key becomes (id, usage_start), since
+    Postgres requires the partition key in every unique index.
+    """
+    legacy = f"{TABLE}_unpartitioned"
+    with transaction.atomic(), connection.cursor() as cursor:
+        # run the deferred foreign key checks of rows written earlier in the
+        # transaction, pending ones keep the table from being altered
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        cursor.execute(
+            "SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype IN ('p', 'u', 'f', 'c')",
+            [TABLE],
+        )
+        constraints = cursor.fetchall()
+        cursor.execute(
+            "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s "
+            "AND indexname NOT IN "
+            "(SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass)",
+            [TABLE, TABLE],
+        )
+        indexes = cursor.fetchall()
+        cursor.execute(f"SELECT min(usage_start) FROM {TABLE}")
+        (first_usage,) = cursor.fetchone()
+
+        # free the names for the new table
+        cursor.execute(f"ALTER TABLE {TABLE} RENAME TO {legacy}")
+        for name, _ in indexes:
+            cursor.execute(f"DROP INDEX {name}")
+        for name, _, _ in constraints:
+            cursor.execute(f"ALTER TABLE {legacy} DROP CONSTRAINT {name}")
+
+        cursor.execute(
+            f"CREATE TABLE {TABLE} (LIKE {legacy} INCLUDING DEFAULTS) "
+            "PARTITION BY RANGE (usage_start)"
+        )
+        for name, kind, definition in constraints:
+            if kind == "p":
+                definition = "PRIMARY KEY (id, usage_start)"
+            cursor.execute(f"ALTER TABLE {TABLE} ADD CONSTRAINT {name} {definition}")
+        for _, definition in indexes:
+            cursor.execute(definition)
+        cursor.execute(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT")
+
+        today = now().date()
+        ensure_partitions(
+            first_usage.date() if first_usage else today,
+            add_months(month_start(today), months_ahead),
+        )
+
+        cursor.execute(f"INSERT INTO {TABLE} SELECT * FROM {legacy}")
+        if not keep_legacy:
+            cursor.execute(f"DROP TABLE {legacy}")
@@ -0,0 +1,178 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.timezone import now
+
+from data.integration_helpers.aws import (
+    fetch_cost_and_usage,
+    get_account_aws_client,
+    save_billing_data_efficient,
+)
+from data.models import CloudAccount, IngestionState, IngestionStatus
+
+from .jobs import error_summary
+
+logger = logging.getLogger(__name__)
+
+# days pulled on an account's first refresh
+INITIAL_BACKFILL_DAYS = 30
+
+
+def refresh_cloud_account(cloud_account):
+    """
+    Pull an account's billing data from its watermark on, re-fetching the
+    trailing restatement window, and advance the watermark in the same
+    transaction as the data.
+    """
+    if cloud_account.vendor.lower() != "aws":
+        return {"status": "skipped", "message": "Cloud account is not AWS."}
+
+    state, _ = IngestionState.objects.get_or_create(cloud_account=cloud_account)
+
+    # end is exclusive: Cost Explorer only has complete days before today
+    end_date = now().date()
+    if state.watermark:
+        start_date = state.watermark + timedelta(days=1 - state.restatement_days)
+    else:
+        start_date = end_date - timedelta(days=INITIAL_BACKFILL_DAYS)
+
+    if start_date >= end_date:
+        return {"status": "up_to_date", "message": "Data is already up to date."}
+
+    counts = ingest_window(cloud_account, state, start_date, end_date)
+    return {
+        "status": "refreshed",
+        "message": f"Billing data refreshed from {start_date} to {end_date}.",
+        **counts,
+    }
+
+
+def backfill_cloud_account(cloud_account, start_date, end_date):
+    """
+    Pull an AWS account's billing data from ``start_date`` up to
+    ``end_date`` (exclusive), e.g. when it is connected, so the next refresh
+    starts from where the backfill ended.
+    """
+    state, _ = IngestionState.objects.get_or_create(cloud_account=cloud_account)
+    return ingest_window(cloud_account, state, start_date, end_date)
+
+
+def ingest_window(cloud_account, state, start_date, end_date):
+    """
+    Ingest an AWS account's Cost Explorer data from ``start_date`` up to
+    ``end_date`` (exclusive) and record the run on its IngestionState. The
+    watermark moves to the window's last day in the same transaction as the
+    data, unless that would move it back or skip days after it.
+    """
+    started = time.monotonic()
+    state.last_run_at = now()
+    try:
+        # Get AWS Cost Explorer client
+        client = get_account_aws_client(cloud_account)
+
+        # Fetch new cost & usage data
+        cost_response = fetch_cost_and_usage(client, start_date, end_date)
+
+        # Save new records together with the watermark they complete
+        with transaction.atomic():
+            counts = save_billing_data_efficient(cloud_account, cost_response)
+            last_day = end_date - timedelta(days=1)
+            if state.watermark is None:
+                state.watermark = last_day
+            elif start_date <= state.watermark + timedelta(days=1):
+                state.watermark = max(state.watermark, last_day)
+            state.last_status = IngestionStatus.SUCCEEDED
+            state.last_error = ""
+            state.last_duration = timedelta(seconds=time.monotonic() - started)
+            state.save()
+    except Exception as e:
+        state.last_status = IngestionStatus.FAILED
+        state.last_error = error_summary(e)
+        state.last_duration = timedelta(seconds=time.monotonic() - started)
+        state.save(
+            update_fields=[
+                "last_status",
+                "last_error",
+                "last_run_at",
+                "last_duration",
+                "updated_at",
+            ]
+        )
+        raise
+
+    return counts
+
+
+# vendor -> semaphore shared by every refresh running in this process, so
+# concurrent organization refreshes together stay under the vendor limit
+_vendor_slots = {}
+_vendor_slots_lock = threading.Lock()
+
+
+def vendor_slot(vendor):
+    with _vendor_slots_lock:
+        if vendor not in _vendor_slots:
+            limit = settings.REFRESH_VENDOR_CONCURRENCY.get(
+                vendor, settings.REFRESH_MAX_WORKERS
+            )
+            _vendor_slots[vendor] = threading.BoundedSemaphore(limit)
+        return _vendor_slots[vendor]
+
+
+def timed_refresh(cloud_account):
+    """
+    Refresh one account within its vendor's concurrency limit, turning any
+    error into an outcome. Runs on a pool thread.
+    """
+    started = None
+    try:
+        with vendor_slot(cloud_account.vendor.lower()):
+            started = time.monotonic()
+            outcome = refresh_cloud_account(cloud_account)
+    except Exception as e:
+        logger.exception("Refreshing cloud account %s failed", cloud_account.id)
+        outcome = {
+            "status": "error",
+            "message": f"Error refreshing billing data: {error_summary(e)}",
+        }
+    finally:
+        # the pool thread opened its own connection, don't leak it
+        connection.close()
+    # time spent refreshing, not waiting for a vendor slot
+    outcome["duration"] = round(time.monotonic() - (started or time.monotonic()), 3)
+    return outcome
+
+
+def refresh_organization(organization, max_workers=None):
+    """
+    Refresh every cloud account of an organization in parallel.
+
+    The work is network-bound (STS, Cost Explorer), so accounts fan out on
+    a thread pool and the refresh takes about as long as the slowest one.
+    Returns ``{account_id: outcome}``, each outcome with its duration.
+    """
+    cloud_accounts = list(CloudAccount.objects.filter(organization=organization))
+    if not cloud_accounts:
+        return {}
+
+    max_workers = min(max_workers or settings.REFRESH_MAX_WORKERS, len(cloud_accounts))
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        outcomes = pool.map(timed_refresh, cloud_accounts)
+        return {
+            str(cloud_account.id): outcome
+            for cloud_account, outcome in zip(cloud_accounts, outcomes)
+        }
+
+
+def failed_refreshes(outcomes):
+    """Ids of the accounts whose refresh in ``outcomes`` ended in an error."""
+    return [
+        account_id
+        for account_id, outcome in outcomes.items()
+        if outcome["status"] == "error"
+    ]
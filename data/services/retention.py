@@ -0,0 +1,68 @@
+# Retention tiers of billing data: raw BillingRecords, then DailyCostRollup,
+# then MonthlyCostRollup, each kept for as long as its setting says.
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min
+from django.utils.timezone import localtime, now
+
+from data.models import BillingRecord, DailyCostRollup
+from data.utils.day_range import add_months, day_start, month_start
+
+
+def raw_retention_start(today=None):
+    """Oldest day raw BillingRecords are kept for, None when kept forever."""
+    if not settings.BILLING_RAW_RETENTION_DAYS:
+        return None
+    today = today or now().date()
+    return today - timedelta(days=settings.BILLING_RAW_RETENTION_DAYS)
+
+
+def raw_data_start():
+    """
+    Oldest day the rollups can be rebuilt from raw BillingRecords, None when
+    there are none. The raw retention horizon, or the first day still
+    present when older rows are gone already: expired under a shorter
+    setting, or with their partition detached or dropped.
+    """
+    first = BillingRecord.objects.aggregate(first=Min("usage_start"))["first"]
+    if first is None:
+        return None
+    start = localtime(first).date()
+    horizon = raw_retention_start()
+    return start if horizon is None else max(start, horizon)
+
+
+def daily_retention_start(today=None):
+    """
+    Oldest day DailyCostRollup rows are kept for, None when kept forever.
+    Always a first of the month, so no month is split between tiers.
+    """
+    if not settings.BILLING_DAILY_RETENTION_MONTHS:
+        return None
+    today = today or now().date()
+    return add_months(month_start(today), -settings.BILLING_DAILY_RETENTION_MONTHS)
+
+
+def expire_raw_records(before, dry_run=False):
+    """Delete the BillingRecords of usage days before ``before``."""
+    expired = BillingRecord.objects.filter(usage_start__lt=day_start(before))
+    if dry_run:
+        return expired.count()
+    with transaction.atomic():
+        deleted, _ = expired.delete()
+    return deleted
+
+
+def expire_daily_rollups(before, dry_run=False):
+    """
+    Delete the DailyCostRollup rows of days before ``before``. Their months
+    are already in MonthlyCostRollup, which the rollup refresh keeps in step.
+    """
+    expired = DailyCostRollup.objects.filter(day__lt=before)
+    if dry_run:
+        return expired.count()
+    with transaction.atomic():
+        deleted, _ = expired.delete()
+    return deleted
@@ -0,0 +1,129 @@
+from django.db import transaction
+from django.db.models import DecimalField, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate, TruncMonth
+
+from data.models import BillingRecord, DailyCostRollup, MonthlyCostRollup
+from data.utils.day_range import add_months, day_range_filter, month_start
+
+from .aggregate_cache import bump_data_version
+from .retention import daily_retention_start, raw_data_start
+
+
+def daily_totals(cloud_account, since, until):
+    """
+    The per-day totals of a cloud account's BillingRecords for the days in
+    [since, until], a range scan of ``billing_account_usage_idx``.
+    """
+    zero = Value(0, output_field=DecimalField())
+    return (
+        BillingRecord.objects.filter(
+            cloud_account=cloud_account,
+            **day_range_filter("usage_start", since, until),
+        )
+        .annotate(day=TruncDate("usage_start"))
+        .values("day", "service_name", "region", "currency")
+        .annotate(
+            total_cost=Coalesce(Sum("cost"), zero),
+            total_usage=Coalesce(Sum("usage_amount"), zero),
+        )
+        .order_by()
+    )
+
+
+def refresh_daily_rollup(cloud_account, since, until):
+    """
+    Recompute the DailyCostRollup rows of a cloud account for the days in
+    [since, until] from its raw BillingRecords, then the MonthlyCostRollup
+    rows of their months, and invalidate the organization's cached
+    aggregates.
+
+    Days before the oldest raw data are left alone (see raw_data_start),
+    their raw rows are gone and the rollup is all that is left of them.
+
+    Runs in the caller's transaction when there is one, so the writers can
+    keep the rollup in step with the rows they just saved.
+    """
+    horizon = raw_data_start()
+    if horizon is None:
+        return 0
+    since = max(since, horizon)
+    if since > until:
+        return 0
+
+    rows = daily_totals(cloud_account, since, until)
+    with transaction.atomic():
+        DailyCostRollup.objects.filter(
+            cloud_account=cloud_account, day__gte=since, day__lte=until
+        ).delete()
+        created = DailyCostRollup.objects.bulk_create(
+            (
+                DailyCostRollup(
+                    cloud_account=cloud_account,
+                    day=row["day"],
+                    service_name=row["service_name"],
+                    region=row["region"],
+                    currency=row["currency"],
+                    cost=row["total_cost"],
+                    usage_amount=row["total_usage"],
+                )
+                for row in rows
+            ),
+            batch_size=1000,
+        )
+        refresh_monthly_rollup(cloud_account, since, until)
+        bump_data_version(cloud_account.organization_id)
+
+    return len(created)
+
+
+def refresh_monthly_rollup(cloud_account, since, until):
+    """
+    Recompute the MonthlyCostRollup rows of a cloud account for the months
+    of the days in [since, until] from its DailyCostRollup rows.
+
+    Months before the daily retention horizon are left alone, their daily
+    rows are gone and the monthly rollup is all that is left of them.
+    """
+    since = month_start(since)
+    horizon = daily_retention_start()
+    if horizon is not None:
+        since = max(since, horizon)
+    if since > until:
+        return 0
+
+    zero = Value(0, output_field=DecimalField())
+    end = add_months(month_start(until), 1)
+    rows = (
+        DailyCostRollup.objects.filter(
+            cloud_account=cloud_account, day__gte=since, day__lt=end
+        )
+        .annotate(month=TruncMonth("day"))
+        .values("month", "service_name", "region", "currency")
+        .annotate(
+            total_cost=Coalesce(Sum("cost"), zero),
+            total_usage=Coalesce(Sum("usage_amount"), zero),
+        )
+        .order_by()
+    )
+
+    with transaction.atomic():
+        MonthlyCostRollup.objects.filter(
+            cloud_account=cloud_account, month__gte=since, month__lt=end
+        ).delete()
+        created = MonthlyCostRollup.objects.bulk_create(
+            (
+                MonthlyCostRollup(
+                    cloud_account=cloud_account,
+                    month=row["month"],
+                    service_name=row["service_name"],
+                    region=row["region"],
+                    currency=row["currency"],
+                    cost=row["total_cost"],
+                    usage_amount=row["total_usage"],
+                )
+                for row in rows
+            ),
+            batch_size=1000,
+        )
+
+    return len(created)
@@ -0,0 +1,15 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import CloudAccount
+from .services.aggregate_cache import bump_data_version
+
+
+# accounts are listed by name in the aggregates and their costs are summed,
+# whichever view or admin form connected, renamed or removed one. The
+# rollups and raw records are bumped for by their writers instead; a
+# receiver on them would turn every bulk delete into row by row deletes.
+@receiver(post_save, sender=CloudAccount)
+@receiver(post_delete, sender=CloudAccount)
+def invalidate_cached_aggregates(sender, instance, **kwargs):
+    bump_data_version(instance.organization_id)
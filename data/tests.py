@@ -1,3 +1,1317 @@
-from django.test import TestCase
+import csv
+import gzip
+import json
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipIf, skipUnless
 
-# Create your tests here.
+import pyarrow as pa
+import pyarrow.parquet as pq
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import Min, Sum
+from django.http import StreamingHttpResponse
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.timezone import now
+from rest_framework_simplejwt.tokens import AccessToken
+
+from authentication.models import CustomUser
+from company.models import Company, Organization
+from data.aggregators.account import get_account_totals
+from data.integration_helpers.aws import (
+    AssumedRoleClientCache,
+    save_billing_data_efficient,
+)
+from data.integration_helpers.azure import (
+    fetch_subscription_usage,
+    ingest_azure_billing,
+)
+from data.integration_helpers.cur import LocalObjectStore, ingest_cost_report
+from data.jobs import aws_backfill, org_refresh
+from data.models import (
+    AzureOAuthToken,
+    BackgroundJob,
+    BillingRecord,
+    CloudAccount,
+    CloudVendor,
+    DailyCostRollup,
+    IngestionState,
+    IngestionStatus,
+    JobStatus,
+)
+from data.services import partitioning, refresh
+from data.services.aggregate_cache import bump_data_version
+from data.services.export import DICTIONARY_COLUMNS, EXPORT_COLUMNS, PARQUET_SCHEMA
+from data.services.ingestion import ingest_billing_data, write_billing_records
+from data.services.jobs import (
+    claim_next_job,
+    enqueue_job,
+    renew_leases,
+    requeue_stale_jobs,
+    run_job,
+)
+from data.services.refresh import backfill_cloud_account, refresh_cloud_account
+from data.services.retention import expire_raw_records, raw_retention_start
+from data.services.rollup import (
+    daily_totals,
+    refresh_daily_rollup,
+    refresh_monthly_rollup,
+)
+from data.utils.day_range import add_months, day_start, month_start
+
+
+def create_organization(name):
+    owner = CustomUser.objects.create_user(email=f"{name}@example.com")
+    company = Company.objects.create(name=name, owner=owner)
+    return Organization.objects.create(name=name, company=company)
+
+
+def create_accounts(organization, count, days=3):
+    """``count`` AWS accounts of ``organization``, each with a few days of costs."""
+    today = now().date()
+    start = CloudAccount.objects.filter(organization=organization).count()
+    for index in range(start, start + count):
+        account = CloudAccount.objects.create(
+            organization=organization,
+            vendor=CloudVendor.AWS,
+            account_name=f"account-{index}",
+            account_id=str(index),
+        )
+        DailyCostRollup.objects.bulk_create(
+            DailyCostRollup(
+                cloud_account=account,
+                day=today - timedelta(days=day),
+                service_name=service_name,
+                region="us-east-1",
+                cost=Decimal("1.25"),
+                usage_amount=Decimal("2"),
+            )
+            for day in range(days)
+            for service_name in ("AmazonEC2", "AmazonS3")
+        )
+
+
+class AggregateQueryCountTests(TestCase):
+    """The summary and widget endpoints don't query per cloud account."""
+
+    endpoints = [
+        "billing_daily_costs",
+        "billing_cost_by_service",
+        "billing_cost_by_region",
+        "billing_cost_bay_service_day",
+        "cost-monthly-summary-by-service",
+        "cost-summary-by-service",
+        "cost-summary-by-account",
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = create_organization("acme")
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, endpoint):
+        url = reverse(endpoint, args=[self.organization.id])
+        response = self.client.get(url, {"days": 7})
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_query_count_does_not_grow_with_accounts(self):
+        create_accounts(self.organization, 1)
+        queries = {}
+        for endpoint in self.endpoints:
+            with CaptureQueriesContext(connection) as context:
+                self.get(endpoint)
+            queries[endpoint] = len(context.captured_queries)
+
+        create_accounts(self.organization, 9)
+        cache.clear()
+        for endpoint in self.endpoints:
+            with self.subTest(endpoint=endpoint):
+                with self.assertNumQueries(queries[endpoint]):
+                    response = self.get(endpoint)
+                self.assertEqual(len(response.data["results"]), 10)
+
+
+class OrganizationsSummaryQueryCountTests(TestCase):
+    """The multi-organization summary doesn't query per organization or account."""
+
+    def setUp(self):
+        cache.clear()
+
+    def post(self, organizations):
+        org_ids = [str(organization.id) for organization in organizations]
+        response = self.client.post(
+            reverse("cost-monthly-daily-summary-by-organization") + "?days=7",
+            {"org_ids": org_ids},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_query_count_does_not_grow_with_organizations(self):
+        first = create_organization("org-0")
+        create_accounts(first, 1)
+        with CaptureQueriesContext(connection) as context:
+            self.post([first])
+        queries = len(context.captured_queries)
+
+        organizations = [first]
+        for index in range(1, 5):
+            organization = create_organization(f"org-{index}")
+            create_accounts(organization, 4)
+            organizations.append(organization)
+        cache.clear()
+        with self.assertNumQueries(queries):
+            response = self.post(organizations)
+        self.assertEqual(
+            sorted(len(accounts) for accounts in response.data["results"].values()),
+            [1, 4, 4, 4, 4],
+        )
+
+        # cached organizations only cost the version lookup
+        with self.assertNumQueries(1):
+            self.post(organizations)
+
+
+class AccountTotalsRetentionTests(TestCase):
+    """Account totals of whole months survive the expiry of their daily rows."""
+
+    def test_compacted_month_keeps_its_period_total(self):
+        organization = create_organization("acme")
+        create_accounts(organization, 1, days=0)
+        account = CloudAccount.objects.get()
+        month = add_months(month_start(now().date()), -3)
+        last_day = add_months(month, 1) - timedelta(days=1)
+        DailyCostRollup.objects.bulk_create(
+            DailyCostRollup(
+                cloud_account=account,
+                day=month + timedelta(days=day),
+                service_name="AmazonEC2",
+                cost=Decimal("1.25"),
+            )
+            for day in range(last_day.day)
+        )
+        refresh_monthly_rollup(account, month, last_day)
+
+        with self.settings(BILLING_DAILY_RETENTION_MONTHS=1):
+            call_command("compact_billing_data", stdout=StringIO())
+        self.assertFalse(DailyCostRollup.objects.filter(day__lte=last_day).exists())
+
+        totals = get_account_totals(str(organization.id), month, last_day)
+        self.assertEqual(
+            totals[str(account.id)]["total_period"], Decimal("1.25") * last_day.day
+        )
+
+
+class AggregateInvalidationTests(TestCase):
+    """Account changes from any view reach the cached aggregates and ETags."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = create_organization("acme")
+        create_accounts(cls.organization, 1)
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, **headers):
+        url = reverse("cost-summary-by-account", args=[self.organization.id])
+        return self.client.get(url, {"days": 7}, headers=headers)
+
+    def assertChanged(self, change):
+        etag = self.get()["ETag"]
+        self.assertEqual(self.get(if_none_match=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        response = self.get(if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        return response
+
+    def test_connected_account_is_listed(self):
+        # the connect views create accounts directly, not through the viewset
+        response = self.assertChanged(lambda: create_accounts(self.organization, 1))
+        self.assertEqual(len(response.data["results"]), 2)
+
+    def test_renamed_account_is_listed_under_its_new_name(self):
+        account = CloudAccount.objects.get()
+
+        def rename():
+            account.account_name = "production"
+            account.save()
+
+        self.assertChanged(rename)
+
+    def test_deleted_account_drops_out(self):
+        response = self.assertChanged(CloudAccount.objects.get().delete)
+        self.assertFalse(response.data["results"])
+
+    def test_deleting_the_organization_skips_the_bump(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.organization.delete()
+
+
+class AggregateETagTests(TestCase):
+    """Aggregate responses carry an ETag that revalidates without queries."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = create_organization("acme")
+        create_accounts(cls.organization, 1)
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, endpoint="cost-summary-by-service", days=7, **headers):
+        url = reverse(endpoint, args=[self.organization.id])
+        return self.client.get(url, {"days": days}, headers=headers)
+
+    def test_etag_is_stable_per_endpoint_and_range(self):
+        response = self.get()
+        etag = response["ETag"]
+        self.assertRegex(etag, r'^"[0-9a-f]{32}"$')
+        self.assertEqual(response["Cache-Control"], settings.AGGREGATE_CACHE_CONTROL)
+        self.assertIn("Authorization", response["Vary"])
+
+        self.assertEqual(self.get()["ETag"], etag)
+        self.assertNotEqual(self.get(days=14)["ETag"], etag)
+        self.assertNotEqual(self.get("cost-summary-by-account")["ETag"], etag)
+
+    def test_matching_if_none_match_is_answered_304_without_aggregating(self):
+        etag = self.get()["ETag"]
+        for if_none_match in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+            with self.subTest(if_none_match=if_none_match):
+                # only the data version is read
+                with self.assertNumQueries(1):
+                    response = self.get(if_none_match=if_none_match)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response["ETag"], etag)
+                self.assertFalse(response.content)
+
+        self.assertEqual(self.get(if_none_match='"other"').status_code, 200)
+
+    def test_bumping_the_data_version_changes_the_etag(self):
+        etag = self.get()["ETag"]
+        self.assertEqual(self.get(if_none_match=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_data_version(self.organization.id)
+        response = self.get(if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(self.get(if_none_match=response["ETag"]).status_code, 304)
+
+
+def cost_explorer_response(days, services, cost):
+    """A Cost Explorer ``get_cost_and_usage`` response, ``cost`` per group."""
+    start = now().date() - timedelta(days=days)
+    return {
+        "ResultsByTime": [
+            {
+                "TimePeriod": {
+                    "Start": str(start + timedelta(days=day)),
+                    "End": str(start + timedelta(days=day + 1)),
+                },
+                "Groups": [
+                    {
+                        "Keys": [service_name, "BoxUsage"],
+                        "Metrics": {
+                            "UnblendedCost": {"Amount": cost},
+                            "UsageQuantity": {"Amount": "1"},
+                        },
+                    }
+                    for service_name in services
+                ],
+            }
+            for day in range(days)
+        ]
+    }
+
+
+class BulkUpsertTests(TestCase):
+    """Cost Explorer results are upserted on BillingRecord's unique key."""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_accounts(create_organization("acme"), 1, days=0)
+        cls.account = CloudAccount.objects.get()
+
+    def ingest(self, cost):
+        response = cost_explorer_response(3, ["AmazonEC2", "AmazonS3"], cost)
+        return save_billing_data_efficient(self.account, response, batch_size=4)
+
+    def test_insert_then_update_keeps_one_row_per_key(self):
+        self.assertEqual(self.ingest("1.5"), {"inserted": 6, "updated": 0})
+        self.assertEqual(BillingRecord.objects.count(), 6)
+
+        self.assertEqual(self.ingest("2.5"), {"inserted": 0, "updated": 6})
+        self.assertEqual(BillingRecord.objects.count(), 6)
+        self.assertEqual(
+            set(BillingRecord.objects.values_list("cost", flat=True)),
+            {Decimal("2.5")},
+        )
+
+    def test_benchmark_leaves_no_rows_behind(self):
+        out = StringIO()
+        call_command("benchmark_billing_ingest", "--days=2", "--groups=3", stdout=out)
+        self.assertIn("bulk upsert update", out.getvalue())
+        self.assertFalse(CloudAccount.objects.filter(account_name="benchmark"))
+        self.assertEqual(BillingRecord.objects.count(), 0)
+
+    def test_rollup_follows_the_updated_rows(self):
+        self.ingest("1.5")
+        self.ingest("2.5")
+        rollup = DailyCostRollup.objects.filter(cloud_account=self.account)
+        self.assertEqual(rollup.count(), 6)
+        self.assertEqual(rollup.aggregate(total=Sum("cost"))["total"], Decimal("15"))
+
+
+class FillKeyNullsMigrationTests(TransactionTestCase):
+    """0007 keeps the latest version of rows that collide on the new key."""
+
+    before = [("data", "0006_dailycostrollup")]
+    after = [("data", "0007_fill_billingrecord_key_nulls")]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_restated_costs_are_not_summed(self):
+        organization = create_organization("acme")
+        apps = self.migrate(self.before)
+        CloudAccount = apps.get_model("data", "CloudAccount")
+        BillingRecord = apps.get_model("data", "BillingRecord")
+        account = CloudAccount.objects.create(
+            organization_id=organization.id,
+            vendor="AWS",
+            account_name="account",
+            account_id="1",
+        )
+        usage_start = day_start(now().date() - timedelta(days=2))
+        key = {
+            "cloud_account": account,
+            "usage_start": usage_start,
+            "usage_end": usage_start + timedelta(days=1),
+            "service_name": "AmazonEC2",
+            "currency": "USD",
+        }
+        # the re-fetch inserted the restated cost as a new row; its id sorts
+        # first so keeping the highest id would keep the stale cost
+        BillingRecord.objects.create(
+            id="ffffffff-ffff-4fff-bfff-ffffffffffff", cost=Decimal("1"), **key
+        )
+        BillingRecord.objects.create(
+            id="00000000-0000-4000-8000-000000000000",
+            cost=Decimal("3"),
+            cost_type="",
+            **key,
+        )
+        BillingRecord.objects.create(
+            cost=Decimal("5"), **{**key, "service_name": "AmazonS3"}
+        )
+
+        apps = self.migrate(self.after)
+        BillingRecord = apps.get_model("data", "BillingRecord")
+        DailyCostRollup = apps.get_model("data", "DailyCostRollup")
+        self.assertEqual(
+            dict(BillingRecord.objects.values_list("service_name", "cost")),
+            {"AmazonEC2": Decimal("3"), "AmazonS3": Decimal("5")},
+        )
+        self.assertFalse(BillingRecord.objects.filter(cost_type=None).exists())
+        self.assertEqual(
+            DailyCostRollup.objects.aggregate(total=Sum("cost"))["total"],
+            Decimal("8"),
+        )
+
+
+class IngestionWatermarkTests(TestCase):
+    """Backfills and refreshes leave the account's IngestionState behind."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = create_organization("acme")
+        create_accounts(cls.organization, 1, days=0)
+        cls.account = CloudAccount.objects.get()
+
+    def setUp(self):
+        self.fetch = self.patch(
+            "data.services.refresh.fetch_cost_and_usage",
+            return_value=cost_explorer_response(3, ["AmazonEC2"], "1.5"),
+        )
+        self.patch("data.services.refresh.get_account_aws_client")
+
+    def patch(self, target, **kwargs):
+        patcher = mock.patch(target, **kwargs)
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def backfill(self, end_date):
+        return backfill_cloud_account(
+            self.account, end_date - timedelta(days=30), end_date
+        )
+
+    def fetched_window(self):
+        client, start_date, end_date = self.fetch.call_args.args
+        return start_date, end_date
+
+    def test_backfill_advances_the_watermark(self):
+        today = now().date()
+        job = enqueue_job(
+            "aws_backfill",
+            cloud_account=self.account,
+            payload={"start_date": today.replace(day=1), "end_date": today},
+        )
+        job.refresh_from_db()
+        self.assertEqual(aws_backfill(job), {"inserted": 3, "updated": 0})
+
+        state = IngestionState.objects.get(cloud_account=self.account)
+        self.assertEqual(state.watermark, today - timedelta(days=1))
+        self.assertEqual(state.last_status, IngestionStatus.SUCCEEDED)
+
+    def test_refresh_after_a_backfill_refetches_only_the_restatement_window(self):
+        today = now().date()
+        self.backfill(today)
+
+        outcome = refresh_cloud_account(self.account)
+
+        state = IngestionState.objects.get(cloud_account=self.account)
+        self.assertEqual(outcome["status"], "refreshed")
+        self.assertEqual(
+            self.fetched_window(),
+            (today - timedelta(days=state.restatement_days), today),
+        )
+        self.assertEqual(outcome["updated"], 3)
+
+    def test_a_backfill_of_older_days_keeps_the_watermark(self):
+        today = now().date()
+        watermark = today - timedelta(days=1)
+        IngestionState.objects.create(cloud_account=self.account, watermark=watermark)
+
+        self.backfill(today - timedelta(days=60))
+
+        state = IngestionState.objects.get(cloud_account=self.account)
+        self.assertEqual(state.watermark, watermark)
+
+    def test_the_stored_error_is_a_one_line_summary(self):
+        self.fetch.side_effect = Exception(
+            "Failed to fetch costs", "<html>upstream body</html>"
+        )
+        with self.assertRaises(Exception):
+            refresh_cloud_account(self.account)
+
+        state = IngestionState.objects.get(cloud_account=self.account)
+        self.assertEqual(state.last_status, IngestionStatus.FAILED)
+        self.assertEqual(state.last_error, "Exception: Failed to fetch costs")
+
+
+class RefreshFanOutTests(TestCase):
+    """Accounts refresh in parallel, within the per-vendor limit."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = create_organization("acme")
+        create_accounts(cls.organization, 6, days=0)
+
+    def setUp(self):
+        # the vendor semaphores are created once per process
+        refresh._vendor_slots.clear()
+        self.addCleanup(refresh._vendor_slots.clear)
+
+        self.lock = threading.Lock()
+        self.running = 0
+        self.peak = 0
+        # the per-account vendor round trip (STS, Cost Explorer, upsert)
+        patcher = mock.patch(
+            "data.services.refresh.refresh_cloud_account", side_effect=self.pull
+        )
+        self.refresh_cloud_account = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def pull(self, cloud_account):
+        with self.lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(0.05)
+        with self.lock:
+            self.running -= 1
+        return {"status": "refreshed"}
+
+    def test_accounts_are_refreshed_in_parallel(self):
+        with self.settings(REFRESH_VENDOR_CONCURRENCY={}):
+            outcomes = refresh.refresh_organization(self.organization, max_workers=6)
+
+        self.assertEqual(self.refresh_cloud_account.call_count, 6)
+        self.assertEqual(self.peak, 6)
+        self.assertEqual(
+            set(outcomes),
+            {str(account.id) for account in CloudAccount.objects.all()},
+        )
+        for outcome in outcomes.values():
+            self.assertEqual(outcome["status"], "refreshed")
+            self.assertGreaterEqual(outcome["duration"], 0.05)
+
+    def test_vendor_limit_caps_concurrent_refreshes(self):
+        with self.settings(REFRESH_VENDOR_CONCURRENCY={"aws": 2}):
+            outcomes = refresh.refresh_organization(self.organization, max_workers=6)
+
+        self.assertEqual(self.refresh_cloud_account.call_count, 6)
+        self.assertEqual(self.peak, 2)
+        self.assertEqual(refresh.failed_refreshes(outcomes), [])
+        # the wait for a slot is not counted in the duration
+        for outcome in outcomes.values():
+            self.assertLess(outcome["duration"], 0.1)
+
+    def test_a_failing_account_does_not_stop_the_others(self):
+        failing = CloudAccount.objects.get(account_id="0")
+
+        def pull(cloud_account):
+            if cloud_account == failing:
+                raise ConnectionError("sts unavailable")
+            return self.pull(cloud_account)
+
+        self.refresh_cloud_account.side_effect = pull
+        with self.assertLogs("data.services.refresh", "ERROR"):
+            outcomes = refresh.refresh_organization(self.organization)
+
+        self.assertEqual(self.refresh_cloud_account.call_count, 6)
+        self.assertEqual(refresh.failed_refreshes(outcomes), [str(failing.id)])
+        self.assertIn("sts unavailable", outcomes[str(failing.id)]["message"])
+        self.assertEqual(
+            sum(outcome["status"] == "refreshed" for outcome in outcomes.values()), 5
+        )
+
+
+class JobOutcomeTests(TestCase):
+    """Job errors reach the API as one line, refreshes fail per account."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = create_organization("acme")
+
+    def run_next_job(self):
+        return run_job(claim_next_job())
+
+    def test_last_error_is_a_one_line_summary(self):
+        def fail(job):
+            raise Exception("Failed to refresh token", "<html>upstream body</html>")
+
+        enqueue_job("failing", organization=self.organization)
+        with (
+            mock.patch.dict("data.services.jobs.HANDLERS", {"failing": fail}),
+            self.assertLogs("data.services.jobs", "ERROR") as logs,
+        ):
+            job = self.run_next_job()
+
+        self.assertEqual(job.status, JobStatus.PENDING)
+        self.assertEqual(job.last_error, "Exception: Failed to refresh token")
+        # the traceback, body included, stays in the server logs
+        self.assertIn("upstream body", logs.output[0])
+
+    def refresh(self, *statuses):
+        outcomes = {
+            str(index): {"status": status, "message": ""}
+            for index, status in enumerate(statuses)
+        }
+        enqueue_job("org_refresh", organization=self.organization, max_attempts=1)
+        with (
+            mock.patch("data.jobs.refresh_organization", return_value=outcomes),
+            mock.patch.dict(
+                "data.services.jobs.HANDLERS", {"org_refresh": org_refresh}
+            ),
+        ):
+            return self.run_next_job()
+
+    def notification(self):
+        return BackgroundJob.objects.get(kind="notification_fanout").payload
+
+    def test_refresh_fails_when_every_account_fails(self):
+        with self.assertLogs("data.services.jobs", "ERROR"):
+            job = self.refresh("error", "error")
+        self.assertEqual(job.status, JobStatus.FAILED)
+        self.assertEqual(
+            job.last_error, "JobFailed: 2 of 2 cloud accounts failed to refresh."
+        )
+        self.assertEqual(len(job.result), 2)
+        self.assertEqual(self.notification()["type"], "error")
+
+    def test_refresh_partly_fails_when_some_accounts_fail(self):
+        with self.assertLogs("data.services.jobs", "WARNING"):
+            job = self.refresh("refreshed", "error")
+        self.assertEqual(job.status, JobStatus.PARTIAL)
+        self.assertEqual(job.last_error, "1 of 2 cloud accounts failed to refresh.")
+        notification = self.notification()
+        self.assertEqual(notification["type"], "warning")
+        self.assertIn(job.last_error, notification["message"])
+
+    def test_refresh_succeeds_when_no_account_fails(self):
+        job = self.refresh("refreshed", "up_to_date")
+        self.assertEqual(job.status, JobStatus.SUCCEEDED)
+        self.assertEqual(job.last_error, "")
+        self.assertEqual(self.notification()["type"], "success")
+
+
+class JobLeaseTests(TestCase):
+    """Only jobs whose worker stopped renewing their lease are taken back."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = create_organization("acme")
+
+    def claim(self, kind="org_refresh", **fields):
+        enqueue_job(kind, organization=self.organization, **fields)
+        return claim_next_job()
+
+    def expire(self, job):
+        BackgroundJob.objects.filter(id=job.id).update(
+            lease_expires_at=now() - timedelta(seconds=1)
+        )
+
+    def test_a_long_job_with_a_renewed_lease_is_left_running(self):
+        job = self.claim()
+        BackgroundJob.objects.filter(id=job.id).update(
+            started_at=now() - timedelta(days=1)
+        )
+        self.expire(job)
+        renew_leases([job.id])
+
+        self.assertEqual(requeue_stale_jobs(), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.RUNNING)
+        self.assertGreater(job.lease_expires_at, now())
+
+    def test_an_expired_lease_is_retried_as_an_attempt(self):
+        job = self.claim()
+        self.expire(job)
+
+        with self.assertLogs("data.services.jobs", "WARNING"):
+            self.assertEqual(requeue_stale_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.PENDING)
+        self.assertEqual(job.attempts, 1)
+        self.assertGreater(job.run_after, now())
+        self.assertIn("lease expired", job.last_error)
+
+    def test_a_job_that_keeps_losing_its_worker_fails(self):
+        job = self.claim(max_attempts=2)
+        self.expire(job)
+        with self.assertLogs("data.services.jobs", "WARNING"):
+            requeue_stale_jobs()
+        BackgroundJob.objects.filter(id=job.id).update(run_after=now())
+        self.assertEqual(claim_next_job(), job)
+        self.expire(job)
+        with self.assertLogs("data.services.jobs", "WARNING"):
+            requeue_stale_jobs()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertIsNotNone(job.finished_at)
+        notification = BackgroundJob.objects.get(kind="notification_fanout")
+        self.assertEqual(notification.payload["type"], "error")
+
+    def test_the_worker_survives_a_job_that_crashes(self):
+        crashing = self.claim("crashing")
+        BackgroundJob.objects.filter(id=crashing.id).update(
+            status=JobStatus.PENDING, attempts=0
+        )
+        enqueue_job("next", organization=self.organization)
+
+        def run_claimed_job(job):
+            if job.kind == "crashing":
+                raise DatabaseError("connection lost while saving the outcome")
+            return job
+
+        out = StringIO()
+        with (
+            mock.patch(
+                "data.management.commands.run_ingest_worker.run_claimed_job",
+                run_claimed_job,
+            ),
+            self.assertLogs(
+                "data.management.commands.run_ingest_worker", "ERROR"
+            ) as logs,
+        ):
+            call_command("run_ingest_worker", "--once", "--concurrency=1", stdout=out)
+
+        self.assertIn("crashed", logs.output[0])
+        self.assertIn("(next): running", out.getvalue())
+        # left to its lease, which the stopped worker no longer renews
+        crashing.refresh_from_db()
+        self.assertEqual(crashing.status, JobStatus.RUNNING)
+
+
+def usage_detail(date, meter, cost, resource=""):
+    return {
+        "properties": {
+            "date": date,
+            "meterName": meter,
+            "chargeType": "Usage",
+            "instanceName": resource,
+            "costInBillingCurrency": cost,
+            "quantity": 1,
+            "billingCurrency": "USD",
+        }
+    }
+
+
+class AzureUsageTests(TestCase):
+    """usageDetails lines are summed per key, across pages."""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_accounts(create_organization("acme"), 1, days=0)
+        cls.account = CloudAccount.objects.get()
+
+    def ingest(self, *pages):
+        with mock.patch(
+            "data.integration_helpers.azure.iter_azure_pages", return_value=pages
+        ):
+            totals = fetch_subscription_usage(self.account, "subscription", {})
+        return write_billing_records(self.account, totals.values())
+
+    def test_lines_sharing_a_key_are_summed(self):
+        self.ingest(
+            [
+                usage_detail("2026-09-01T00:00:00Z", "D2 v3", "0.1"),
+                usage_detail("2026-09-01T00:00:00Z", "D2 v3", "0.2"),
+                usage_detail("2026-09-01T00:00:00Z", "D2 v3", "5", resource="vm-1"),
+            ],
+            [usage_detail("2026-09-01T00:00:00Z", "D2 v3", "0.3")],
+        )
+        costs = dict(BillingRecord.objects.values_list("resource", "cost"))
+        self.assertEqual(costs, {"": Decimal("0.6"), "vm-1": Decimal("5")})
+
+    def test_reingesting_replaces_the_totals(self):
+        page = [usage_detail("2026-09-01", "D2 v3", "0.1") for _ in range(3)]
+        self.ingest(page)
+        self.assertEqual(self.ingest(page), {"inserted": 0, "updated": 1})
+        self.assertEqual(BillingRecord.objects.get().cost, Decimal("0.3"))
+
+    def test_timestamp_offsets_are_kept(self):
+        self.ingest([usage_detail("2026-09-01T02:00:00+02:00", "D2 v3", "1")])
+        record = BillingRecord.objects.get()
+        self.assertEqual(record.usage_start.isoformat(), "2026-09-01T00:00:00+00:00")
+
+    def ingest_subscriptions(self, subscriptions):
+        """``ingest_azure_billing`` over ``{subscription_id: [page, ...]}``."""
+        AzureOAuthToken.objects.get_or_create(
+            cloud_account=self.account,
+            defaults={
+                "access_token": "token",
+                "refresh_token": "refresh",
+                "token_type": "Bearer",
+                "expires_at": now() + timedelta(hours=1),
+                "tenant_id": "tenant",
+            },
+        )
+        self.account.refresh_from_db()
+
+        def pages(http, url, headers, endpoint):
+            if endpoint == "subscriptions":
+                return [[{"subscriptionId": key} for key in subscriptions]]
+            return next(
+                subscriptions[key] for key in subscriptions if f"/{key}/" in url
+            )
+
+        with (
+            mock.patch(
+                "data.integration_helpers.azure.iter_azure_pages", side_effect=pages
+            ),
+            mock.patch(
+                "data.integration_helpers.azure.write_billing_records",
+                wraps=write_billing_records,
+            ) as write,
+        ):
+            result = ingest_azure_billing(self.account)
+        return result, write
+
+    def test_each_subscription_is_written_as_it_arrives(self):
+        subscriptions = {
+            f"subscription-{index}": [
+                [usage_detail("2026-09-01", "D2 v3", "1", resource=f"vm-{index}")]
+            ]
+            for index in range(5)
+        }
+        with self.settings(AZURE_SUBSCRIPTION_CONCURRENCY=2):
+            result, write = self.ingest_subscriptions(subscriptions)
+
+        self.assertEqual(result, {"subscriptions": 5, "inserted": 5, "updated": 0})
+        self.assertEqual(write.call_count, 5)
+        for call in write.call_args_list:
+            self.assertEqual(len(list(call.args[1])), 1)
+        self.assertEqual(BillingRecord.objects.count(), 5)
+
+    def test_keys_shared_by_subscriptions_are_summed(self):
+        subscriptions = {
+            "subscription-1": [[usage_detail("2026-09-01", "Support", "0.5")] * 2],
+            "subscription-2": [[usage_detail("2026-09-01", "Support", "2")]],
+        }
+        self.ingest_subscriptions(subscriptions)
+        self.assertEqual(BillingRecord.objects.get().cost, Decimal("3"))
+
+        # a re-ingestion replaces the total instead of adding to it
+        self.ingest_subscriptions(subscriptions)
+        record = BillingRecord.objects.get()
+        self.assertEqual(record.cost, Decimal("3"))
+        self.assertEqual(record.usage_amount, Decimal("3"))
+        rollup = DailyCostRollup.objects.get(cloud_account=self.account)
+        self.assertEqual(rollup.cost, Decimal("3"))
+
+
+class GcpIngestionTests(TestCase):
+    """Projects are fetched on a bounded pool and written as they arrive."""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_accounts(create_organization("acme"), 1, days=0)
+        cls.account = CloudAccount.objects.get()
+
+    def test_fetches_are_bounded_and_every_project_is_written(self):
+        lock = threading.Lock()
+        running = []
+        peak = []
+
+        def get_billing_data(access_token, project_id, start_date, end_date):
+            with lock:
+                running.append(project_id)
+                peak.append(len(running))
+            time.sleep(0.02)
+            with lock:
+                running.remove(project_id)
+            return [
+                {
+                    "usage_start_time": "2026-09-01T00:00:00Z",
+                    "usage_end_time": "2026-09-02T00:00:00Z",
+                    "service": "Compute Engine",
+                    "project": project_id,
+                    "resource_name": project_id,
+                    "cost": "1.5",
+                }
+            ]
+
+        projects = [{"projectId": f"project-{index}"} for index in range(10)]
+        counts = ingest_billing_data(
+            self.account,
+            "token",
+            projects,
+            None,
+            None,
+            get_billing_data,
+            max_workers=3,
+        )
+
+        self.assertEqual(counts, {"inserted": 10, "updated": 0})
+        self.assertLessEqual(max(peak), 3)
+        self.assertGreater(max(peak), 1)
+        self.assertEqual(BillingRecord.objects.count(), 10)
+        rollup = DailyCostRollup.objects.get(cloud_account=self.account)
+        self.assertEqual(rollup.cost, Decimal("15"))
+
+    def test_a_failed_fetch_fails_the_ingestion(self):
+        def get_billing_data(access_token, project_id, start_date, end_date):
+            raise ConnectionError(project_id)
+
+        with self.assertRaises(ConnectionError):
+            ingest_billing_data(
+                self.account,
+                "token",
+                [{"projectId": "p"}],
+                None,
+                None,
+                get_billing_data,
+            )
+
+
+class AssumedRoleClientCacheTests(SimpleTestCase):
+    """Credentials and clients are reused until they near expiry."""
+
+    def setUp(self):
+        self.expires_in = timedelta(hours=1)
+        self.sts = mock.Mock()
+        self.sts.assume_role.side_effect = self.assume_role
+        patcher = mock.patch(
+            "data.integration_helpers.aws.boto3.client",
+            side_effect=self.boto3_session_client,
+        )
+        self.boto3_client = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache = AssumedRoleClientCache(maxsize=2, refresh_margin=300)
+
+    def assume_role(self, RoleArn, RoleSessionName, ExternalId):
+        return {
+            "Credentials": {
+                "AccessKeyId": f"key-{self.sts.assume_role.call_count}",
+                "SecretAccessKey": "secret",
+                "SessionToken": "token",
+                "Expiration": datetime.now(timezone.utc) + self.expires_in,
+            }
+        }
+
+    def boto3_session_client(self, service_name, **credentials):
+        return self.sts if service_name == "sts" else mock.Mock(**credentials)
+
+    def get(self, role, client_type="ce"):
+        return self.cache.get_client(
+            f"arn:aws:iam::1:role/{role}", "external", client_type, "test"
+        )
+
+    def test_clients_and_credentials_are_reused(self):
+        client = self.get("a")
+        self.assertIs(self.get("a"), client)
+        self.assertEqual(client.aws_access_key_id, "key-1")
+
+        # another client type of the role reuses its credentials
+        self.assertEqual(self.get("a", "s3").aws_access_key_id, "key-1")
+        self.assertEqual(self.sts.assume_role.call_count, 1)
+
+    def test_role_is_assumed_again_near_expiry(self):
+        # expires inside the refresh margin
+        self.expires_in = timedelta(seconds=60)
+        client = self.get("a")
+        self.expires_in = timedelta(hours=1)
+
+        renewed = self.get("a")
+        self.assertIsNot(renewed, client)
+        self.assertEqual(renewed.aws_access_key_id, "key-2")
+        self.assertEqual(self.sts.assume_role.call_count, 2)
+        self.assertIs(self.get("a"), renewed)
+
+    def test_least_recently_used_role_is_evicted(self):
+        a, b = self.get("a"), self.get("b")
+        self.get("a")
+        self.get("c")
+        self.assertEqual(self.sts.assume_role.call_count, 3)
+
+        self.assertIs(self.get("a"), a)
+        self.assertIsNot(self.get("b"), b)
+        self.assertEqual(len(self.cache.clients), 2)
+        self.assertEqual(len(self.cache.credentials), 2)
+
+        # a's client hits did not refresh its credentials, which went first
+        self.cache.clients.clear()
+        self.assertEqual(self.get("a").aws_access_key_id, "key-4")
+        self.assertEqual(self.sts.assume_role.call_count, 4)
+
+
+class CostReportTests(TestCase):
+    """CUR line items are summed per key before their total is rounded."""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_accounts(create_organization("acme"), 1, days=0)
+        cls.account = CloudAccount.objects.get()
+
+    def write_report(self, root, lines):
+        header = [
+            "lineItem/UsageStartDate",
+            "lineItem/UsageEndDate",
+            "product/ProductName",
+            "lineItem/UsageType",
+            "lineItem/ResourceId",
+            "lineItem/UnblendedCost",
+        ]
+        period = Path(root, "report", "20260901-20261001")
+        period.mkdir(parents=True)
+        with open(period / "report-1.csv", "w", newline="") as report:
+            writer = csv.writer(report)
+            writer.writerow(header)
+            writer.writerows(lines)
+        manifest = {
+            "billingPeriod": {
+                "start": "20260901T000000.000Z",
+                "end": "20261001T000000.000Z",
+            },
+            "reportKeys": ["report/20260901-20261001/report-1.csv"],
+        }
+        (period / "report-Manifest.json").write_text(json.dumps(manifest))
+
+    def test_split_lines_total_is_rounded_once(self):
+        lines = [
+            [
+                "2026-09-01T00:00:00Z",
+                "2026-09-02T00:00:00Z",
+                "Amazon EC2",
+                "BoxUsage",
+                f"i-{index % 35}",
+                "0.1234567",
+            ]
+            for index in range(1000)
+        ]
+        # each instance's 29 or 28 lines, summed then rounded to the column
+        expected = {}
+        for index in range(35):
+            total = (29 if index < 20 else 28) * Decimal("0.1234567")
+            expected[f"i-{index}"] = total.quantize(Decimal("0.0001"))
+
+        with tempfile.TemporaryDirectory() as root:
+            self.write_report(root, lines)
+            ingest_cost_report(
+                self.account, LocalObjectStore(root), "report/", batch_size=64
+            )
+
+        costs = {
+            resource: cost.quantize(Decimal("0.0001"))
+            for resource, cost in BillingRecord.objects.filter(
+                cloud_account=self.account
+            ).values_list("resource", "cost")
+        }
+        self.assertEqual(costs, expected)
+
+
+@skipUnless(connection.vendor == "postgresql", "EXPLAIN output is Postgres'")
+class AccountUsageIndexTests(TestCase):
+    """The per-account range scans are answered from billing_account_usage_idx."""
+
+    @classmethod
+    def setUpTestData(cls):
+        organization = create_organization("acme")
+        create_accounts(organization, 20, days=0)
+        today = now().replace(hour=0, minute=0, second=0, microsecond=0)
+        BillingRecord.objects.bulk_create(
+            BillingRecord(
+                cloud_account=account,
+                usage_start=today - timedelta(days=day),
+                usage_end=today - timedelta(days=day - 1),
+                service_name=service_name,
+                cost=Decimal("1.25"),
+                usage_amount=Decimal("2"),
+            )
+            for account in CloudAccount.objects.all()
+            for day in range(60)
+            for service_name in ("AmazonEC2", "AmazonS3")
+        )
+        cls.account = CloudAccount.objects.first()
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {BillingRecord._meta.db_table}")
+
+    def test_rollup_rebuild_scans_the_index(self):
+        today = now().date()
+        plan = daily_totals(self.account, today - timedelta(days=6), today).explain()
+        self.assertIn("billing_account_usage_idx", plan)
+        # the day range bounds the scan, it isn't a filter over every row
+        self.assertRegex(plan, r"Index Cond: .*usage_start >=")
+
+
+def create_billing_records(account, days, step=1):
+    """One record a day, every ``step`` days over the last ``days``."""
+    today = now().replace(hour=0, minute=0, second=0, microsecond=0)
+    BillingRecord.objects.bulk_create(
+        BillingRecord(
+            cloud_account=account,
+            usage_start=today - timedelta(days=day),
+            usage_end=today - timedelta(days=day - 1),
+            service_name="AmazonEC2",
+            cost=Decimal("1.25"),
+        )
+        for day in range(0, days, step)
+    )
+
+
+class PartitionCommandTests(TestCase):
+    def partition(self, *args, **options):
+        out = StringIO()
+        call_command("partition_billing_records", *args, stdout=out, **options)
+        return out.getvalue()
+
+    @skipIf(connection.vendor == "postgresql", "runs on the other backends")
+    def test_other_backends_are_refused(self):
+        with self.assertRaisesMessage(CommandError, "needs the Postgres backend"):
+            self.partition("convert")
+
+    @skipIf(connection.vendor == "postgresql", "runs on the other backends")
+    def test_index_benchmark_is_refused_on_other_backends(self):
+        with self.assertRaisesMessage(CommandError, "needs the Postgres backend"):
+            call_command(
+                "benchmark_billing_index", accounts=1, days=1, stdout=StringIO()
+            )
+        self.assertFalse(CloudAccount.objects.exists())
+
+    @skipUnless(connection.vendor == "postgresql", "partitioning is Postgres only")
+    def test_convert_keeps_rows_and_prunes_partitions(self):
+        create_accounts(create_organization("acme"), 2, days=0)
+        for account in CloudAccount.objects.all():
+            create_billing_records(account, 120, step=5)
+
+        self.partition("convert", months_ahead=1)
+        self.assertTrue(partitioning.is_partitioned())
+        self.assertEqual(BillingRecord.objects.count(), 48)
+
+        # the current month's range query only reads its own partition
+        months = len(partitioning.month_partitions())
+        self.assertIn(
+            f"1 of {months} monthly partitions scanned", self.partition("explain")
+        )
+
+        # upserts still find the unique key on the partitioned table
+        account = CloudAccount.objects.first()
+        response = cost_explorer_response(3, ["AmazonS3"], "2")
+        self.assertEqual(
+            save_billing_data_efficient(account, response),
+            {"inserted": 3, "updated": 0},
+        )
+
+    @skipUnless(connection.vendor == "postgresql", "partitioning is Postgres only")
+    def test_maintain_moves_rows_out_of_the_default_partition(self):
+        create_accounts(create_organization("acme"), 1, days=0)
+        account = CloudAccount.objects.get()
+        create_billing_records(account, 120, step=5)
+        self.partition("convert", months_ahead=0)
+
+        # a month past the created partitions lands in the default partition
+        ahead = now().replace(day=1) + timedelta(days=62)
+        BillingRecord.objects.create(
+            cloud_account=account,
+            usage_start=ahead,
+            usage_end=ahead + timedelta(days=1),
+            service_name="AmazonEC2",
+            cost=Decimal("1"),
+        )
+        self.partition("maintain", months_ahead=2)
+
+        self.assertIn(month_start(ahead.date()), partitioning.month_partitions())
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT count(*) FROM {partitioning.DEFAULT_PARTITION}")
+            self.assertEqual(cursor.fetchone(), (0,))
+
+    @skipUnless(connection.vendor == "postgresql", "partitioning is Postgres only")
+    def test_raw_retention_drops_whole_months(self):
+        create_accounts(create_organization("acme"), 1, days=0)
+        create_billing_records(CloudAccount.objects.get(), 120, step=5)
+        self.partition("convert", months_ahead=0)
+
+        with self.settings(BILLING_RAW_RETENTION_DAYS=40):
+            call_command("compact_billing_data", stdout=StringIO())
+            horizon = raw_retention_start()
+
+        self.assertEqual(min(partitioning.month_partitions()), month_start(horizon))
+        first = BillingRecord.objects.aggregate(first=Min("usage_start"))["first"]
+        self.assertGreaterEqual(first.date(), horizon)
+
+
+class RollupHorizonTests(TestCase):
+    """Rebuilding the rollup never clears days whose raw rows are gone."""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_accounts(create_organization("acme"), 1, days=0)
+        cls.account = CloudAccount.objects.get()
+        create_billing_records(cls.account, 90)
+        refresh_daily_rollup(
+            cls.account, now().date() - timedelta(days=90), now().date()
+        )
+
+    def rebuild(self, days):
+        since = now().date() - timedelta(days=days)
+        call_command("rebuild_daily_rollup", f"--since={since}", stdout=StringIO())
+
+    def test_days_before_the_oldest_raw_record_are_kept(self):
+        # older rows gone as with a dropped partition, retention unset
+        BillingRecord.objects.filter(
+            usage_start__lt=day_start(now().date() - timedelta(days=30))
+        ).delete()
+        self.rebuild(90)
+        self.assertEqual(
+            DailyCostRollup.objects.filter(cloud_account=self.account).count(), 90
+        )
+
+    def test_days_before_the_retention_horizon_are_kept(self):
+        with self.settings(BILLING_RAW_RETENTION_DAYS=30):
+            expire_raw_records(raw_retention_start())
+            # raising the retention does not bring the expired days back
+            with self.settings(BILLING_RAW_RETENTION_DAYS=60):
+                self.rebuild(90)
+        self.assertEqual(
+            DailyCostRollup.objects.filter(cloud_account=self.account).count(), 90
+        )
+
+
+class BillingExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = create_organization("acme")
+        create_accounts(cls.organization, 2, days=0)
+        for account in CloudAccount.objects.all():
+            create_billing_records(account, 10)
+        # another organization's rows are never exported
+        other = create_organization("other")
+        create_accounts(other, 1, days=0)
+        create_billing_records(CloudAccount.objects.get(organization=other), 10)
+
+    def export(self, fmt, **params):
+        token = AccessToken.for_user(self.organization.company.owner)
+        response = self.client.get(
+            reverse(f"export-organization-billing-{fmt}", args=[self.organization.id]),
+            {"days": 30, **params},
+            headers={"authorization": f"Bearer {token}"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response, StreamingHttpResponse)
+        return response
+
+    def read_csv(self, content):
+        return list(csv.reader(StringIO(content.decode())))
+
+    def test_csv_is_streamed_with_a_header_and_a_line_per_row(self):
+        with self.settings(BILLING_EXPORT_CHUNK_SIZE=3):
+            response = self.export("csv")
+            chunks = list(response.streaming_content)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertNotIn("Content-Encoding", response)
+        self.assertGreater(len(chunks), 1)
+
+        header, *lines = self.read_csv(b"".join(chunks))
+        self.assertEqual(header, [header for header, _ in EXPORT_COLUMNS])
+        self.assertEqual(len(lines), 20)
+        self.assertEqual({line[1] for line in lines}, {"account-0", "account-1"})
+        row = dict(zip(header, lines[0]))
+        self.assertEqual(row["Service Name"], "AmazonEC2")
+        self.assertEqual(Decimal(row["Cost"]), Decimal("1.25"))
+        self.assertEqual(row["Project ID"], "")
+
+    def test_gzip_body_decompresses_to_the_same_csv(self):
+        plain = b"".join(self.export("csv").streaming_content)
+        response = self.export("csv", compress="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+
+        body = b"".join(response.streaming_content)
+        self.assertEqual(gzip.decompress(body), plain)
+
+    def test_parquet_reads_back_with_the_export_schema(self):
+        response = self.export("parquet", row_group_size=7, compression="snappy")
+        self.assertEqual(response["Content-Type"], "application/vnd.apache.parquet")
+
+        parquet = pq.ParquetFile(pa.BufferReader(b"".join(response.streaming_content)))
+        self.assertEqual(parquet.metadata.num_rows, 20)
+        self.assertEqual(parquet.metadata.num_row_groups, 3)
+        self.assertEqual(parquet.schema_arrow, PARQUET_SCHEMA)
+        for index, column in enumerate(parquet.schema_arrow.names):
+            encodings = parquet.metadata.row_group(0).column(index).encodings
+            with self.subTest(column=column):
+                self.assertEqual(
+                    "RLE_DICTIONARY" in encodings, column in DICTIONARY_COLUMNS
+                )
+
+        table = parquet.read()
+        self.assertEqual(table.num_rows, 20)
+        self.assertEqual(set(table.column("service_name").to_pylist()), {"AmazonEC2"})
+        self.assertEqual(
+            set(table.column("account_name").to_pylist()), {"account-0", "account-1"}
+        )
+        self.assertEqual(table.column("cost")[0].as_py(), Decimal("1.2500"))
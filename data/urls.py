@@ -17,6 +17,8 @@ from .views import (
     CustomExpenseVendorViewSet,
     CustomExpenseViewSet,
     ExportOrgnizationBillingCSV,
+    ExportOrgnizationBillingParquet,
+    background_job_status,
     billing_cost_by_region,
     billing_cost_by_service,
     billing_daily_costs,
@@ -132,11 +134,21 @@ urlpatterns = [
         refresh_billing_data,
         name="refresh-billing-data",
     ),
+    path(
+        "jobs/<uuid:job_id>/",
+        background_job_status,
+        name="background-job-status",
+    ),
     # exporter
     path(
         "org/<uuid:organization_id>/export-billing-csv/",
         ExportOrgnizationBillingCSV.as_view(),
         name="export-organization-billing-csv",
     ),
+    path(
+        "org/<uuid:organization_id>/export-billing-parquet/",
+        ExportOrgnizationBillingParquet.as_view(),
+        name="export-organization-billing-parquet",
+    ),
     *router.urls,
 ]
@@ -0,0 +1,35 @@
+from datetime import date, datetime, time, timedelta
+
+from django.utils.timezone import make_aware
+
+
+def day_start(day):
+    """Midnight starting ``day`` in the current time zone."""
+    return make_aware(datetime.combine(day, time.min))
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def add_months(month, months):
+    """First day of the month ``months`` after ``month`` (negative goes back)."""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def day_range_filter(field, since=None, until=None):
+    """
+    Filter kwargs selecting rows whose datetime ``field`` falls on a day in
+    [since, until], either end optional.
+
+    Same rows as ``field__date__gte``/``__lte``, but written as a half-open
+    datetime range on the bare column so its indexes can be used; the
+    ``__date`` transform wraps the column in a cast that no index matches.
+    """
+    lookups = {}
+    if since is not None:
+        lookups[f"{field}__gte"] = day_start(since)
+    if until is not None:
+        lookups[f"{field}__lt"] = day_start(until + timedelta(days=1))
+    return lookups
@@ -8,7 +8,11 @@ from company.models import Organization
 def get_organization(self):
     """
     Retrieve the company from the request's query param or URL kwarg.
+    Memoized on the view, permissions and querysets all ask for it.
     """
+    if hasattr(self, "_organization"):
+        return self._organization
+
     organization_id = self.kwargs.get(
         "organization_id"
     ) or self.request.query_params.get("organization_id")
@@ -24,6 +28,7 @@ def get_organization(self):
         )
 
     try:
-        return Organization.objects.get(id=organization_id)
+        self._organization = Organization.objects.get(id=organization_id)
     except Organization.DoesNotExist:
         raise NotFound({"organization_id": "Organization not found."})
+    return self._organization
@@ -1,26 +1,25 @@
-import csv
 import os
 import uuid
-from datetime import timedelta
-from io import StringIO
 
-from django.http import HttpResponse, JsonResponse
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from django.utils.timezone import now
+from django.utils.cache import patch_vary_headers
 from dotenv import load_dotenv
 from drf_spectacular.utils import extend_schema
 from rest_framework import permissions, status, viewsets
-from rest_framework.decorators import api_view
-from rest_framework.exceptions import ValidationError
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from company.models import Organization
 from company.permissions import IsOrgAdminOrOwnerOrReadOnly
+from company.roles import get_role
 from data.models import CustomExpense, CustomExpenseVendor
 from data.serializers import CustomExpenseSerializer, CustomExpenseVendorSerializer
 
-from .aggregators.account import get_account_totals
+from .aggregators.account import get_account_totals, get_account_totals_by_orgs
 from .aggregators.cost import (
     get_cost_by_region,
     get_cost_by_service,
@@ -29,15 +28,9 @@ from .aggregators.cost import (
 )
 from .aggregators.usage import get_monthly_service_totals, get_usage_by_service_and_day
 from .aggregators.utils import parse_date_range
-
-# from .aws_utils import fetch_cost_and_usage, get_tenant_aws_client
-from .integration_helpers.aws import (
-    fetch_cost_and_usage,
-    get_account_aws_client,
-    save_billing_data_efficient,
-)
-from .models import BillingRecord, CloudAccount
+from .models import BackgroundJob, CloudAccount
 from .serializers import (
+    BackgroundJobSerializer,
     CloudAccountSerializer,
     CostByRegionSerializer,
     CostByServiceSerializer,
@@ -49,6 +42,22 @@ from .serializers import (
     MonthlyServiceTotalsSerializer,
     UsageByServiceDaySerializer,
 )
+from .services.aggregate_cache import (
+    aggregate_cache_key,
+    aggregate_etag,
+    cached_aggregate,
+    cached_aggregates,
+    data_version,
+    etag_matches,
+)
+from .services.export import (
+    PARQUET_COMPRESSIONS,
+    billing_export_rows,
+    gzip_stream,
+    iter_csv,
+    iter_parquet,
+)
+from .services.jobs import active_job, enqueue_job
 from .utils.get_org_from_request import get_organization
 
 load_dotenv()
@@ -57,6 +66,40 @@ GOOGLE_DATA_CLIENT_ID = os.getenv("GOOGLE_DATA_CLIENT_ID")
 GOOGLE_DATA_CLIENT_SECRET = os.getenv("GOOGLE_DATA_CLIENT_SECRET")
 
 
+def aggregate_response(request, endpoint, organization_id, compute):
+    """
+    Response of a GET aggregate endpoint over the request's date range.
+
+    Carries a strong ETag derived from the organization's data version and
+    the range, so a matching If-None-Match is answered 304 before any
+    aggregate query runs.
+    """
+    start_date, end_date, error = parse_date_range(request)
+    if error:
+        return error
+
+    version = data_version(organization_id)
+    etag = aggregate_etag(
+        aggregate_cache_key(
+            endpoint, organization_id, version, start_date, end_date, {}
+        )
+    )
+    if etag_matches(request, etag):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        data = cached_aggregate(
+            endpoint, organization_id, start_date, end_date, compute, version=version
+        )
+        response = Response(
+            {"range": {"start": start_date, "end": end_date}, "results": data}
+        )
+
+    response["ETag"] = etag
+    response["Cache-Control"] = settings.AGGREGATE_CACHE_CONTROL
+    patch_vary_headers(response, ["Authorization"])
+    return response
+
+
 class CloudAccountViewSet(viewsets.ModelViewSet):
     serializer_class = CloudAccountSerializer
     permission_classes = [permissions.IsAuthenticated, IsOrgAdminOrOwnerOrReadOnly]
@@ -107,18 +150,7 @@ class CustomExpenseViewSet(viewsets.ModelViewSet):
 )
 @api_view(["GET"])
 def billing_daily_costs(request, organization_id):
-    start_date, end_date, error = parse_date_range(request)
-    if error:
-        return error
-
-    data = get_daily_costs(
-        organization_id,
-        # cloud_account_id,
-        start_date,
-        end_date,
-    )
-
-    return Response({"range": {"start": start_date, "end": end_date}, "results": data})
+    return aggregate_response(request, "daily_costs", organization_id, get_daily_costs)
 
 
 @extend_schema(
@@ -128,13 +160,9 @@ def billing_daily_costs(request, organization_id):
 )
 @api_view(["GET"])
 def billing_cost_by_service(request, organization_id):
-    start_date, end_date, error = parse_date_range(request)
-    if error:
-        return error
-
-    data = get_cost_by_service(organization_id, start_date, end_date)
-
-    return Response({"range": {"start": start_date, "end": end_date}, "results": data})
+    return aggregate_response(
+        request, "cost_by_service", organization_id, get_cost_by_service
+    )
 
 
 @extend_schema(
@@ -144,13 +172,9 @@ def billing_cost_by_service(request, organization_id):
 )
 @api_view(["GET"])
 def billing_cost_by_region(request, organization_id):
-    start_date, end_date, error = parse_date_range(request)
-    if error:
-        return error
-
-    data = get_cost_by_region(organization_id, start_date, end_date)
-
-    return Response({"range": {"start": start_date, "end": end_date}, "results": data})
+    return aggregate_response(
+        request, "cost_by_region", organization_id, get_cost_by_region
+    )
 
 
 @extend_schema(
@@ -160,13 +184,9 @@ def billing_cost_by_region(request, organization_id):
 )
 @api_view(["GET"])
 def billing_usage_service_day(request, organization_id):
-    start_date, end_date, error = parse_date_range(request)
-    if error:
-        return error
-
-    data = get_usage_by_service_and_day(organization_id, start_date, end_date)
-
-    return Response({"range": {"start": start_date, "end": end_date}, "results": data})
+    return aggregate_response(
+        request, "usage_service_day", organization_id, get_usage_by_service_and_day
+    )
 
 
 @extend_schema(
@@ -176,13 +196,9 @@ def billing_usage_service_day(request, organization_id):
 )
 @api_view(["GET"])
 def billing_monthly_service_total(request, organization_id):
-    start_date, end_date, error = parse_date_range(request)
-    if error:
-        return error
-
-    data = get_monthly_service_totals(organization_id, start_date, end_date)
-
-    return Response({"range": {"start": start_date, "end": end_date}, "results": data})
+    return aggregate_response(
+        request, "monthly_service_totals", organization_id, get_monthly_service_totals
+    )
 
 
 @extend_schema(
@@ -192,13 +208,9 @@ def billing_monthly_service_total(request, organization_id):
 )
 @api_view(["GET"])
 def cost_summary_by_service(request, organization_id):
-    start_date, end_date, error = parse_date_range(request)
-    if error:
-        return error
-
-    data = get_cost_summary_by_service(organization_id, start_date, end_date)
-
-    return Response({"range": {"start": start_date, "end": end_date}, "results": data})
+    return aggregate_response(
+        request, "cost_summary_by_service", organization_id, get_cost_summary_by_service
+    )
 
 
 @extend_schema(
@@ -211,19 +223,8 @@ def cost_summary_by_service(request, organization_id):
 )
 @api_view(["GET"])
 def cost_summary_by_account(request, organization_id):
-    start_date, end_date, error = parse_date_range(request)
-    if error:
-        return error
-    data = get_account_totals(organization_id, since=start_date, until=end_date)
-
-    return Response(
-        {
-            "range": {
-                "start": start_date,
-                "end": end_date,
-            },
-            "results": data,
-        }
+    return aggregate_response(
+        request, "account_totals", organization_id, get_account_totals
     )
 
 
@@ -247,102 +248,83 @@ def cost_summary_by_orgs(request):
 
     """
     start_date, end_date, error = parse_date_range(request)
-    results = {}
     if error:
         return error
 
     org_ids = request.data.get("org_ids", [])
     if not isinstance(org_ids, list):
         raise ValidationError({"org_ids": "Must be a list of UUIDs."})
-    response = {
-        "range": {
-            "start": start_date,
-            "end": end_date,
-        },
-    }
 
+    org_uuids = {}
     for org_id in org_ids:
         try:
-            org_uuid = uuid.UUID(org_id)
+            org_uuids[org_id] = uuid.UUID(org_id)
         except ValueError:
             raise ValidationError({"org_id": f"Invalid UUID: {org_id}"})
 
-        data = get_account_totals(org_uuid, since=start_date, until=end_date)
-
-        results[org_id] = data
-    response["results"] = results
+    # every organization in the same few queries, cached ones skipped
+    totals = cached_aggregates(
+        "account_totals",
+        list(set(org_uuids.values())),
+        start_date,
+        end_date,
+        get_account_totals_by_orgs,
+    )
 
-    return Response(response)
+    return Response(
+        {
+            "range": {
+                "start": start_date,
+                "end": end_date,
+            },
+            "results": {
+                org_id: totals[org_uuid] for org_id, org_uuid in org_uuids.items()
+            },
+        }
+    )
 
 
 # refresh data, currently only aws
 @extend_schema(
     description=(
-        "Refresh an org's cloud integrations' data. Triggers a call to the CSPs - currently only AWS supported."
+        "Refresh an org's cloud integrations' data. Queues a background job that calls "
+        "the CSPs - currently only AWS supported. Returns the job id to poll."
     ),
     summary="Organization data Refresher",
 )
 @api_view(["GET"])
 def refresh_billing_data(request, organization_id):
     org = get_object_or_404(Organization, id=organization_id)
-    cloud_accounts = list(CloudAccount.objects.filter(organization=org))
-
-    # Check vendor type
-    for cloud_account in cloud_accounts:
-        if cloud_account.vendor.lower() != "aws":
-            return JsonResponse(
-                {"success": False, "message": "Cloud account is not AWS."}, status=400
-            )
-
-        # Determine start date = last usage_end + 1 day, or default 30 days ago
-        last_record = (
-            BillingRecord.objects.filter(cloud_account=cloud_account)
-            .order_by("-usage_end")
-            .first()
-        )
-        if last_record:
-            start_date = last_record.usage_end.date() + timedelta(days=1)
-        else:
-            start_date = now().date() - timedelta(days=30)
-
-        end_date = now().date()
-
-        if start_date >= end_date:
-            return JsonResponse(
-                {"success": True, "message": "Data is already up to date."}, status=200
-            )
-
-        try:
-            # Get AWS Cost Explorer client
-            client = get_account_aws_client(cloud_account)
+    # a refresh already waiting or running covers this request too
+    job = active_job("org_refresh", organization=org) or enqueue_job(
+        "org_refresh", organization=org
+    )
 
-            # Fetch new cost & usage data
-            cost_response = fetch_cost_and_usage(client, start_date, end_date)
+    return JsonResponse(
+        {"success": True, "message": "Refresh queued.", "job_id": job.id},
+        status=202,
+    )
 
-            # Save new records
-            save_billing_data_efficient(cloud_account, cost_response)
 
-            return JsonResponse(
-                {
-                    "success": True,
-                    "message": f"Billing data refreshed from {start_date} to {end_date}.",
-                },
-                status=200,
-            )
+@extend_schema(
+    responses=BackgroundJobSerializer,
+    description="Returns the status, attempts and result of a background job.",
+    summary="Background Job Status",
+)
+@api_view(["GET"])
+@permission_classes([permissions.IsAuthenticated])
+def background_job_status(request, job_id):
+    job = get_object_or_404(BackgroundJob, id=job_id)
+    if not (request.user.is_staff or get_role(request.user, job.organization_id)):
+        raise NotFound({"job_id": "Job not found."})
 
-        except Exception as e:
-            return JsonResponse(
-                {
-                    "success": False,
-                    "message": f"Error refreshing billing data: {str(e)}",
-                },
-                status=500,
-            )
+    return Response(BackgroundJobSerializer(job).data)
 
 
 @extend_schema(
     description=(
-        "CSV billing data exporter for an organization, supports date framing."
+        "CSV billing data exporter for an organization, supports date framing. "
+        "The file is streamed; pass `compress=gzip` to have it gzip encoded on the fly."
     ),
     summary="CSV Billing Export.",
 )
@@ -361,62 +343,70 @@ class ExportOrgnizationBillingCSV(APIView):
                 {"detail": "Organization not found."}, status=status.HTTP_404_NOT_FOUND
             )
 
-        # Fetch all billing records for the organization's cloud accounts
-        billing_records = BillingRecord.objects.filter(
-            cloud_account__organization=organization,
-            usage_start__date__gte=start_date,
-            usage_start__date__lte=end_date,
-        ).select_related("cloud_account")
-
-        if not billing_records.exists():
-            return Response(
-                {"detail": "No billing records found for this organization."},
-                status=status.HTTP_404_NOT_FOUND,
-            )
+        rows = billing_export_rows(organization, start_date, end_date)
+        content = iter_csv(rows)
+        compress = request.query_params.get("compress") == "gzip"
+        if compress:
+            content = gzip_stream(content)
 
-        # Create CSV in memory
-        buffer = StringIO()
-        writer = csv.writer(buffer)
-        writer.writerow(
-            [
-                "Cloud Vendor",
-                "Account Name",
-                "Service Name",
-                "Project ID",
-                "Region",
-                "Cost Type",
-                "Usage Amount",
-                "Usage Unit",
-                "Resource",
-                "Cost",
-                "Currency",
-                "Usage Start",
-                "Usage End",
-            ]
+        response = StreamingHttpResponse(content, content_type="text/csv")
+        response["Content-Disposition"] = (
+            f'attachment; filename="{organization.name}_billing.csv"'
         )
+        if compress:
+            response["Content-Encoding"] = "gzip"
+        return response
+
+
+@extend_schema(
+    description=(
+        "Parquet billing data exporter for an organization, supports date framing. "
+        "Row groups are streamed as they are written; `row_group_size` and "
+        "`compression` (none, snappy, gzip, brotli, lz4, zstd) are optional."
+    ),
+    summary="Parquet Billing Export.",
+)
+class ExportOrgnizationBillingParquet(APIView):
+    permission_classes = [permissions.IsAuthenticated]
 
-        for record in billing_records:
-            writer.writerow(
-                [
-                    record.cloud_account.vendor,
-                    record.cloud_account.account_name,
-                    record.service_name,
-                    record.project_id or "",
-                    record.region or "",
-                    record.cost_type or "",
-                    record.usage_amount or "",
-                    record.usage_unit or "",
-                    record.resource or "",
-                    record.cost,
-                    record.currency,
-                    record.usage_start.strftime("%Y-%m-%d %H:%M:%S"),
-                    record.usage_end.strftime("%Y-%m-%d %H:%M:%S"),
-                ]
+    def get(self, request, organization_id):
+        start_date, end_date, error = parse_date_range(request)
+        if error:
+            return error
+
+        compression = request.query_params.get("compression")
+        if compression and compression not in PARQUET_COMPRESSIONS:
+            raise ValidationError(
+                {"compression": f"Must be one of {sorted(PARQUET_COMPRESSIONS)}."}
             )
+        row_group_size = request.query_params.get("row_group_size")
+        if row_group_size is not None:
+            try:
+                row_group_size = int(row_group_size)
+            except ValueError:
+                row_group_size = 0
+            if not 0 < row_group_size <= settings.BILLING_PARQUET_ROW_GROUP_SIZE:
+                raise ValidationError(
+                    {
+                        "row_group_size": "Must be an integer between 1 and "
+                        f"{settings.BILLING_PARQUET_ROW_GROUP_SIZE}."
+                    }
+                )
 
-        # Return CSV response
-        response = HttpResponse(buffer.getvalue(), content_type="text/csv")
+        try:
+            # Ensure organization exists
+            organization = Organization.objects.get(id=organization_id)
+        except Organization.DoesNotExist:
+            return Response(
+                {"detail": "Organization not found."}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        rows = billing_export_rows(organization, start_date, end_date)
+        response = StreamingHttpResponse(
+            iter_parquet(rows, row_group_size, compression),
+            content_type="application/vnd.apache.parquet",
+        )
         response["Content-Disposition"] = (
-            f'attachment; filename="{organization.name}_billing.csv"'
+            f'attachment; filename="{organization.name}_billing.parquet"'
         )
         return response